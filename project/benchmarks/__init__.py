@@ -0,0 +1 @@
+"""Offline performance benchmarks: ingestion throughput and start-up import cost."""
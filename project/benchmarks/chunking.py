@@ -0,0 +1,313 @@
+# file: benchmarks/chunking.py
+"""
+Chunking / ingest micro-benchmarks.
+
+Runs every MedicalDocumentProcessor chunking strategy, plus ``chunk_text``
+from the policy ingest script, over synthetic documents of several types
+and sizes. Embeddings come from a fake model, so nothing leaves the machine.
+
+    $ cd project
+    $ python -m benchmarks.chunking                       # run, save, compare with last run
+    $ python -m benchmarks.chunking --sizes 10,100 --strategies hybrid,recursive
+    $ python -m benchmarks.chunking --stage chunk --baseline benchmarks/results/chunking-20240101-120000.json
+
+Each run is saved as JSON under benchmarks/results/. A case is flagged as a
+regression when its throughput drops, or its peak memory grows, by more than
+``--threshold`` percent against the baseline.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .synthetic import DOCUMENT_TYPES, FakeEmbeddingModel, make_document
+
+RESULTS_DIR = Path(__file__).parent / "results"
+PROCESSOR_STRATEGIES = ("semantic", "sliding_window", "recursive", "hybrid")
+POLICY_STRATEGY = "policy_chunk_text"
+DEFAULT_SIZES_KB = (5, 50, 500)
+CASE_KEY_FIELDS = ("stage", "strategy", "doc_type", "size_kb", "chunk_size", "chunk_overlap")
+
+log = logging.getLogger("benchmarks.chunking")
+
+
+# ────────────── runners ─────────────────────────────────────────
+def _make_config(strategy: str, chunk_size: int, chunk_overlap: int, workdir: str):
+    """Minimal stand-in for my_rag_app.rag_config.Config."""
+    rag = type("rag", (), {
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "chunking_strategy": strategy,
+        "processed_docs_dir": workdir,
+        "processing_workers": 1,
+        # Measure the pipeline itself, not cache hits from earlier repeats
+        "embedding_cache_enabled": False,
+    })
+    return type("BenchmarkConfig", (), {"rag": rag})
+
+
+def _processor_runner(strategy: str, stage: str, chunk_size: int, chunk_overlap: int,
+                      workdir: str) -> Callable[[str], List[str]]:
+    from my_rag_app.document_processor import MedicalDocumentProcessor
+
+    config = _make_config(strategy, chunk_size, chunk_overlap, workdir)
+    processor = MedicalDocumentProcessor(config, FakeEmbeddingModel())
+    metadata = {"source": "benchmark"}
+
+    if stage == "chunk":
+        return lambda text: [c["content"] for c in processor._prepare_document(text, metadata)[1]]
+    return lambda text: [c["content"] for c in processor.process_document(text, metadata, force=True)]
+
+
+def _policy_runner() -> Optional[Callable[[str], List[str]]]:
+    try:
+        from semantic_search.ingest_policy_docs import chunk_text
+    except Exception as e:  # missing dependencies or credentials for the ingest script
+        log.warning(f"Skipping {POLICY_STRATEGY}: cannot import semantic_search.ingest_policy_docs ({e})")
+        return None
+    return chunk_text
+
+
+# ────────────── measurement ─────────────────────────────────────
+def _word_stats(chunks: List[str]) -> Dict[str, float]:
+    if not chunks:
+        return {"min": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0}
+    words = np.array([len(chunk.split()) for chunk in chunks])
+    return {
+        "min": int(words.min()),
+        "mean": round(float(words.mean()), 1),
+        "p50": float(np.percentile(words, 50)),
+        "p95": float(np.percentile(words, 95)),
+        "max": int(words.max()),
+    }
+
+
+def measure(run: Callable[[str], List[str]], text: str, repeat: int) -> Dict[str, Any]:
+    """
+    Time ``run(text)`` and measure its peak Python memory.
+
+    Args:
+        run: Callable returning the chunk texts for a document
+        text: Document text
+        repeat: Number of timed runs; the fastest one is reported
+
+    Returns:
+        Dict of timings, throughput, peak memory and chunk statistics
+    """
+    run(text)  # warm-up: compiled patterns, caches, lazy imports
+
+    timings = []
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        start = time.perf_counter()
+        chunks = run(text)
+        timings.append(time.perf_counter() - start)
+
+    # Separate run: tracemalloc slows allocation-heavy code down considerably
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run(text)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    best = min(timings)
+    size_bytes = len(text.encode("utf-8"))
+    return {
+        "bytes": size_bytes,
+        "seconds": best,
+        "seconds_median": float(np.median(timings)),
+        "chunks": len(chunks),
+        "chunks_per_sec": len(chunks) / best if best else 0.0,
+        "mb_per_sec": size_bytes / 1e6 / best if best else 0.0,
+        "peak_mem_mb": peak / 1e6,
+        "chunk_words": _word_stats(chunks),
+    }
+
+
+def run_benchmarks(
+    strategies: List[str],
+    doc_types: List[str],
+    sizes_kb: List[int],
+    stage: str = "ingest",
+    chunk_size: int = 300,
+    chunk_overlap: int = 50,
+    repeat: int = 3,
+) -> List[Dict[str, Any]]:
+    """Run every (strategy, document type, size) case and return one result per case."""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="chunking-bench-") as workdir:
+        for strategy in strategies:
+            if strategy == POLICY_STRATEGY:
+                run = _policy_runner()
+                if run is None:
+                    continue
+            else:
+                run = _processor_runner(strategy, stage, chunk_size, chunk_overlap,
+                                        str(Path(workdir) / strategy))
+
+            for doc_type in doc_types:
+                for size_kb in sizes_kb:
+                    text = make_document(doc_type, size_kb)
+                    result = {
+                        "stage": stage if strategy != POLICY_STRATEGY else "chunk",
+                        "strategy": strategy,
+                        "doc_type": doc_type,
+                        "size_kb": size_kb,
+                        "chunk_size": chunk_size if strategy != POLICY_STRATEGY else None,
+                        "chunk_overlap": chunk_overlap if strategy != POLICY_STRATEGY else None,
+                    }
+                    result.update(measure(run, text, repeat))
+                    log.info(
+                        f"{strategy:<18} {doc_type:<15} {size_kb:>5} KB  "
+                        f"{result['chunks']:>5} chunks  {result['chunks_per_sec']:>9.1f} chunks/s  "
+                        f"{result['mb_per_sec']:>6.2f} MB/s  {result['peak_mem_mb']:>7.1f} MB peak"
+                    )
+                    results.append(result)
+    return results
+
+
+# ────────────── persistence & comparison ────────────────────────
+def save_results(results: List[Dict[str, Any]], params: Dict[str, Any],
+                 directory: Path = RESULTS_DIR) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now()
+    path = directory / f"chunking-{stamp.strftime('%Y%m%d-%H%M%S')}.json"
+    payload = {
+        "meta": {
+            "timestamp": stamp.isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "params": params,
+        },
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+
+def latest_results(directory: Path = RESULTS_DIR, exclude: Optional[Path] = None) -> Optional[Path]:
+    runs = sorted(p for p in directory.glob("chunking-*.json") if p != exclude)
+    return runs[-1] if runs else None
+
+
+def _case_key(result: Dict[str, Any]) -> Tuple:
+    return tuple(result.get(field) for field in CASE_KEY_FIELDS)
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+            threshold: float = 10.0) -> List[Dict[str, Any]]:
+    """
+    Compare results with a baseline run, case by case.
+
+    Args:
+        results: Current results
+        baseline: Results of an earlier run
+        threshold: Percentage change tolerated before a case is flagged
+
+    Returns:
+        One entry per flagged case with the metric, both values and the change in percent
+    """
+    previous = {_case_key(r): r for r in baseline}
+    flagged = []
+    for result in results:
+        before = previous.get(_case_key(result))
+        if before is None:
+            continue
+        checks = (
+            ("chunks_per_sec", -1, "regression"),   # lower is worse
+            ("peak_mem_mb", +1, "regression"),      # higher is worse
+        )
+        for metric, worse_sign, kind in checks:
+            old, new = before.get(metric), result.get(metric)
+            if not old:
+                continue
+            change = (new - old) / old * 100
+            if change * worse_sign > threshold:
+                flagged.append({"case": _case_key(result), "metric": metric, "kind": kind,
+                                "before": old, "after": new, "change_pct": round(change, 1)})
+        if before.get("chunks") != result.get("chunks"):
+            flagged.append({"case": _case_key(result), "metric": "chunks", "kind": "changed",
+                            "before": before.get("chunks"), "after": result.get("chunks"),
+                            "change_pct": None})
+    return flagged
+
+
+# ────────────── main ────────────────────────────────────────────
+def _csv(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark document chunking strategies offline.")
+    parser.add_argument("--strategies", type=_csv,
+                        default=list(PROCESSOR_STRATEGIES) + [POLICY_STRATEGY],
+                        help="comma-separated strategies (default: all, plus policy_chunk_text)")
+    parser.add_argument("--doc-types", type=_csv, default=list(DOCUMENT_TYPES),
+                        help=f"comma-separated document types (default: {','.join(DOCUMENT_TYPES)})")
+    parser.add_argument("--sizes", type=lambda v: [int(s) for s in _csv(v)], default=list(DEFAULT_SIZES_KB),
+                        help="comma-separated document sizes in KB (default: 5,50,500)")
+    parser.add_argument("--stage", choices=("chunk", "ingest"), default="ingest",
+                        help="chunk: chunking and metadata only; ingest: full process_document "
+                             "with fake embeddings and the chunk store (default)")
+    parser.add_argument("--chunk-size", type=int, default=300)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (fastest is kept)")
+    parser.add_argument("--baseline", help="results file to compare with (default: latest saved run)")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="percent change flagged as a regression (default: 10)")
+    parser.add_argument("--no-save", action="store_true", help="do not save this run")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="exit with status 1 if any regression is flagged")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(message)s")
+    # The processor logs every document; keep the benchmark output readable
+    logging.getLogger("my_rag_app").setLevel(logging.WARNING)
+
+    unknown = set(args.strategies) - set(PROCESSOR_STRATEGIES) - {POLICY_STRATEGY}
+    if unknown:
+        parser.error(f"unknown strategies: {', '.join(sorted(unknown))}")
+
+    results = run_benchmarks(args.strategies, args.doc_types, args.sizes, args.stage,
+                             args.chunk_size, args.chunk_overlap, args.repeat)
+
+    saved = None
+    if not args.no_save:
+        params = {k: v for k, v in vars(args).items() if k not in ("baseline", "no_save", "fail_on_regression")}
+        saved = save_results(results, params)
+        log.info(f"Saved results to {saved}")
+
+    baseline_path = Path(args.baseline) if args.baseline else latest_results(exclude=saved)
+    if baseline_path is None:
+        log.info("No earlier run to compare with")
+        return 0
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    flagged = compare(results, baseline, args.threshold)
+    log.info(f"Compared with {baseline_path}: {len(flagged)} case(s) flagged")
+    for item in flagged:
+        change = f"{item['change_pct']:+.1f}%" if item["change_pct"] is not None else ""
+        log.warning(f"{item['kind'].upper():<10} {'/'.join(map(str, item['case']))}  "
+                    f"{item['metric']}: {item['before']} -> {item['after']} {change}")
+
+    regressions = [item for item in flagged if item["kind"] == "regression"]
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+# file: benchmarks/import_time.py
+"""
+Import-time report: what each module and package costs at start-up.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter
+and summarises the output.
+
+    $ cd project
+    $ python -m benchmarks.import_time                    # combined_main
+    $ python -m benchmarks.import_time my_rag_app.document_processor --top 15
+    $ python -m benchmarks.import_time --json import-time.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def measure_imports(module: str, python: str = sys.executable) -> List[ImportRecord]:
+    """
+    Import ``module`` in a fresh interpreter and return its -X importtime records.
+
+    Raises:
+        RuntimeError: if the import fails
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(PROJECT_DIR), env.get("PYTHONPATH")]))
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_DIR, env=env, capture_output=True, text=True,
+    )
+    records = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        stripped = name.lstrip()
+        # Nested imports are indented by two spaces per level
+        depth = (len(name) - len(stripped) - 1) // 2
+        records.append(ImportRecord(stripped, int(self_us), int(cumulative_us), depth))
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        raise RuntimeError(f"import {module} failed: {tail[0]}")
+    return records
+
+
+def summarize(records: List[ImportRecord], top: int = 20) -> Dict[str, Any]:
+    """Total import time, the costliest packages (by summed self time) and modules."""
+    packages: Dict[str, int] = {}
+    for record in records:
+        package = record.module.split(".")[0]
+        packages[package] = packages.get(package, 0) + record.self_us
+
+    return {
+        "total_ms": sum(r.self_us for r in records) / 1000,
+        "modules_imported": len(records),
+        "packages": [
+            {"package": name, "ms": us / 1000}
+            for name, us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        ],
+        "modules": [
+            {"module": r.module, "self_ms": r.self_us / 1000, "cumulative_ms": r.cumulative_us / 1000}
+            for r in sorted(records, key=lambda r: -r.cumulative_us)[:top]
+        ],
+    }
+
+
+def print_report(module: str, summary: Dict[str, Any]):
+    print(f"import {module}: {summary['total_ms']:.0f} ms, {summary['modules_imported']} modules\n")
+    print(f"{'package':<40} {'ms':>9}")
+    for row in summary["packages"]:
+        print(f"{row['package']:<40} {row['ms']:>9.1f}")
+    print(f"\n{'module':<52} {'self ms':>9} {'cumul ms':>9}")
+    for row in summary["modules"]:
+        print(f"{row['module']:<52} {row['self_ms']:>9.1f} {row['cumulative_ms']:>9.1f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Report per-module import cost.")
+    parser.add_argument("module", nargs="?", default="combined_main",
+                        help="module to import (default: combined_main)")
+    parser.add_argument("--top", type=int, default=20, help="rows per table (default: 20)")
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        records = measure_imports(args.module)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    summary = summarize(records, args.top)
+    print_report(args.module, summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"module": args.module, **summary}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
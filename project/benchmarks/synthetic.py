@@ -0,0 +1,94 @@
+# file: benchmarks/synthetic.py
+"""
+Synthetic medical documents and a fake embedding model for offline benchmarks.
+
+Documents are generated from a fixed seed, so the same (type, size) always
+produces the same text and benchmark runs stay comparable.
+"""
+
+import hashlib
+import random
+from typing import Dict, List
+
+from shared.embedding_providers import FakeEmbeddingProvider
+
+DOCUMENT_TYPES = ("clinical_note", "research_paper", "guideline")
+
+_SECTIONS: Dict[str, List[str]] = {
+    "clinical_note": [
+        "Chief Complaint", "History of Present Illness", "Past Medical History",
+        "Medications", "Allergies", "Physical Examination", "Lab Results",
+        "Assessment", "Plan",
+    ],
+    "research_paper": [
+        "Abstract", "1. Introduction", "2. Methods", "2.1 Study Population",
+        "3. Results", "4. Discussion", "5. Conclusion", "References",
+    ],
+    "guideline": [
+        "Recommendations", "Indications", "Contraindications", "Dosage",
+        "Administration", "Monitoring", "Special Populations", "Patient Education",
+    ],
+}
+
+_TERMS = [
+    "diabetes", "hypertension", "asthma", "stroke", "heart disease", "copd",
+    "chronic kidney disease", "pneumonia", "metformin", "insulin", "aspirin",
+    "lisinopril", "atorvastatin", "warfarin", "mri", "ct scan", "ecg", "biopsy",
+    "blood test", "heart", "kidney", "liver", "lung", "artery",
+]
+_KEYWORDS = ["significant", "important", "critical", "key", "finding", "recommend"]
+_FILLER = (
+    "patient presented with progressive symptoms over several weeks and was reviewed "
+    "in clinic where the history was taken and examination performed according to "
+    "standard protocol with follow up arranged after discussion of risks and benefits "
+    "including the expected course response to therapy and relevant comorbidities"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.sample(_FILLER, rng.randint(8, 18))
+    for _ in range(rng.randint(1, 3)):
+        words.insert(rng.randrange(len(words) + 1), rng.choice(_TERMS))
+    if rng.random() < 0.2:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(_KEYWORDS))
+    text = " ".join(words)
+    return text[0].upper() + text[1:] + "."
+
+
+def make_document(doc_type: str, size_kb: int, seed: int = 0) -> str:
+    """
+    Generate a document of roughly ``size_kb`` kilobytes.
+
+    Args:
+        doc_type: One of DOCUMENT_TYPES
+        size_kb: Target size in kilobytes (UTF-8)
+        seed: Random seed; equal arguments always give equal text
+    """
+    if doc_type not in _SECTIONS:
+        raise ValueError(f"Unknown document type {doc_type!r}, expected one of {DOCUMENT_TYPES}")
+    seed_bytes = hashlib.md5(f"{doc_type}:{size_kb}:{seed}".encode()).digest()
+    rng = random.Random(int.from_bytes(seed_bytes, "big"))
+    target = size_kb * 1024
+    sections = _SECTIONS[doc_type]
+
+    parts: List[str] = []
+    size, i = 0, 0
+    while size < target:
+        header = sections[i % len(sections)]
+        paragraphs = []
+        for _ in range(rng.randint(1, 4)):
+            paragraphs.append(" ".join(_sentence(rng) for _ in range(rng.randint(2, 8))))
+        block = f"{header}\n" + "\n\n".join(paragraphs)
+        parts.append(block)
+        size += len(block) + 2
+        i += 1
+    return "\n\n".join(parts)
+
+
+class FakeEmbeddingModel(FakeEmbeddingProvider):
+    """
+    Deterministic stand-in for an embedding API, under the model name benchmark results were recorded with.
+    """
+
+    def __init__(self, dim: int = 64, model: str = "fake-embedding"):
+        super().__init__(dim, model)
@@ -1,8 +1,11 @@
 # ───────────────── project/combined_main.py ─────────────────
 import logging
 import sys
+import time
 from pathlib import Path
 
+_import_started = time.perf_counter()
+
 # ── Make sub‑packages importable at top‑level ───────────────
 PROJECT_ROOT = Path(__file__).resolve().parent
 if str(PROJECT_ROOT) not in sys.path:
@@ -14,9 +17,16 @@ from fastapi.middleware.cors import CORSMiddleware
 # original sub‑apps (keep absolute imports inside them happy)
 from my_rag_app.main import app as rag_app
 from semantic_search.router import semantic_router
+from semantic_search.search_logic import get_answer_cache
+from shared.embedding_cache import get_embedding_cache
+from shared.query_cache import get_query_cache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+logger.info(
+    "Imports took %.2fs (per-module breakdown: python -m benchmarks.import_time)",
+    time.perf_counter() - _import_started,
+)
 
 combined_app = FastAPI(
     title="Unified Clinical Platform",
@@ -50,4 +60,14 @@ def root_check():
         "message": "Unified service for RAG Chatbot and Semantic Search",
         "allowed_origins": allowed_origins,
     }
+
+@combined_app.get("/metrics/cache")
+def cache_metrics():
+    """Hit rates of the caches shared by both sub-apps and of the semantic answer cache."""
+    answers = get_answer_cache()
+    return {
+        "answers": answers.stats() if answers else None,
+        "query_embeddings": get_query_cache().stats(),
+        "document_embeddings": get_embedding_cache().stats(),
+    }
 # ────────────────────────────────────────────────────────────
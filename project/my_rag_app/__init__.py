@@ -1,4 +1,11 @@
 """Top-level package for the RAG application."""
-from .medical_rag import MedicalRAG
 
 __all__ = ["MedicalRAG"]
+
+
+def __getattr__(name):
+    # Imported on first access so "import my_rag_app.<module>" stays light
+    if name == "MedicalRAG":
+        from .medical_rag import MedicalRAG
+        return MedicalRAG
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,336 @@
+# file: my_rag_app/chunk_dedup.py
+"""
+Exact and near-duplicate chunk detection, run between chunking and embedding.
+
+Exact duplicates are found by hashing normalized chunk text. Near-duplicates
+are found with MinHash signatures over word shingles, bucketed with LSH so
+each chunk is only compared with likely matches. Both indexes live in one
+SQLite file, so duplicates are found across every document ingested before.
+
+Only stored chunks may be canonical: ``deduplicate`` holds a document's kept
+chunks back until ``register`` is called once they are saved, and
+``discard`` forgets them if the document fails. The index also remembers
+which documents had chunks dropped as duplicates of another document's, so
+``forget_document`` can report the documents that lose their canonical text.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from shared.embedding_cache import normalize_text
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Split ``num_perm`` signature rows into (bands, rows per band).
+
+    Picks the split whose LSH threshold ``(1/bands) ** (1/rows)`` is the
+    highest one not above ``threshold``, so likely matches become candidates
+    and the exact similarity check filters the rest.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+
+class MinHasher:
+    """
+    MinHash signatures of word shingles.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        """
+        Args:
+            num_perm: Number of hash permutations (signature length)
+            shingle_size: Words per shingle
+            seed: Seed of the permutations; signatures are only comparable with the same seed
+        """
+        self.num_perm = num_perm
+        self.shingle_size = max(1, shingle_size)
+        rng = np.random.RandomState(seed)
+        # a, b < 2**31 and shingle hashes < 2**32, so a * h + b never overflows uint64
+        self._a = rng.randint(1, 2 ** 31 - 1, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, 2 ** 31 - 1, size=num_perm).astype(np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        words = normalize_text(text).lower().split()
+        k = self.shingle_size
+        shingles = {" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))}
+        hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingles], dtype=np.uint64)
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+class ChunkDeduplicator:
+    """
+    Drops chunks whose text duplicates, or nearly duplicates, an indexed chunk.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        near_threshold: float = 0.9,
+        num_perm: int = 128,
+        shingle_size: int = 5,
+    ):
+        """
+        Args:
+            path: SQLite index file; None keeps the index in memory for this process only
+            near_threshold: Estimated Jaccard similarity at or above which chunks are
+                near-duplicates; 1.0 or more disables near-duplicate detection
+            num_perm: MinHash signature length
+            shingle_size: Words per shingle
+        """
+        self.logger = logging.getLogger(__name__)
+        self.near_threshold = near_threshold
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.bands, self.rows = choose_bands(num_perm, near_threshold)
+        self._lock = threading.Lock()
+        # doc_id -> (chunk_id, text hash, signature) of kept chunks not yet stored
+        self._pending: Dict[str, List[Tuple[str, str, Optional[np.ndarray]]]] = {}
+        # doc_id -> (chunk_id, canonical doc_id) of chunks dropped as duplicates of other documents
+        self._pending_links: Dict[str, List[Tuple[str, str]]] = {}
+
+        self.exact_dropped = 0
+        self.near_dropped = 0
+
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path) if path else ":memory:", timeout=30, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS exact (
+                hash TEXT PRIMARY KEY, chunk_id TEXT NOT NULL, doc_id TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS signatures (
+                chunk_id TEXT PRIMARY KEY, doc_id TEXT NOT NULL, signature BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS buckets (
+                band INTEGER NOT NULL, bucket BLOB NOT NULL, chunk_id TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS duplicates (
+                chunk_id TEXT PRIMARY KEY, doc_id TEXT NOT NULL, canonical_doc_id TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets(band, bucket);
+            CREATE INDEX IF NOT EXISTS exact_doc ON exact(doc_id);
+            CREATE INDEX IF NOT EXISTS signatures_doc ON signatures(doc_id);
+            CREATE INDEX IF NOT EXISTS duplicates_doc ON duplicates(doc_id);
+            CREATE INDEX IF NOT EXISTS duplicates_canonical ON duplicates(canonical_doc_id);
+            """
+        )
+        self._db.commit()
+
+    @property
+    def near_enabled(self) -> bool:
+        return self.near_threshold < 1.0
+
+    def deduplicate(
+        self, doc_id: str, chunks: List[Dict[str, Any]], supersedes: Sequence[str] = ()
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Split a document's chunks into kept and dropped ones.
+
+        A chunk is dropped if it duplicates a registered chunk of another
+        document or a chunk kept earlier in this one. It gets ``duplicate_of``
+        (the canonical chunk ID), ``duplicate_type`` ("exact" or "near") and,
+        for near-duplicates, ``duplicate_similarity`` in its metadata. The
+        document's own registered chunks (an earlier run) are never canonical,
+        nor are those of the documents it ``supersedes``, which are about to
+        be removed.
+
+        Kept chunks become canonical only once ``register(doc_id)`` is called,
+        after they are stored; call ``discard(doc_id)`` if that fails.
+
+        Args:
+            doc_id: Document identifier
+            chunks: Processed chunks in document order
+            supersedes: Earlier versions of the document
+
+        Returns:
+            Tuple of (kept chunks, dropped chunks), each in document order
+        """
+        kept: List[Dict[str, Any]] = []
+        dropped: List[Dict[str, Any]] = []
+        pending: List[Tuple[str, str, Optional[np.ndarray]]] = []
+        links: List[Tuple[str, str]] = []
+        own_hashes: Dict[str, str] = {}
+        excluded = [doc_id, *supersedes]
+        marks = ",".join("?" * len(excluded))
+
+        with self._lock:
+            for chunk in chunks:
+                text_hash = hashlib.sha256(normalize_text(chunk["content"]).encode("utf-8")).hexdigest()
+                row = self._db.execute(
+                    f"SELECT chunk_id, doc_id FROM exact WHERE hash = ? AND doc_id NOT IN ({marks})",
+                    (text_hash, *excluded),
+                ).fetchone()
+                if row is not None:
+                    links.append((chunk["id"], row[1]))
+                canonical_id = row[0] if row is not None else own_hashes.get(text_hash)
+                if canonical_id is not None:
+                    self._mark(chunk, canonical_id, "exact")
+                    self.exact_dropped += 1
+                    dropped.append(chunk)
+                    continue
+
+                signature = self.hasher.signature(chunk["content"]) if self.near_enabled else None
+                if signature is not None:
+                    match = self._near_match(signature, excluded, pending)
+                    if match is not None:
+                        canonical_id, canonical_doc_id, similarity = match
+                        if canonical_doc_id != doc_id:
+                            links.append((chunk["id"], canonical_doc_id))
+                        self._mark(chunk, canonical_id, "near", similarity)
+                        self.near_dropped += 1
+                        dropped.append(chunk)
+                        continue
+
+                own_hashes[text_hash] = chunk["id"]
+                pending.append((chunk["id"], text_hash, signature))
+                kept.append(chunk)
+            self._pending[doc_id] = pending
+            self._pending_links[doc_id] = links
+
+        if dropped:
+            self.logger.info(f"Dropped {len(dropped)} duplicate chunk(s) of {doc_id} before embedding")
+        return kept, dropped
+
+    def register(self, doc_id: str):
+        """
+        Make the kept chunks of ``doc_id`` canonical, replacing its earlier entries.
+
+        Call once they are stored. A no-op if ``deduplicate`` was not called for
+        it (e.g. saved chunks re-embedded with a new model).
+        """
+        with self._lock:
+            pending = self._pending.pop(doc_id, None)
+            links = self._pending_links.pop(doc_id, [])
+            if pending is None:
+                return
+            self._forget(doc_id)
+            for chunk_id, text_hash, signature in pending:
+                self._add(doc_id, chunk_id, text_hash, signature)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO duplicates (chunk_id, doc_id, canonical_doc_id) VALUES (?, ?, ?)",
+                [(chunk_id, doc_id, canonical_doc_id) for chunk_id, canonical_doc_id in links],
+            )
+            self._db.commit()
+
+    def discard(self, doc_id: str):
+        """Drop the kept chunks of a document that failed before it was stored."""
+        with self._lock:
+            self._pending.pop(doc_id, None)
+            self._pending_links.pop(doc_id, None)
+
+    def forget_document(self, doc_id: str) -> List[str]:
+        """
+        Remove a document's chunks from the index.
+
+        Returns:
+            Documents that had chunks dropped as duplicates of this one's; their
+            text is no longer embedded anywhere, so they need processing again
+        """
+        with self._lock:
+            dependents = [
+                dependent for (dependent,) in self._db.execute(
+                    "SELECT DISTINCT doc_id FROM duplicates WHERE canonical_doc_id = ?", (doc_id,)
+                )
+            ]
+            self._forget(doc_id)
+            self._db.execute("DELETE FROM duplicates WHERE canonical_doc_id = ?", (doc_id,))
+            self._db.commit()
+        return dependents
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (indexed,) = self._db.execute("SELECT COUNT(*) FROM exact").fetchone()
+        return {"exact_dropped": self.exact_dropped, "near_dropped": self.near_dropped, "indexed": indexed}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # ───────────────────────── Internals ────────────────────────────
+    @staticmethod
+    def _mark(chunk: Dict[str, Any], canonical_id: str, kind: str, similarity: Optional[float] = None):
+        metadata = dict(chunk.get("metadata", {}))
+        metadata["duplicate_of"] = canonical_id
+        metadata["duplicate_type"] = kind
+        if similarity is not None:
+            metadata["duplicate_similarity"] = round(similarity, 3)
+        chunk["metadata"] = metadata
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _near_match(
+        self,
+        signature: np.ndarray,
+        excluded: List[str],
+        pending: List[Tuple[str, str, Optional[np.ndarray]]],
+    ) -> Optional[Tuple[str, str, float]]:
+        """
+        (chunk ID, doc ID, similarity) of the most similar registered chunk of a
+        document not in ``excluded``, or kept chunk in ``pending`` (of ``excluded[0]``).
+        """
+        candidates: Dict[str, None] = {}
+        for band, bucket in self._band_keys(signature):
+            for (chunk_id,) in self._db.execute(
+                "SELECT chunk_id FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)
+            ):
+                candidates[chunk_id] = None
+
+        others: List[Tuple[str, str, np.ndarray]] = []
+        marks = ",".join("?" * len(excluded))
+        for chunk_id in candidates:
+            row = self._db.execute(
+                f"SELECT doc_id, signature FROM signatures WHERE chunk_id = ? AND doc_id NOT IN ({marks})",
+                (chunk_id, *excluded),
+            ).fetchone()
+            if row is not None:
+                others.append((chunk_id, row[0], np.frombuffer(row[1], dtype=np.uint32)))
+        others.extend((chunk_id, excluded[0], other) for chunk_id, _, other in pending if other is not None)
+
+        best: Optional[Tuple[str, str, float]] = None
+        for chunk_id, other_doc_id, other in others:
+            similarity = float(np.mean(other == signature))
+            if similarity >= self.near_threshold and (best is None or similarity > best[2]):
+                best = (chunk_id, other_doc_id, similarity)
+        return best
+
+    def _add(self, doc_id: str, chunk_id: str, text_hash: str, signature: Optional[np.ndarray]):
+        self._db.execute(
+            "INSERT OR REPLACE INTO exact (hash, chunk_id, doc_id) VALUES (?, ?, ?)", (text_hash, chunk_id, doc_id)
+        )
+        if signature is None:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO signatures (chunk_id, doc_id, signature) VALUES (?, ?, ?)",
+            (chunk_id, doc_id, signature.tobytes()),
+        )
+        self._db.executemany(
+            "INSERT INTO buckets (band, bucket, chunk_id) VALUES (?, ?, ?)",
+            [(band, bucket, chunk_id) for band, bucket in self._band_keys(signature)],
+        )
+
+    def _forget(self, doc_id: str):
+        self._db.execute(
+            "DELETE FROM buckets WHERE chunk_id IN (SELECT chunk_id FROM signatures WHERE doc_id = ?)", (doc_id,)
+        )
+        self._db.execute("DELETE FROM signatures WHERE doc_id = ?", (doc_id,))
+        self._db.execute("DELETE FROM exact WHERE doc_id = ?", (doc_id,))
+        self._db.execute("DELETE FROM duplicates WHERE doc_id = ?", (doc_id,))
@@ -0,0 +1,249 @@
+# file: my_rag_app/chunk_store.py
+"""
+Append-only on-disk store of processed chunks and their embeddings.
+
+One store holds the chunks embedded with one embedding model:
+
+    chunks.jsonl     one {"id", "doc_id", "content", "metadata"} record per line
+    embeddings.bin   row-major float32/float16 matrix, one row per embedded chunk
+    index.tsv        id, doc_id, embedding row (-1 if none), byte offset in chunks.jsonl
+                     (-1 if the chunk was removed)
+    store.json       embedding dimension and dtype
+
+Re-appending a chunk ID supersedes the earlier record, and removing a
+document drops its chunks from the index; ``compact()`` drops superseded
+and removed records. Embeddings are read through a memory map, so exporting
+a collection is a sequential local disk read.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+
+class ChunkStore:
+    """
+    Chunk text, metadata and embeddings stored by chunk ID.
+    """
+
+    def __init__(self, directory: Union[str, Path], dtype: str = "float32"):
+        """
+        Args:
+            directory: Store directory (created if missing)
+            dtype: Embedding storage type for a new store, "float32" or "float16"
+        """
+        self.logger = logging.getLogger(__name__)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._records_path = self.directory / "chunks.jsonl"
+        self._embeddings_path = self.directory / "embeddings.bin"
+        self._index_path = self.directory / "index.tsv"
+        self._meta_path = self.directory / "store.json"
+        self._lock = threading.RLock()
+        self._matrix: Optional[np.memmap] = None
+
+        self.dim: Optional[int] = None
+        self.dtype = np.dtype(dtype)
+        if self._meta_path.exists():
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            self.dim = meta.get("dim")
+            self.dtype = np.dtype(meta.get("dtype", dtype))
+
+        # chunk ID -> (doc ID, embedding row, byte offset of its record)
+        self._index: Dict[str, Tuple[str, int, int]] = {}
+        self._documents: Dict[str, Dict[str, None]] = {}
+        self._rows = 0
+        self._load_index()
+
+    # ───────────────────────── Writing ──────────────────────────────
+    def append(self, chunks: Iterable[Dict[str, Any]], doc_id: Optional[str] = None) -> int:
+        """
+        Append processed chunks, storing their embeddings if present.
+
+        Args:
+            chunks: Chunks with "id", "content", "metadata" and optionally "embedding"
+            doc_id: Document the chunks belong to (default: each chunk's "doc_id")
+
+        Returns:
+            Number of chunks appended
+        """
+        chunks = list(chunks)
+        if not chunks:
+            return 0
+
+        vectors = [chunk.get("embedding") for chunk in chunks]
+        embedded = [v for v in vectors if v is not None]
+
+        with self._lock:
+            if embedded:
+                self._check_dim(len(embedded[0]))
+            with open(self._records_path, "ab") as records, \
+                 open(self._embeddings_path, "ab") as matrix, \
+                 open(self._index_path, "a") as index:
+                offset = records.tell()
+                for chunk, vector in zip(chunks, vectors):
+                    chunk_doc_id = doc_id or chunk.get("doc_id", "")
+                    line = json.dumps({
+                        "id": chunk["id"],
+                        "doc_id": chunk_doc_id,
+                        "content": chunk["content"],
+                        "metadata": chunk.get("metadata", {}),
+                    }).encode() + b"\n"
+                    records.write(line)
+
+                    row = -1
+                    if vector is not None:
+                        np.asarray(vector, dtype=self.dtype).tofile(matrix)
+                        row = self._rows
+                        self._rows += 1
+
+                    index.write(f"{chunk['id']}\t{chunk_doc_id}\t{row}\t{offset}\n")
+                    self._remember(chunk["id"], chunk_doc_id, row, offset)
+                    offset += len(line)
+            self._matrix = None
+        return len(chunks)
+
+    def remove_document(self, doc_id: str) -> int:
+        """
+        Remove a document's chunks, e.g. once a newer version of it is stored.
+
+        Returns:
+            Number of chunks removed
+        """
+        with self._lock:
+            chunk_ids = list(self._documents.get(doc_id, {}))
+            if not chunk_ids:
+                return 0
+            with open(self._index_path, "a") as index:
+                for chunk_id in chunk_ids:
+                    index.write(f"{chunk_id}\t{doc_id}\t-1\t-1\n")
+                    self._remember(chunk_id, doc_id, -1, -1)
+        return len(chunk_ids)
+
+    def compact(self):
+        """Rewrite the store keeping only the latest record of each chunk not removed."""
+        with self._lock:
+            tmp_dir = self.directory / ".compact"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            tmp = ChunkStore(tmp_dir, dtype=self.dtype.name)
+            tmp.append(self._iter_latest())
+            for name in ("chunks.jsonl", "embeddings.bin", "index.tsv", "store.json"):
+                src = tmp.directory / name
+                if src.exists():
+                    os.replace(src, self.directory / name)
+            tmp.directory.rmdir()
+            self._index, self._documents, self._rows, self._matrix = {}, {}, 0, None
+            self._load_index()
+
+    # ───────────────────────── Reading ──────────────────────────────
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._index
+
+    def get(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        """Return the latest record of a chunk with its embedding, or None."""
+        entry = self._index.get(chunk_id)
+        if entry is None:
+            return None
+        _, row, offset = entry
+        with open(self._records_path, "rb") as records:
+            records.seek(offset)
+            record = json.loads(records.readline())
+        record["embedding"] = self._vector(row)
+        return record
+
+    def get_document(self, doc_id: str) -> List[Dict[str, Any]]:
+        """Return the chunks of a document in the order they were appended."""
+        chunk_ids = self._documents.get(doc_id, {})
+        return [self.get(chunk_id) for chunk_id in chunk_ids]
+
+    def embeddings(self) -> Optional[np.memmap]:
+        """Read-only memory map of the embedding matrix (rows as stored)."""
+        with self._lock:
+            if self._matrix is None and self._rows and self.dim:
+                self._matrix = np.memmap(
+                    self._embeddings_path, dtype=self.dtype, mode="r", shape=(self._rows, self.dim)
+                )
+            return self._matrix
+
+    def iter_documents(self, batch_size: Optional[int] = None) -> Iterator[Any]:
+        """
+        Yield the latest embedded chunks in QdrantRetriever.upsert_documents format.
+
+        Args:
+            batch_size: If set, yield lists of up to this many chunks instead
+        """
+        batch = []
+        for record in self._iter_latest():
+            if record["embedding"] is None:
+                continue
+            if not batch_size:
+                yield record
+                continue
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    # ───────────────────────── Internals ────────────────────────────
+    def _iter_latest(self) -> Iterator[Dict[str, Any]]:
+        """Sequentially read records, skipping superseded ones."""
+        if not self._records_path.exists():
+            return
+        with open(self._records_path, "rb") as records:
+            offset = 0
+            for line in records:
+                line_offset, offset = offset, offset + len(line)
+                record = json.loads(line)
+                entry = self._index.get(record["id"])
+                if entry is None or entry[2] != line_offset:
+                    continue
+                record["embedding"] = self._vector(entry[1])
+                yield record
+
+    def _vector(self, row: int) -> Optional[List[float]]:
+        if row < 0:
+            return None
+        return self.embeddings()[row].astype(np.float32).tolist()
+
+    def _check_dim(self, dim: int):
+        if self.dim is None:
+            self.dim = dim
+            with open(self._meta_path, "w") as f:
+                json.dump({"dim": dim, "dtype": self.dtype.name}, f)
+        elif dim != self.dim:
+            raise ValueError(f"Embedding dimension {dim} does not match store dimension {self.dim}")
+
+    def _remember(self, chunk_id: str, doc_id: str, row: int, offset: int):
+        previous = self._index.get(chunk_id)
+        if previous is not None and previous[0] != doc_id:
+            self._documents.get(previous[0], {}).pop(chunk_id, None)
+        if offset < 0:
+            self._index.pop(chunk_id, None)
+            chunk_ids = self._documents.get(doc_id, {})
+            chunk_ids.pop(chunk_id, None)
+            if not chunk_ids:
+                self._documents.pop(doc_id, None)
+            return
+        self._index[chunk_id] = (doc_id, row, offset)
+        self._documents.setdefault(doc_id, {})[chunk_id] = None
+
+    def _load_index(self):
+        if self._index_path.exists():
+            with open(self._index_path) as f:
+                for line in f:
+                    chunk_id, doc_id, row, offset = line.rstrip("\n").split("\t")
+                    self._remember(chunk_id, doc_id, int(row), int(offset))
+        if self._embeddings_path.exists() and self.dim:
+            self._rows = self._embeddings_path.stat().st_size // (self.dim * self.dtype.itemsize)
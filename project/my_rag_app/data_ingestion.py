@@ -3,9 +3,7 @@
 import os
 import logging
 from pathlib import Path
-import pandas as pd
 from typing import List, Dict, Any, Optional, Union
-from unstructured.partition.pdf import partition_pdf
 
 logger = logging.getLogger(__name__)
 
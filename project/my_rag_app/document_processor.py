@@ -1,22 +1,57 @@
 import re
 import uuid
 import logging
-from typing import List, Dict, Any, Optional, Tuple, Union
+from typing import List, Dict, Any, Callable, Optional, Tuple, Union, Iterable, Iterator, NamedTuple
 import os
 from pathlib import Path
 import hashlib
 from datetime import datetime
-import nltk
-from nltk.tokenize import sent_tokenize
+from functools import lru_cache
 from collections import Counter
+from concurrent.futures import (
+    FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+)
 import numpy as np
 import json
 
-# Ensure NLTK data is available
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
+from .embedding_pipeline import EmbeddingBatcher
+from .chunk_dedup import ChunkDeduplicator
+from .chunk_store import ChunkStore
+from .ingest_manifest import IngestManifest
+from .medical_entities import EntityHit, SpanHitIndex, get_entity_extractor, group_hits
+from .segmentation import SegmentationIndex, Span
+
+@lru_cache(maxsize=None)
+def _get_sentence_tokenizer() -> Callable[[str], List[str]]:
+    """
+    NLTK's sentence tokenizer, with the punkt data located (or downloaded) on first use.
+    
+    Importing NLTK is slow, so it only happens once a document is chunked.
+    """
+    import nltk
+    from nltk.tokenize import sent_tokenize as nltk_sent_tokenize
+    
+    # Ensure NLTK data is available
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        nltk.download('punkt', quiet=True)
+    return nltk_sent_tokenize
+
+
+def sent_tokenize(text: str) -> List[str]:
+    """Split text into sentences with NLTK's punkt tokenizer."""
+    return _get_sentence_tokenizer()(text)
+
+
+class Chunk(NamedTuple):
+    """A chunk produced by a chunking strategy; ``start``/``end`` locate it in the document."""
+    text: str
+    section: str
+    level: str
+    start: int
+    end: int
+
 
 class MedicalDocumentProcessor:
     """
@@ -32,11 +67,33 @@ class MedicalDocumentProcessor:
         """
         self.logger = logging.getLogger(__name__)
         self.embedding_model = embedding_model
+        self.embedder = EmbeddingBatcher.from_config(config, embedding_model)
+        self.processing_workers = getattr(config.rag, "processing_workers", 1)
         self.chunk_size = config.rag.chunk_size
         self.chunk_overlap = config.rag.chunk_overlap
         self.processed_docs_dir = Path(config.rag.processed_docs_dir)
         self.processed_docs_dir.mkdir(parents=True, exist_ok=True)
         
+        # Manifest of processed documents for incremental re-runs
+        self.manifest = IngestManifest(self.processed_docs_dir / "manifest.json")
+        self.embedding_model_id = self.embedder.model_id
+        
+        # Compact store of processed chunks and their embeddings, one per embedding model
+        self.chunk_store_dtype = getattr(config.rag, "chunk_store_dtype", "float32")
+        self.chunk_store = self._open_chunk_store(self.embedding_model_id)
+        
+        # Exact / near-duplicate chunks are dropped before embedding, across the whole store
+        self.deduplicator = None
+        if getattr(config.rag, "dedup_enabled", True):
+            self.deduplicator = ChunkDeduplicator(
+                self.chunk_store.directory / "dedup.sqlite3",
+                near_threshold=getattr(config.rag, "dedup_near_threshold", 0.9),
+                num_perm=getattr(config.rag, "dedup_num_perm", 128),
+                shingle_size=getattr(config.rag, "dedup_shingle_size", 5),
+            )
+        # Dropped chunks per document, saved with the document once its kept chunks are stored
+        self._pending_duplicates: Dict[str, List[Dict[str, Any]]] = {}
+        
         # Chunking strategy selection
         self.chunking_strategy = getattr(config.rag, "chunking_strategy", "hybrid")
         self.logger.info(f"Using chunking strategy: {self.chunking_strategy}")
@@ -78,128 +135,308 @@ class MedicalDocumentProcessor:
             r"adverse effects|warnings|interactions|storage|pregnancy considerations)"
         ]
         
-        filtered_headers = [header for header in self.section_headers if header.strip()]
-        self.section_pattern = re.compile(f"({'|'.join(filtered_headers)})", re.IGNORECASE)
+        # Headers are only recognised at a line start, optionally numbered ("2.1 Methods"),
+        # and must be followed by a colon or the end of the line
+        filtered_headers = [header.lstrip("^") for header in self.section_headers if header.strip()]
+        self.section_pattern = re.compile(
+            rf"^[ \t]*(?:\d+(?:\.\d+)*\.?[ \t]+)?(?:{'|'.join(filtered_headers)})\b(?=[ \t]*(?::|$))",
+            re.IGNORECASE | re.MULTILINE,
+        )
+        self.summary_section_pattern = re.compile(r"(?i)(abstract|summary|conclusion)")
         
-        # Enhanced medical entities detection - Fixed by using separate re.IGNORECASE flag
-        # This would ideally be replaced with a proper medical NER model in production
-        self.medical_entity_categories = {
-            "diseases": r"(diabetes|hypertension|cancer|asthma|covid-19|stroke|"
-                      r"alzheimer's|parkinson's|arthritis|obesity|heart disease|hepatitis|"
-                      r"influenza|pneumonia|tuberculosis|hiv/aids|malaria|cholera|"
-                      r"diabetes mellitus|chronic kidney disease|copd)",
-            
-            "medications": r"(aspirin|ibuprofen|acetaminophen|lisinopril|metformin|"
-                         r"atorvastatin|omeprazole|amoxicillin|prednisone|insulin|"
-                         r"albuterol|levothyroxine|warfarin|clopidogrel|metoprolol)",
-            
-            "procedures": r"(surgery|biopsy|endoscopy|colonoscopy|mri|ct scan|x-ray|"
-                        r"ultrasound|echocardiogram|ekg|ecg|angiography|mammography|"
-                        r"vaccination|immunization|blood test|urinalysis)",
-            
-            "anatomy": r"(heart|lung|liver|kidney|brain|stomach|intestine|colon|"
-                     r"pancreas|spleen|thyroid|adrenal|pituitary|bone|muscle|nerve|"
-                     r"artery|vein|capillary|joint|skin)"
-        }
+        # Keywords that raise a chunk's importance score, matched in one pass
+        important_keywords = ["significant", "important", "critical", "essential", "key",
+                              "finding", "diagnosis", "recommend", "conclude", "summary"]
+        self.keyword_pattern = re.compile(
+            r"\b(" + "|".join(re.escape(keyword) for keyword in important_keywords) + r")\b",
+            re.IGNORECASE,
+        )
         
-        # Combine all entity patterns
-        all_patterns = []
-        for category, pattern in self.medical_entity_categories.items():
-            all_patterns.append(f"(?P<{category}>{pattern})")
-        
-        self.medical_entity_pattern = re.compile("|".join(all_patterns), re.IGNORECASE)
+        # Medical entity vocabulary, compiled once and shared across processors
+        # This would ideally be replaced with a proper medical NER model in production
+        self.entity_extractor = get_entity_extractor(getattr(config.rag, "medical_terms_path", None))
         
-    def process_document(self, content: str, metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def process_document(self, content: str, metadata: Dict[str, Any], force: bool = False) -> List[Dict[str, Any]]:
         """
         Process a document using the selected chunking strategy.
         
+        Documents already processed with the same chunking settings and
+        embedding model are skipped; if only the embedding model changed,
+        the saved chunks are re-embedded without re-chunking.
+        Chunks duplicating text already in the chunk store, or earlier in the
+        document, are dropped before embedding and not returned.
+        
         Args:
             content: Document content string
             metadata: Document metadata including source, specialty, etc.
+            force: Re-process the document even if the manifest has it
             
         Returns:
-            List of processed document chunks with embeddings
+            List of processed document chunks with embeddings (empty if the
+            document was skipped as unchanged)
+        """
+        return list(self.iter_process_document(content, metadata, force=force))
+    
+    def iter_process_document(
+        self,
+        content: str,
+        metadata: Dict[str, Any],
+        force: bool = False,
+        batch_size: Optional[int] = None,
+    ) -> Iterator[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Streaming variant of ``process_document``.
+        
+        Chunks are embedded a window at a time, appended to the chunk store
+        and yielded as soon as their embeddings arrive, so only one window of
+        embeddings is held in memory. The document is recorded in the manifest
+        once every chunk has been yielded.
+        
+        Args:
+            content: Document content string
+            metadata: Document metadata including source, specialty, etc.
+            force: Re-process the document even if the manifest has it
+            batch_size: If set, yield lists of up to this many chunks instead
+            
+        Yields:
+            Processed chunks with embeddings (or lists of them)
         """
+        doc_id = None
         try:
-            # Detect document type
-            doc_type = self._detect_document_type(content)
-            
-            # Create document ID based on content hash
-            doc_id_base = hashlib.md5(content.encode()).hexdigest()
-            doc_id = str(uuid.UUID(doc_id_base[:32]))
-            
-            # Extract medical entities
-            medical_entities = self._extract_medical_entities(content)
-            
-            # Add entities and document type to metadata
-            enhanced_metadata = metadata.copy()
-            enhanced_metadata['medical_entities'] = medical_entities
-            enhanced_metadata['document_type'] = doc_type
-            enhanced_metadata['processing_timestamp'] = datetime.now().isoformat()
-            
-            # Create chunks based on the selected strategy
-            if self.chunking_strategy == "semantic":
-                chunks = self._create_semantic_chunks(content, doc_type)
-            elif self.chunking_strategy == "sliding_window":
-                chunks = self._create_sliding_window_chunks(content)
-            elif self.chunking_strategy == "recursive":
-                chunks = self._create_recursive_chunks(content)
-            elif self.chunking_strategy == "hybrid":
-                chunks = self._create_hybrid_chunks(content, doc_type)
-            else:
-                # Default to hybrid method
-                chunks = self._create_hybrid_chunks(content, doc_type)
-            
-            # Process each chunk
-            processed_chunks = []
-            for i, chunk_info in enumerate(chunks):
-                if isinstance(chunk_info, tuple):
-                    chunk_text, section, level = chunk_info[0], chunk_info[1], chunk_info[2] if len(chunk_info) > 2 else "standard"
-                else:
-                    chunk_text, section, level = chunk_info, "general", "standard"
-                
-                # Generate chunk ID as a UUID with a suffix
-                chunk_id = str(uuid.UUID(doc_id_base[:24] + f"{i:08}"))
-                
-                # Calculate chunk importance score based on entity density and position
-                importance_score = self._calculate_chunk_importance(chunk_text, i, len(chunks))
-                
-                # Generate embedding
-                embedding = self.embedding_model.embed_documents([chunk_text])[0]
-                
-                # Create chunk metadata
-                chunk_metadata = enhanced_metadata.copy()
-                chunk_metadata["chunk_number"] = i
-                chunk_metadata["total_chunks"] = len(chunks)
-                chunk_metadata["section"] = section
-                chunk_metadata["hierarchy_level"] = level
-                chunk_metadata["importance_score"] = importance_score
-                chunk_metadata["word_count"] = len(chunk_text.split())
-                chunk_metadata["chunking_strategy"] = self.chunking_strategy
-                
-                # Add related chunks for context linkage
-                if i > 0:
-                    chunk_metadata["previous_chunk_id"] = str(uuid.UUID(doc_id_base[:24] + f"{i-1:08}"))
-                if i < len(chunks) - 1:
-                    chunk_metadata["next_chunk_id"] = str(uuid.UUID(doc_id_base[:24] + f"{i+1:08}"))
-                
-                # Create processed chunk
-                processed_chunks.append({
-                    "id": chunk_id,
-                    "content": chunk_text,
-                    "embedding": embedding,
-                    "metadata": self.make_serializable(chunk_metadata)
-                })
+            planned = self._plan_document(content, metadata, force)
+            if planned is None:
+                return
+            key, doc_id, chunks = planned
+            saved = True
+            
+            def embedded_chunks():
+                nonlocal saved
+                for window in self._iter_embedded_windows(chunks):
+                    saved = self._save_processed_chunks(doc_id, window) and saved
+                    yield from window
             
-            # Save processed chunks to disk for potential reuse
-            self._save_processed_chunks(doc_id, processed_chunks)
+            yield from _batched(embedded_chunks(), batch_size)
             
-            return processed_chunks
+            if saved:
+                self._commit_document(key, doc_id, chunks)
+                self.manifest.save()
+            else:
+                self._abandon_document(doc_id)
         
-        except Exception as e:
-            self.logger.error(f"Error processing document: {e}")
+        except BaseException as e:
+            if doc_id is not None:
+                self._abandon_document(doc_id)
+            if isinstance(e, Exception):
+                self.logger.error(f"Error processing document: {e}")
             raise
     
+    def iter_batch_process_documents(
+        self,
+        documents: Iterable[Dict[str, Any]],
+        force: bool = False,
+        batch_size: Optional[int] = None,
+    ) -> Iterator[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Streaming variant of ``batch_process_documents``.
+        
+        Documents are consumed lazily, one at a time. A document that fails
+        is logged and skipped; chunks it already yielded are not retracted.
+        
+        Args:
+            documents: Iterable of dictionaries with 'content' and 'metadata' keys
+            force: Re-process every document even if the manifest has it
+            batch_size: If set, yield lists of up to this many chunks instead
+            
+        Yields:
+            Processed chunks with embeddings (or lists of them)
+        """
+        def all_chunks():
+            for doc in documents:
+                try:
+                    yield from self.iter_process_document(doc["content"], doc["metadata"], force=force)
+                except Exception:
+                    # Already logged by iter_process_document; continue with the next document
+                    continue
+        
+        yield from _batched(all_chunks(), batch_size)
+    
+    def _iter_embedded_windows(self, chunks: List[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Embed chunks one window of concurrent requests at a time.
+        
+        Args:
+            chunks: Processed chunks without embeddings
+            
+        Yields:
+            Lists of copies of the chunks with embeddings attached
+        """
+        window = self.embedder.max_batch_size * self.embedder.max_concurrency
+        for start in range(0, len(chunks), window):
+            window_chunks = chunks[start:start + window]
+            embeddings = self.embedder.embed([chunk["content"] for chunk in window_chunks])
+            if len(embeddings) != len(window_chunks):
+                raise ValueError(f"Got {len(embeddings)} embedding(s) for {len(window_chunks)} chunk(s)")
+            yield [{**chunk, "embedding": embedding} for chunk, embedding in zip(window_chunks, embeddings)]
+    
+    def _plan_document(
+        self, content: str, metadata: Dict[str, Any], force: bool
+    ) -> Optional[Tuple[str, str, List[Dict[str, Any]]]]:
+        """
+        Decide how much work a document needs, using the ingest manifest.
+        
+        Args:
+            content: Document content string
+            metadata: Document metadata
+            force: Ignore the manifest and re-process from scratch
+            
+        Returns:
+            None if the document is unchanged, otherwise a tuple of
+            (manifest key, document ID, chunks still to be embedded)
+        """
+        key, status, saved = self._check_manifest(content, force)
+        if status == "skip":
+            return None
+        if status == "reembed":
+            return (key, *saved)
+        
+        doc_id, chunks = self._prepare_document(content, metadata)
+        return key, doc_id, self._drop_duplicates(key, doc_id, chunks)
+    
+    def _check_manifest(
+        self, content: str, force: bool
+    ) -> Tuple[str, str, Optional[Tuple[str, List[Dict[str, Any]]]]]:
+        """
+        Look a document up in the ingest manifest.
+        
+        Args:
+            content: Document content string
+            force: Ignore the manifest
+            
+        Returns:
+            Tuple of (manifest key, status, saved) where status is "skip",
+            "reembed" or "process", and saved is (document ID, saved chunks)
+            for "reembed"
+        """
+        content_hash = hashlib.md5(content.encode()).hexdigest()
+        key = IngestManifest.make_key(content_hash, self.chunking_strategy, self.chunk_size, self.chunk_overlap)
+        entry = None if force else self.manifest.get(key)
+        
+        if entry is not None:
+            if entry["embedding_model"] == self.embedding_model_id:
+                self.logger.info(f"Skipping unchanged document {entry['doc_id']}")
+                return key, "skip", None
+            
+            # Same chunks, different embedding model: re-embed only
+            chunks = self._load_processed_chunks(entry["doc_id"], entry["embedding_model"])
+            if chunks:
+                self.logger.info(
+                    f"Re-embedding {len(chunks)} saved chunk(s) of document {entry['doc_id']} "
+                    f"({entry['embedding_model']} -> {self.embedding_model_id})"
+                )
+                return key, "reembed", (entry["doc_id"], chunks)
+        
+        return key, "process", None
+    
+    def _prepare_document(self, content: str, metadata: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Chunk a document and build chunk metadata, without embeddings.
+        
+        Args:
+            content: Document content string
+            metadata: Document metadata including source, specialty, etc.
+            
+        Returns:
+            Tuple of (document ID, processed chunks with "embedding" set to None)
+        """
+        # Detect document type
+        doc_type = self._detect_document_type(content)
+        
+        # Create document ID based on content hash
+        doc_id_base = hashlib.md5(content.encode()).hexdigest()
+        doc_id = str(uuid.UUID(doc_id_base[:32]))
+        
+        # Scan for medical entities and importance keywords once; chunks reuse the hits by offset
+        entity_hits = self.entity_extractor.scan(content)
+        medical_entities = group_hits(entity_hits)
+        entity_index = SpanHitIndex(entity_hits)
+        keyword_index = SpanHitIndex(
+            (EntityHit("keyword", m.group(0).lower(), m.start(), m.end())
+             for m in self.keyword_pattern.finditer(content)),
+            group_by="term",
+        )
+        
+        # Add entities and document type to metadata
+        enhanced_metadata = metadata.copy()
+        enhanced_metadata['medical_entities'] = medical_entities
+        enhanced_metadata['document_type'] = doc_type
+        enhanced_metadata['processing_timestamp'] = datetime.now().isoformat()
+        
+        # Segment the document once; every strategy slices from this index
+        index = SegmentationIndex(content, self.section_pattern, sent_tokenize)
+        
+        # Create chunks based on the selected strategy
+        if self.chunking_strategy == "semantic":
+            chunks = self._create_semantic_chunks(index, doc_type)
+        elif self.chunking_strategy == "sliding_window":
+            chunks = self._create_sliding_window_chunks(index)
+        elif self.chunking_strategy == "recursive":
+            chunks = self._create_recursive_chunks(index, entity_index)
+        elif self.chunking_strategy == "hybrid":
+            chunks = self._create_hybrid_chunks(index, doc_type, entity_index)
+        else:
+            # Default to hybrid method
+            chunks = self._create_hybrid_chunks(index, doc_type, entity_index)
+        
+        # Score all chunks at once based on entity density, position and keywords
+        word_counts = np.array([index.word_count(chunk.start, chunk.end) for chunk in chunks], dtype=np.int64)
+        importance_scores = self._score_chunk_importance(chunks, word_counts, entity_index, keyword_index)
+        
+        # Process each chunk
+        processed_chunks = []
+        for i, (chunk_text, section, level, _, _) in enumerate(chunks):
+            # Generate chunk ID as a UUID with a suffix
+            chunk_id = str(uuid.UUID(doc_id_base[:24] + f"{i:08}"))
+            
+            # Create chunk metadata
+            chunk_metadata = enhanced_metadata.copy()
+            chunk_metadata["chunk_number"] = i
+            chunk_metadata["total_chunks"] = len(chunks)
+            chunk_metadata["section"] = section
+            chunk_metadata["hierarchy_level"] = level
+            chunk_metadata["importance_score"] = float(importance_scores[i])
+            chunk_metadata["word_count"] = int(word_counts[i])
+            chunk_metadata["chunking_strategy"] = self.chunking_strategy
+            
+            # Add related chunks for context linkage
+            if i > 0:
+                chunk_metadata["previous_chunk_id"] = str(uuid.UUID(doc_id_base[:24] + f"{i-1:08}"))
+            if i < len(chunks) - 1:
+                chunk_metadata["next_chunk_id"] = str(uuid.UUID(doc_id_base[:24] + f"{i+1:08}"))
+            
+            # Create processed chunk; the embedding is filled in by the embedding stage
+            processed_chunks.append({
+                "id": chunk_id,
+                "content": chunk_text,
+                "embedding": None,
+                "metadata": self.make_serializable(chunk_metadata)
+            })
+        
+        return doc_id, processed_chunks
+    
+    @staticmethod
+    def _attach_embeddings(chunks: List[Dict[str, Any]], embeddings: List[List[float]]):
+        """
+        Store embeddings on their chunks, matched by position.
+        
+        Args:
+            chunks: Processed chunks
+            embeddings: One embedding per chunk, in chunk order
+        """
+        if len(embeddings) != len(chunks):
+            raise ValueError(f"Got {len(embeddings)} embedding(s) for {len(chunks)} chunk(s)")
+        for chunk, embedding in zip(chunks, embeddings):
+            chunk["embedding"] = embedding
+    
     def _detect_document_type(self, text: str) -> str:
         """
         Detect the type of medical document based on content patterns.
@@ -224,83 +461,66 @@ class MedicalDocumentProcessor:
         # Default to general if no clear type
         return "general_medical"
     
-    def _create_semantic_chunks(self, text: str, doc_type: str) -> List[Tuple[str, str]]:
+    def _create_semantic_chunks(self, index: SegmentationIndex, doc_type: str) -> List[Chunk]:
         """
         Create chunks that respect semantic boundaries in the document.
         
         Args:
-            text: Document text
+            index: Segmentation index of the document
             doc_type: Document type
             
         Returns:
-            List of (chunk_text, section_name) tuples
+            List of (chunk_text, section_name, level, start, end) chunks
         """
-        # Find all section boundaries
-        section_matches = list(self.section_pattern.finditer(text))
+        sections = index.sections()
         chunks = []
         
-        if not section_matches:
+        if not sections:
             # If no sections found, fall back to paragraph-based chunking
-            paragraphs = re.split(r'\n\s*\n', text)
-            for i, para in enumerate(paragraphs):
-                if para.strip():
-                    chunks.append((para.strip(), "paragraph", "standard"))
+            for para in index.paragraphs():
+                chunks.append(Chunk(index.slice(para), "paragraph", "standard", *para))
             return chunks
         
         # Process each section
-        for i in range(len(section_matches)):
-            start_pos = section_matches[i].start()
-            section_name = text[section_matches[i].start():section_matches[i].end()].strip()
-            
-            # Determine section end
-            if i < len(section_matches) - 1:
-                end_pos = section_matches[i+1].start()
-            else:
-                end_pos = len(text)
-            
-            section_text = text[start_pos:end_pos].strip()
-            
+        for start_pos, end_pos, section_name in sections:
             # Split section into paragraphs if it's too large
-            if len(section_text.split()) > self.chunk_size:
-                section_chunks = self._split_into_paragraphs(section_text, section_name)
-                chunks.extend(section_chunks)
+            if index.word_count(start_pos, end_pos) > self.chunk_size:
+                chunks.extend(self._split_into_paragraphs(index, start_pos, end_pos, section_name))
             else:
-                chunks.append((section_text, section_name, "section"))
+                chunks.append(Chunk(index.text[start_pos:end_pos], section_name, "section", start_pos, end_pos))
         
         return chunks
     
-    def _split_into_paragraphs(self, text: str, section_name: str) -> List[Tuple[str, str, str]]:
+    def _split_into_paragraphs(
+        self, index: SegmentationIndex, start: int, end: int, section_name: str
+    ) -> List[Chunk]:
         """
-        Split text into paragraph-level chunks.
+        Split a span of the document into paragraph-level chunks.
         
         Args:
-            text: Text to split
+            index: Segmentation index of the document
+            start: Start offset of the span
+            end: End offset of the span
             section_name: Name of the section
             
         Returns:
-            List of (chunk_text, section_name, level) tuples
+            List of (chunk_text, section_name, level, start, end) chunks
         """
-        paragraphs = re.split(r'\n\s*\n', text)
         chunks = []
         
-        for i, para in enumerate(paragraphs):
-            if not para.strip():
-                continue
-                
+        for para in index.paragraphs(start, end):
             # Check if paragraph is too large
-            if len(para.split()) > self.chunk_size:
+            if index.word_count(*para) > self.chunk_size:
                 # Further split into sentences
-                sentences = sent_tokenize(para)
                 current_chunk = []
                 current_length = 0
                 
-                for sentence in sentences:
-                    sentence_length = len(sentence.split())
+                for sentence in index.sentences(*para):
+                    sentence_length = index.word_count(*sentence)
                     
                     if current_length + sentence_length > self.chunk_size and current_chunk:
                         # Add current chunk
-                        chunk_text = " ".join(current_chunk)
-                        chunks.append((chunk_text, section_name, "paragraph"))
+                        chunks.append(self._join_sentences(index, current_chunk, section_name, "paragraph"))
                         current_chunk = []
                         current_length = 0
                     
@@ -309,29 +529,28 @@ class MedicalDocumentProcessor:
                 
                 # Add final chunk if not empty
                 if current_chunk:
-                    chunk_text = " ".join(current_chunk)
-                    chunks.append((chunk_text, section_name, "paragraph"))
+                    chunks.append(self._join_sentences(index, current_chunk, section_name, "paragraph"))
             else:
-                chunks.append((para.strip(), section_name, "paragraph"))
+                chunks.append(Chunk(index.slice(para), section_name, "paragraph", *para))
         
         return chunks
     
-    def _create_sliding_window_chunks(self, text: str) -> List[Tuple[str, str, str]]:
+    def _create_sliding_window_chunks(self, index: SegmentationIndex) -> List[Chunk]:
         """
         Create overlapping chunks using a sliding window approach.
         
         Args:
-            text: Document text
+            index: Segmentation index of the document
             
         Returns:
-            List of (chunk_text, section_name, level) tuples
+            List of (chunk_text, section_name, level, start, end) chunks
         """
-        sentences = sent_tokenize(text)
+        sentences = index.sentences()
         chunks = []
         
         # If very few sentences, return as one chunk
         if len(sentences) <= 3:
-            return [(text, "full_document", "document")]
+            return [Chunk(index.text, "full_document", "document", 0, len(index.text))]
         
         # Calculate stride (number of sentences to slide window)
         stride = max(1, (self.chunk_size - self.chunk_overlap) // 20)  # Approximate words per sentence
@@ -340,115 +559,92 @@ class MedicalDocumentProcessor:
         for i in range(0, len(sentences), stride):
             # Determine end index for current window
             window_size = min(i + max(3, self.chunk_size // 20), len(sentences))
+            window = sentences[i:window_size]
             
-            # Get text for current window
-            window_text = " ".join(sentences[i:window_size])
-            
-            # Detect current section if possible
-            section_match = self.section_pattern.search(window_text)
-            section_name = section_match.group(0) if section_match else "sliding_window"
+            # Name the window after a header inside it, else the section it starts in
+            headers = index.headers_between(window[0][0], window[-1][1])
+            if headers:
+                section_name = headers[0].name
+            else:
+                section_name = index.section_name_at(window[0][0]) or "sliding_window"
             
-            chunks.append((window_text, section_name, "sliding"))
+            chunks.append(self._join_sentences(index, window, section_name, "sliding"))
         
         return chunks
     
-    def _create_recursive_chunks(self, text: str) -> List[Tuple[str, str, str]]:
+    def _create_recursive_chunks(self, index: SegmentationIndex, entity_index: SpanHitIndex) -> List[Chunk]:
         """
         Create hierarchical chunks at different levels of granularity.
         
         Args:
-            text: Document text
+            index: Segmentation index of the document
+            entity_index: Medical entity hits of the document
             
         Returns:
-            List of (chunk_text, section_name, level) tuples
+            List of (chunk_text, section_name, level, start, end) chunks
         """
+        text = index.text
         chunks = []
         
         # Level 1: Document-level chunk (if not too large)
-        if len(text.split()) <= self.chunk_size * 2:
-            chunks.append((text, "full_document", "document"))
+        if index.word_count() <= self.chunk_size * 2:
+            chunks.append(Chunk(text, "full_document", "document", 0, len(text)))
         
         # Level 2: Section-level chunks
-        section_matches = list(self.section_pattern.finditer(text))
+        sections = index.sections()
         
-        if section_matches:
-            for i in range(len(section_matches)):
-                start_pos = section_matches[i].start()
-                section_name = text[section_matches[i].start():section_matches[i].end()].strip()
-                
-                # Determine section end
-                if i < len(section_matches) - 1:
-                    end_pos = section_matches[i+1].start()
-                else:
-                    end_pos = len(text)
-                
-                section_text = text[start_pos:end_pos].strip()
-                
+        if sections:
+            for start_pos, end_pos, section_name in sections:
                 # Add section as a chunk
-                if section_text and len(section_text.split()) <= self.chunk_size:
-                    chunks.append((section_text, section_name, "section"))
+                if index.word_count(start_pos, end_pos) <= self.chunk_size:
+                    chunks.append(Chunk(text[start_pos:end_pos], section_name, "section", start_pos, end_pos))
                 
                 # Level 3: Paragraph-level chunks
-                paragraphs = re.split(r'\n\s*\n', section_text)
-                
-                for j, para in enumerate(paragraphs):
-                    if para.strip() and len(para.split()) <= self.chunk_size:
-                        chunks.append((para.strip(), section_name, "paragraph"))
+                for para in index.paragraphs(start_pos, end_pos):
+                    if index.word_count(*para) <= self.chunk_size:
+                        chunks.append(Chunk(index.slice(para), section_name, "paragraph", *para))
                     
                     # Level 4: Sentence-level chunks for important sentences
-                    if self._contains_important_entities(para):
-                        sentences = sent_tokenize(para)
-                        for sentence in sentences:
-                            if self._contains_important_entities(sentence):
-                                chunks.append((sentence.strip(), section_name, "sentence"))
+                    if entity_index.count_groups(*para):
+                        for sentence in index.sentences(*para):
+                            if entity_index.count_groups(*sentence):
+                                chunks.append(Chunk(index.slice(sentence), section_name, "sentence", *sentence))
         else:
             # No clear sections, fall back to paragraphs and sentences
-            paragraphs = re.split(r'\n\s*\n', text)
-            
-            for para in paragraphs:
-                if para.strip() and len(para.split()) <= self.chunk_size:
-                    chunks.append((para.strip(), "paragraph", "paragraph"))
+            for para in index.paragraphs():
+                if index.word_count(*para) <= self.chunk_size:
+                    chunks.append(Chunk(index.slice(para), "paragraph", "paragraph", *para))
         
         return chunks
     
-    def _create_hybrid_chunks(self, text: str, doc_type: str) -> List[Tuple[str, str, str]]:
+    def _create_hybrid_chunks(
+        self, index: SegmentationIndex, doc_type: str, entity_index: SpanHitIndex
+    ) -> List[Chunk]:
         """
         Create chunks using a hybrid approach that adapts to document type.
         
         Args:
-            text: Document text
+            index: Segmentation index of the document
             doc_type: Detected document type
+            entity_index: Medical entity hits of the document
             
         Returns:
-            List of (chunk_text, section_name, level) tuples
+            List of (chunk_text, section_name, level, start, end) chunks
         """
         chunks = []
         
         # First identify sections
-        section_matches = list(self.section_pattern.finditer(text))
+        sections = index.sections()
         
         # If the document has clear sections
-        if section_matches:
-            sections = []
-            
-            # Extract all sections
-            for i in range(len(section_matches)):
-                start_pos = section_matches[i].start()
-                section_name = text[section_matches[i].start():section_matches[i].end()].strip()
-                
-                # Determine section end
-                if i < len(section_matches) - 1:
-                    end_pos = section_matches[i+1].start()
-                else:
-                    end_pos = len(text)
-                
-                section_text = text[start_pos:end_pos].strip()
-                sections.append((section_text, section_name))
-            
+        if sections:
             # Process each section based on its content characteristics
-            for section_text, section_name in sections:
+            for start_pos, end_pos, section_name in sections:
+                section_text = index.text[start_pos:end_pos]
+                section_words = index.word_count(start_pos, end_pos)
+                
                 # Determine content complexity based on medical entity density
-                entity_density = len(self._extract_medical_entities(section_text)) / max(1, len(section_text.split()) / 100)
+                entity_density = entity_index.count_groups(start_pos, end_pos) / max(1, section_words / 100)
                 
                 # Adapt chunk size based on content complexity
                 adaptive_chunk_size = self.chunk_size
@@ -456,226 +652,526 @@ class MedicalDocumentProcessor:
                     adaptive_chunk_size = int(self.chunk_size * 0.7)  # Smaller chunks for dense content
                 
                 # If the section is a summary section (abstract, conclusion), keep it whole if possible
-                if re.search(r"(?i)(abstract|summary|conclusion)", section_name) and len(section_text.split()) <= adaptive_chunk_size:
-                    chunks.append((section_text, section_name, "key_section"))
+                if self.summary_section_pattern.search(section_name) and section_words <= adaptive_chunk_size:
+                    chunks.append(Chunk(section_text, section_name, "key_section", start_pos, end_pos))
                     continue
                 
                 # For other sections, split based on their size
-                if len(section_text.split()) <= adaptive_chunk_size:
-                    chunks.append((section_text, section_name, "section"))
+                if section_words <= adaptive_chunk_size:
+                    chunks.append(Chunk(section_text, section_name, "section", start_pos, end_pos))
                 else:
                     # Split into paragraphs or sentences as needed
-                    paragraphs = re.split(r'\n\s*\n', section_text)
+                    paragraphs = index.paragraphs(start_pos, end_pos)
                     
                     if len(paragraphs) <= 1 or doc_type == "clinical_note":
                         # For clinical notes or single-paragraph sections, use sentence-based chunking
-                        chunks.extend(self._chunk_by_sentences(section_text, section_name, adaptive_chunk_size))
+                        chunks.extend(self._chunk_by_sentences(
+                            index, index.sentences(start_pos, end_pos), section_name, adaptive_chunk_size
+                        ))
                     else:
                         # For multi-paragraph sections, process each paragraph
                         for para in paragraphs:
-                            if not para.strip():
-                                continue
-                                
-                            if len(para.split()) <= adaptive_chunk_size:
-                                chunks.append((para.strip(), section_name, "paragraph"))
+                            if index.word_count(*para) <= adaptive_chunk_size:
+                                chunks.append(Chunk(index.slice(para), section_name, "paragraph", *para))
                             else:
                                 # For long paragraphs, split by sentences
-                                chunks.extend(self._chunk_by_sentences(para, section_name, adaptive_chunk_size))
+                                chunks.extend(self._chunk_by_sentences(
+                                    index, index.sentences(*para), section_name, adaptive_chunk_size
+                                ))
         else:
             # For documents without clear sections, use a mix of paragraph and sliding window
             if doc_type in ["clinical_note", "patient_record"]:
                 # Clinical notes often have implicit structure without formal headers
-                chunks.extend(self._create_sliding_window_chunks(text))
+                chunks.extend(self._create_sliding_window_chunks(index))
             else:
                 # For other types, try paragraph-based chunking
-                paragraphs = re.split(r'\n\s*\n', text)
+                paragraphs = index.paragraphs()
                 
                 if len(paragraphs) <= 1:
                     # If it's essentially one big paragraph, use sliding window
-                    chunks.extend(self._create_sliding_window_chunks(text))
+                    chunks.extend(self._create_sliding_window_chunks(index))
                 else:
                     # Process each paragraph
                     for para in paragraphs:
-                        if not para.strip():
-                            continue
-                            
-                        if len(para.split()) <= self.chunk_size:
-                            chunks.append((para.strip(), "paragraph", "paragraph"))
+                        if index.word_count(*para) <= self.chunk_size:
+                            chunks.append(Chunk(index.slice(para), "paragraph", "paragraph", *para))
                         else:
                             # For long paragraphs, use sentence chunking
-                            chunks.extend(self._chunk_by_sentences(para, "paragraph", self.chunk_size))
+                            chunks.extend(self._chunk_by_sentences(
+                                index, index.sentences(*para), "paragraph", self.chunk_size
+                            ))
         
         return chunks
     
-    def _chunk_by_sentences(self, text: str, section_name: str, chunk_size: int) -> List[Tuple[str, str, str]]:
+    def _chunk_by_sentences(
+        self, index: SegmentationIndex, sentences: List[Span], section_name: str, chunk_size: int
+    ) -> List[Chunk]:
         """
         Create chunks by grouping sentences while respecting chunk size.
         
         Args:
-            text: Text to chunk
+            index: Segmentation index of the document
+            sentences: Sentence spans to group
             section_name: Name of the section
             chunk_size: Maximum chunk size in words
             
         Returns:
-            List of (chunk_text, section_name, level) tuples
+            List of (chunk_text, section_name, level, start, end) chunks
         """
-        sentences = sent_tokenize(text)
         chunks = []
         current_chunk = []
+        current_lengths = []
         current_length = 0
         
         for sentence in sentences:
-            sentence_words = sentence.split()
-            sentence_length = len(sentence_words)
+            sentence_length = index.word_count(*sentence)
             
             # If adding this sentence exceeds chunk size and we already have content
             if current_length + sentence_length > chunk_size and current_chunk:
                 # Save current chunk
-                chunk_text = " ".join(current_chunk)
-                chunks.append((chunk_text, section_name, "sentences"))
+                chunks.append(self._join_sentences(index, current_chunk, section_name, "sentences"))
                 
                 # Start new chunk with overlap
                 # Find a good overlap point that doesn't split mid-thought
                 overlap_sentences = min(2, len(current_chunk))
                 current_chunk = current_chunk[-overlap_sentences:]
-                current_length = len(" ".join(current_chunk).split())
+                current_lengths = current_lengths[-overlap_sentences:]
+                current_length = sum(current_lengths)
             
             # Add sentence to current chunk
             current_chunk.append(sentence)
+            current_lengths.append(sentence_length)
             current_length += sentence_length
         
         # Add final chunk if not empty
         if current_chunk:
-            chunk_text = " ".join(current_chunk)
-            chunks.append((chunk_text, section_name, "sentences"))
+            chunks.append(self._join_sentences(index, current_chunk, section_name, "sentences"))
         
         return chunks
     
-    def _contains_important_entities(self, text: str) -> bool:
-        """
-        Check if text contains important medical entities.
-        
-        Args:
-            text: Text to check
-            
-        Returns:
-            Boolean indicating presence of important entities
-        """
-        entities = self._extract_medical_entities(text)
-        return len(entities) > 0
+    @staticmethod
+    def _join_sentences(index: SegmentationIndex, sentences: List[Span], section_name: str, level: str) -> Chunk:
+        """Join consecutive sentence spans into one chunk covering all of them."""
+        text = " ".join(index.text[start:end] for start, end in sentences)
+        return Chunk(text, section_name, level, sentences[0][0], sentences[-1][1])
     
-    def _calculate_chunk_importance(self, text: str, position: int, total_chunks: int) -> float:
+    @staticmethod
+    def _score_chunk_importance(
+        chunks: List[Chunk],
+        word_counts: np.ndarray,
+        entity_index: SpanHitIndex,
+        keyword_index: SpanHitIndex,
+    ) -> np.ndarray:
         """
-        Calculate importance score for a chunk based on various factors.
+        Calculate importance scores for all chunks of a document.
         
         Args:
-            text: Chunk text
-            position: Position in document
-            total_chunks: Total number of chunks
+            chunks: Chunks in document order
+            word_counts: Word count of each chunk
+            entity_index: Medical entity hits of the document
+            keyword_index: Importance keyword hits of the document, grouped by keyword
             
         Returns:
-            Importance score between 0 and 1
+            Array of importance scores between 0 and 1
         """
-        # Extract entities and count them
-        entities = self._extract_medical_entities(text)
-        entity_count = len(entities)
+        total_chunks = len(chunks)
+        if total_chunks == 0:
+            return np.zeros(0)
+        starts = np.array([chunk.start for chunk in chunks], dtype=np.int64)
+        ends = np.array([chunk.end for chunk in chunks], dtype=np.int64)
         
-        # Calculate entity density
-        word_count = len(text.split())
-        entity_density = entity_count / max(1, word_count / 100)
+        # Entity density: number of entity categories present per 100 words
+        entity_counts = entity_index.count_groups_bulk(starts, ends)
+        entity_density = entity_counts / np.maximum(1, word_counts / 100)
         
         # Position importance - first and last chunks often contain key information
-        position_score = 0.0
-        if position == 0 or position == total_chunks - 1:
-            position_score = 0.2
-        elif position < total_chunks * 0.2 or position > total_chunks * 0.8:
-            position_score = 0.1
-        
-        # Check for important keywords
-        keyword_score = 0.0
-        important_keywords = ["significant", "important", "critical", "essential", "key", 
-                             "finding", "diagnosis", "recommend", "conclude", "summary"]
-        for keyword in important_keywords:
-            if re.search(r"\b" + re.escape(keyword) + r"\b", text, re.IGNORECASE):
-                keyword_score += 0.05
-        keyword_score = min(0.2, keyword_score)
+        position = np.arange(total_chunks)
+        position_score = np.where(
+            (position == 0) | (position == total_chunks - 1),
+            0.2,
+            np.where((position < total_chunks * 0.2) | (position > total_chunks * 0.8), 0.1, 0.0),
+        )
+        
+        # Important keywords, 0.05 for each distinct keyword present
+        keyword_score = np.minimum(0.2, keyword_index.count_groups_bulk(starts, ends) * 0.05)
         
         # Combine scores
-        importance_score = min(1.0, 0.3 * entity_density + position_score + keyword_score)
+        return np.minimum(1.0, 0.3 * entity_density + position_score + keyword_score)
+    
+    def _commit_document(self, key: str, doc_id: str, chunks: List[Dict[str, Any]]):
+        """
+        Record a document whose chunks are stored, and make them canonical for deduplication.
         
-        return importance_score
+        Its dropped duplicates are saved now, and earlier versions of the
+        document (same manifest key, or same source) are removed from the
+        chunk store and the manifest and stop being canonical. Other documents
+        with chunks dropped as duplicates of theirs are removed from the
+        manifest, so the next run processes them again and embeds that text.
+        
+        Args:
+            key: Manifest key of the document
+            doc_id: Document identifier
+            chunks: The document's stored chunks
+        """
+        dropped = self._pending_duplicates.pop(doc_id, [])
+        if dropped:
+            self._save_processed_chunks(doc_id, dropped)
+        source = next((c["metadata"].get("source") for c in chunks + dropped if c.get("metadata")), None)
+        for previous in self.manifest.previous_doc_ids(key, source, doc_id):
+            removed = self.chunk_store.remove_document(previous)
+            self.manifest.remove_document(previous)
+            self.logger.info(f"Document {doc_id} supersedes {previous} ({removed} chunk(s) removed)")
+            if self.deduplicator is None:
+                continue
+            for dependent in self.deduplicator.forget_document(previous):
+                if dependent != doc_id:
+                    self.manifest.remove_document(dependent)
+                    self.logger.warning(
+                        f"Document {dependent} had duplicates of {previous}; it will be re-processed on the next run"
+                    )
+        if self.deduplicator is not None:
+            self.deduplicator.register(doc_id)
+        self.manifest.record(key, doc_id, len(chunks), self.embedding_model_id, source=source)
     
-    def _extract_medical_entities(self, text: str) -> Dict[str, List[str]]:
+    def _abandon_document(self, doc_id: str):
+        """Forget the deduplication state of a document that failed before its chunks were stored."""
+        self._pending_duplicates.pop(doc_id, None)
+        if self.deduplicator is not None:
+            self.deduplicator.discard(doc_id)
+    
+    def _drop_duplicates(self, key: str, doc_id: str, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
-        Extract medical entities from text by category.
+        Remove chunks duplicating already indexed text before they are embedded.
+        
+        Dropped chunks are saved to the chunk store without an embedding,
+        their metadata pointing at the canonical chunk ("duplicate_of"), once
+        the kept chunks are stored (see ``_commit_document``). Kept chunks'
+        ``previous_chunk_id`` / ``next_chunk_id`` are relinked to their kept
+        neighbours, so they never point at a chunk missing from the
+        collection; ``chunk_number`` and ``total_chunks`` still count every
+        chunk of the document. Earlier versions of the document are not
+        canonical, since ``_commit_document`` removes them.
         
         Args:
-            text: Input text
+            key: Manifest key of the document
+            doc_id: Document identifier
+            chunks: Processed chunks without embeddings
             
         Returns:
-            Dictionary of categorized medical entities
+            The chunks that still need embedding
         """
-        categorized_entities = {}
-        
-        for category, pattern in self.medical_entity_categories.items():
-            category_pattern = re.compile(pattern)
-            matches = set(m.group(0).lower() for m in category_pattern.finditer(text))
-            if matches:
-                categorized_entities[category] = list(matches)
-        
-        return categorized_entities
+        if self.deduplicator is None:
+            return chunks
+        source = next((c["metadata"].get("source") for c in chunks if c.get("metadata")), None)
+        supersedes = self.manifest.previous_doc_ids(key, source, doc_id)
+        kept, dropped = self.deduplicator.deduplicate(doc_id, chunks, supersedes)
+        if dropped:
+            self._pending_duplicates[doc_id] = dropped
+            for i, chunk in enumerate(kept):
+                metadata = dict(chunk["metadata"])
+                metadata.pop("previous_chunk_id", None)
+                metadata.pop("next_chunk_id", None)
+                if i > 0:
+                    metadata["previous_chunk_id"] = kept[i - 1]["id"]
+                if i < len(kept) - 1:
+                    metadata["next_chunk_id"] = kept[i + 1]["id"]
+                chunk["metadata"] = metadata
+        return kept
     
-    def _save_processed_chunks(self, doc_id: str, chunks: List[Dict[str, Any]]):
+    def _save_processed_chunks(self, doc_id: str, chunks: List[Dict[str, Any]]) -> bool:
         """
-        Save processed chunks to disk for potential reuse.
+        Append processed chunks, with their embeddings, to the chunk store.
         
         Args:
             doc_id: Document identifier
             chunks: List of processed chunks
+            
+        Returns:
+            True if the chunks were saved
         """
         try:
-            # Create filename
-            filename = f"{doc_id}_processed.json"
-            filepath = self.processed_docs_dir / filename
-            
-            # Save chunks without embeddings (to save space)
-            chunks_without_embeddings = []
-            for chunk in chunks:
-                chunk_copy = chunk.copy()
-                # Remove embedding as it's large and can be regenerated
-                del chunk_copy["embedding"]
-                chunks_without_embeddings.append(chunk_copy)
-            
-            with open(filepath, 'w') as f:
-                json.dump(chunks_without_embeddings, f)
-            
-            self.logger.info(f"Saved processed chunks to {filepath}")
+            self.chunk_store.append(chunks, doc_id=doc_id)
+            self.logger.info(f"Saved {len(chunks)} processed chunk(s) of {doc_id} to {self.chunk_store.directory}")
+            return True
         except Exception as e:
             self.logger.warning(f"Failed to save processed chunks: {e}")
+            return False
     
-    def batch_process_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _load_processed_chunks(self, doc_id: str, embedding_model_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Load a document's chunks from the chunk store of the model that embedded them.
+        
+        Args:
+            doc_id: Document identifier
+            embedding_model_id: Embedding model the chunks were saved with
+            
+        Returns:
+            Chunks with "embedding" set to None, or None if unreadable
+        """
+        try:
+            store = self._open_chunk_store(embedding_model_id)
+            return [
+                {"id": record["id"], "content": record["content"], "embedding": None, "metadata": record["metadata"]}
+                for record in store.get_document(doc_id)
+                # Duplicates were never embedded; they stay in the old model's store
+                if "duplicate_of" not in record["metadata"]
+            ]
+        except Exception as e:
+            self.logger.warning(f"Failed to load processed chunks of {doc_id}: {e}")
+            return None
+    
+    def _open_chunk_store(self, embedding_model_id: str) -> ChunkStore:
+        """
+        Chunk store holding the chunks embedded with one model.
+        
+        Args:
+            embedding_model_id: Embedding model identifier
+            
+        Returns:
+            The store under processed_docs_dir/chunk_store/<model>
+        """
+        if getattr(self, "chunk_store", None) is not None and embedding_model_id == self.embedding_model_id:
+            return self.chunk_store
+        store_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", embedding_model_id)
+        return ChunkStore(self.processed_docs_dir / "chunk_store" / store_name, dtype=self.chunk_store_dtype)
+    
+    def export_chunks(self, batch_size: Optional[int] = None) -> Iterator[Any]:
+        """
+        Yield every stored chunk with its embedding, ready for QdrantRetriever.upsert_documents.
+        
+        Rebuilding a collection this way reads local disk instead of re-embedding.
+        
+        Args:
+            batch_size: If set, yield lists of up to this many chunks instead
+        """
+        return self.chunk_store.iter_documents(batch_size=batch_size)
+    
+    def batch_process_documents(
+        self, documents: List[Dict[str, Any]], force: bool = False, workers: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """
         Process a batch of documents.
         
+        Chunks from all documents are embedded together so requests are
+        packed across document boundaries. Unchanged documents are skipped
+        as in ``process_document``. With more than one worker, chunking runs
+        in a process pool while embedding overlaps it on a thread pool.
+        
         Args:
             documents: List of dictionaries with 'content' and 'metadata' keys
+            force: Re-process every document even if the manifest has it
+            workers: Worker processes for chunking (default: config.rag.processing_workers)
             
         Returns:
-            List of processed document chunks with embeddings
+            List of processed document chunks with embeddings, in document order
         """
-        all_processed_chunks = []
+        workers = workers or self.processing_workers
+        if workers > 1 and len(documents) > 1:
+            return self._batch_process_parallel(documents, force, workers)
+        
+        planned = []
         
         for doc in documents:
             try:
-                processed_chunks = self.process_document(doc["content"], doc["metadata"])
-                all_processed_chunks.extend(processed_chunks)
+                plan = self._plan_document(doc["content"], doc["metadata"], force)
+                if plan is not None:
+                    planned.append(plan)
             except Exception as e:
                 self.logger.error(f"Error processing document: {e}")
                 # Continue with the next document
                 continue
         
+        all_processed_chunks = [
+            chunk
+            for chunks in self._finish_documents(planned, self._embed_and_save(planned))
+            if chunks is not None
+            for chunk in chunks
+        ]
+        
+        self.manifest.save()
+        self.logger.info(
+            f"Processed {len(planned)} of {len(documents)} document(s); the rest were unchanged or failed"
+        )
         return all_processed_chunks
     
+    def _batch_process_parallel(
+        self, documents: List[Dict[str, Any]], force: bool, workers: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Process documents with chunking on a process pool and embedding on threads.
+        
+        At most ``2 * workers`` documents are being chunked or embedded at
+        any time. Chunked documents are grouped until the group fills an
+        embedding request (or nothing else is being chunked), and each group
+        is embedded with one ``embed`` call, so requests are packed across
+        document boundaries as in the serial path. The I/O threads only embed
+        and save; documents are recorded in the manifest and the deduplication
+        index here, on the calling thread, as their groups complete. A failing
+        document is logged and dropped without affecting the others.
+        
+        Args:
+            documents: List of dictionaries with 'content' and 'metadata' keys
+            force: Re-process every document even if the manifest has it
+            workers: Number of worker processes
+            
+        Returns:
+            List of processed document chunks with embeddings, in document order
+        """
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(documents)
+        max_in_flight = workers * 2
+        # Resolve punkt once here rather than racing to download it in every worker
+        _get_sentence_tokenizer()
+        cpu_futures: Dict[Future, Tuple[int, str]] = {}
+        io_futures: Dict[Future, Tuple[List[int], List[Tuple[str, str, List[Dict[str, Any]]]]]] = {}
+        # Documents ready for embedding, not yet handed to the I/O stage
+        ready: List[Tuple[int, Tuple[str, str, List[Dict[str, Any]]]]] = []
+        pending_docs = iter(enumerate(documents))
+        exhausted = False
+        
+        def in_flight() -> int:
+            return len(cpu_futures) + len(ready) + sum(len(indices) for indices, _ in io_futures.values())
+        
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(self,)
+        ) as cpu_pool, ThreadPoolExecutor(max_workers=self.embedder.max_concurrency) as io_pool:
+            while True:
+                # Feed the process pool while there is room in the pipeline
+                while not exhausted and in_flight() < max_in_flight:
+                    next_doc = next(pending_docs, None)
+                    if next_doc is None:
+                        exhausted = True
+                        break
+                    index, doc = next_doc
+                    try:
+                        key, status, saved = self._check_manifest(doc["content"], force)
+                        if status == "reembed":
+                            ready.append((index, (key, *saved)))
+                        elif status == "process":
+                            future = cpu_pool.submit(_prepare_in_worker, doc["content"], doc["metadata"])
+                            cpu_futures[future] = (index, key)
+                    except Exception as e:
+                        self.logger.error(f"Error processing document: {e}")
+                
+                # Hand a group to the I/O stage once it fills a request, or when
+                # waiting for more chunked documents is not possible
+                ready_chunks = sum(len(plan[2]) for _, plan in ready)
+                if ready and (ready_chunks >= self.embedder.max_batch_size or not cpu_futures):
+                    group = [plan for _, plan in ready]
+                    io_futures[io_pool.submit(self._embed_and_save, group)] = ([index for index, _ in ready], group)
+                    ready = []
+                
+                if not cpu_futures and not io_futures:
+                    break
+                
+                done, _ = wait(list(cpu_futures) + list(io_futures), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in cpu_futures:
+                        index, key = cpu_futures.pop(future)
+                        try:
+                            doc_id, chunks = future.result()
+                        except Exception as e:
+                            self.logger.error(f"Error processing document: {e}")
+                            continue
+                        try:
+                            chunks = self._drop_duplicates(key, doc_id, chunks)
+                        except Exception as e:
+                            self.logger.error(f"Error processing document: {e}")
+                            continue
+                        ready.append((index, (key, doc_id, chunks)))
+                    else:
+                        indices, group = io_futures.pop(future)
+                        for index, chunks in zip(indices, self._finish_documents(group, future.result())):
+                            results[index] = chunks
+        
+        self.manifest.save()
+        processed = [chunks for chunks in results if chunks is not None]
+        self.logger.info(
+            f"Processed {len(processed)} of {len(documents)} document(s) with {workers} workers; "
+            f"the rest were unchanged or failed"
+        )
+        return [chunk for chunks in processed for chunk in chunks]
+    
+    def _embed_and_save(
+        self, planned: List[Tuple[str, str, List[Dict[str, Any]]]]
+    ) -> List[Optional[List[Dict[str, Any]]]]:
+        """
+        Embed the chunks of several documents together and save each document's chunks.
+        
+        If the combined request fails, documents are retried one at a time so
+        a bad document only drops itself. Safe to run on I/O threads: the
+        manifest and deduplication state are left to ``_finish_documents``.
+        
+        Args:
+            planned: Tuples of (manifest key, document ID, chunks without embeddings)
+            
+        Returns:
+            Per document, its stored chunks with embeddings attached, or None if it failed
+        """
+        try:
+            all_embeddings = self.embedder.embed([chunk["content"] for _, _, chunks in planned for chunk in chunks])
+        except Exception as e:
+            if len(planned) == 1:
+                self.logger.error(f"Error processing document: {e}")
+                return [None]
+            self.logger.warning(f"Batched embedding failed ({e}); retrying per document")
+            all_embeddings = None
+        
+        results: List[Optional[List[Dict[str, Any]]]] = []
+        offset = 0
+        
+        for _, doc_id, chunks in planned:
+            try:
+                if all_embeddings is not None:
+                    embeddings = all_embeddings[offset:offset + len(chunks)]
+                else:
+                    embeddings = self.embedder.embed([chunk["content"] for chunk in chunks])
+                self._attach_embeddings(chunks, embeddings)
+                results.append(chunks if self._save_processed_chunks(doc_id, chunks) else None)
+            except Exception as e:
+                self.logger.error(f"Error processing document: {e}")
+                results.append(None)
+            finally:
+                offset += len(chunks)
+        
+        return results
+    
+    def _finish_documents(
+        self,
+        planned: List[Tuple[str, str, List[Dict[str, Any]]]],
+        stored: List[Optional[List[Dict[str, Any]]]],
+    ) -> List[Optional[List[Dict[str, Any]]]]:
+        """
+        Record the documents ``_embed_and_save`` stored, and abandon the others.
+        
+        Args:
+            planned: Tuples of (manifest key, document ID, chunks) passed to ``_embed_and_save``
+            stored: Its result, per document
+            
+        Returns:
+            ``stored``, with None for documents that could not be recorded
+        """
+        results: List[Optional[List[Dict[str, Any]]]] = []
+        for (key, doc_id, _), chunks in zip(planned, stored):
+            if chunks is None:
+                self._abandon_document(doc_id)
+                results.append(None)
+                continue
+            try:
+                self._commit_document(key, doc_id, chunks)
+                results.append(chunks)
+            except Exception as e:
+                self.logger.error(f"Error processing document: {e}")
+                self._abandon_document(doc_id)
+                results.append(None)
+        return results
+    
+    def __getstate__(self):
+        # Worker processes only chunk; embedding and the manifest stay in the parent
+        state = self.__dict__.copy()
+        for attr in ("embedding_model", "embedder", "manifest", "chunk_store", "deduplicator"):
+            state[attr] = None
+        return state
+    
     def make_serializable(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Ensure all metadata values can be serialized to JSON."""
 
@@ -687,3 +1183,31 @@ class MedicalDocumentProcessor:
             except TypeError:
                 serializable_metadata[key] = str(value)
         return serializable_metadata
+
+
+# Process-pool workers hold one copy of the processor, sent once at start-up
+_worker_processor: Optional[MedicalDocumentProcessor] = None
+
+
+def _init_worker(processor: MedicalDocumentProcessor):
+    global _worker_processor
+    _worker_processor = processor
+
+
+def _prepare_in_worker(content: str, metadata: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+    return _worker_processor._prepare_document(content, metadata)
+
+
+def _batched(items: Iterable[Any], batch_size: Optional[int]) -> Iterator[Any]:
+    """Yield items one by one, or as lists of up to ``batch_size`` if given."""
+    if not batch_size:
+        yield from items
+        return
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,114 @@
+# file: my_rag_app/embedding_pipeline.py
+"""
+Batched embedding stage for document ingestion.
+
+Packs chunk texts into requests bounded by input count and token count,
+sends several requests at once within the configured rate limits and
+reassembles the vectors in input order. Texts already in the shared
+embedding cache are not sent at all.
+"""
+
+from typing import Callable, List, Optional
+
+from shared.embedding_cache import EmbeddingCache, get_embedding_cache
+from shared.embedding_client import (
+    DEFAULT_MAX_BATCH_SIZE,
+    DEFAULT_MAX_BATCH_TOKENS,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MAX_RETRIES,
+    EmbeddingClient,
+    RateLimiter,
+)
+
+
+def embedding_cache_from_config(config) -> Optional[EmbeddingCache]:
+    """Shared embedding cache per the optional ``config.rag.embedding_cache_*`` settings."""
+    if not getattr(config.rag, "embedding_cache_enabled", True):
+        return None
+    return get_embedding_cache(
+        getattr(config.rag, "embedding_cache_dir", None),
+        getattr(config.rag, "embedding_cache_memory_items", None),
+        getattr(config.rag, "embedding_cache_max_bytes", None),
+    )
+
+
+def get_model_id(embedding_model) -> str:
+    """Identifier of an embedding model object, used to key caches and stores."""
+    return (
+        getattr(embedding_model, "model", None)
+        or getattr(embedding_model, "model_name", None)
+        or type(embedding_model).__name__
+    )
+
+
+class EmbeddingBatcher(EmbeddingClient):
+    """
+    Embeds many texts with as few, concurrent requests as the provider allows.
+    """
+
+    def __init__(
+        self,
+        embedding_model,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        token_counter: Optional[Callable[[str], int]] = None,
+        cache: Optional[EmbeddingCache] = None,
+        model_id: Optional[str] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ):
+        """
+        Args:
+            embedding_model: Object exposing ``embed_documents(List[str])``
+            max_batch_size: Maximum number of inputs per request
+            max_batch_tokens: Maximum total tokens per request
+            max_concurrency: Number of requests in flight at once
+            token_counter: Callable returning the token count of a text
+            cache: Embedding cache consulted before calling the model (None: no caching)
+            model_id: Embedding model identifier used in cache keys
+            rate_limiter: Shared TPM/RPM budget (None: unlimited)
+            max_retries: Retries per request on rate limits and transient errors
+        """
+        super().__init__(
+            embedding_model.embed_documents,
+            max_batch_size=max_batch_size,
+            max_batch_tokens=max_batch_tokens,
+            max_concurrency=max_concurrency,
+            rate_limiter=rate_limiter,
+            max_retries=max_retries,
+            token_counter=token_counter,
+        )
+        self.embedding_model = embedding_model
+        self.cache = cache
+        self.model_id = model_id or get_model_id(embedding_model)
+
+    @classmethod
+    def from_config(cls, config, embedding_model) -> "EmbeddingBatcher":
+        """Build a batcher from the optional ``config.rag.embedding_*`` settings."""
+        tpm = getattr(config.rag, "embedding_tokens_per_minute", None)
+        rpm = getattr(config.rag, "embedding_requests_per_minute", None)
+        # In-process models parallelize internally; concurrent calls would only contend
+        remote = getattr(embedding_model, "remote", True)
+        return cls(
+            embedding_model,
+            max_batch_size=getattr(config.rag, "embedding_batch_size", DEFAULT_MAX_BATCH_SIZE),
+            max_batch_tokens=getattr(config.rag, "embedding_batch_tokens", DEFAULT_MAX_BATCH_TOKENS),
+            max_concurrency=getattr(config.rag, "embedding_concurrency", DEFAULT_MAX_CONCURRENCY) if remote else 1,
+            cache=embedding_cache_from_config(config),
+            rate_limiter=RateLimiter(tpm, rpm) if tpm or rpm else None,
+            max_retries=getattr(config.rag, "embedding_max_retries", DEFAULT_MAX_RETRIES),
+        )
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed ``texts`` and return one vector per text, in input order.
+
+        Raises the first provider error that retries could not resolve.
+        """
+        if not texts:
+            return []
+        if self.cache is not None:
+            return self.cache.embed(self.model_id, texts, super().embed)
+        return super().embed(texts)
+
@@ -0,0 +1,91 @@
+# file: my_rag_app/ingest_manifest.py
+"""
+Manifest of documents already processed by MedicalDocumentProcessor.
+
+Entries are keyed by content hash plus the chunking settings that produced
+them, and remember which embedding model the saved chunks were embedded
+with. The manifest is a single JSON file next to the chunk store.
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+
+class IngestManifest:
+    """
+    Tracks processed documents so unchanged ones can be skipped on re-runs.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Args:
+            path: Location of the manifest JSON file (created on first save)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._by_source: Dict[str, str] = {}   # source -> doc_id of its latest version
+        self._dirty = False
+
+        if self.path.exists():
+            try:
+                with open(self.path) as f:
+                    self.entries = json.load(f).get("documents", {})
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+        for entry in sorted(self.entries.values(), key=lambda e: e.get("updated_at", "")):
+            if entry.get("source"):
+                self._by_source[entry["source"]] = entry["doc_id"]
+
+    @staticmethod
+    def make_key(content_hash: str, chunking_strategy: str, chunk_size: int, chunk_overlap: int) -> str:
+        """Key identifying one document chunked with one set of parameters."""
+        return f"{content_hash}:{chunking_strategy}:{chunk_size}:{chunk_overlap}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the entry for ``key``, or None if the document was never processed."""
+        return self.entries.get(key)
+
+    def record(
+        self, key: str, doc_id: str, num_chunks: int, embedding_model: str, source: Optional[str] = None
+    ):
+        """Add or replace the entry for ``key``. Call ``save()`` to persist."""
+        self.entries[key] = {
+            "doc_id": doc_id,
+            "num_chunks": num_chunks,
+            "embedding_model": embedding_model,
+            "source": source,
+            "updated_at": datetime.now().isoformat(),
+        }
+        if source:
+            self._by_source[source] = doc_id
+        self._dirty = True
+
+    def previous_doc_ids(self, key: str, source: Optional[str], doc_id: str) -> List[str]:
+        """
+        Document IDs that ``doc_id`` supersedes: the one recorded under the same
+        key, and the latest earlier version from the same source.
+        """
+        entry = self.entries.get(key)
+        candidates = {entry["doc_id"] if entry else None, self._by_source.get(source) if source else None}
+        return sorted(d for d in candidates if d is not None and d != doc_id)
+
+    def remove_document(self, doc_id: str):
+        """Drop every entry of ``doc_id``, so its content is processed again if it reappears."""
+        for key in [key for key, entry in self.entries.items() if entry["doc_id"] == doc_id]:
+            del self.entries[key]
+            self._dirty = True
+
+    def save(self):
+        """Write the manifest atomically if anything changed."""
+        if not self._dirty:
+            return
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"documents": self.entries}, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
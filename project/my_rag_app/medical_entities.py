@@ -0,0 +1,251 @@
+# file: my_rag_app/medical_entities.py
+"""
+Dictionary-based medical entity extraction.
+
+Terms are compiled once into a token trie, so a text is scanned in a single
+pass regardless of how many terms the vocabulary holds. Matching is
+case-insensitive and only reports whole-word hits.
+
+Extra vocabularies can be loaded from a file, either
+
+  * TSV: one ``category<TAB>term`` per line, ``#`` starts a comment, or
+  * JSON: ``{"category": ["term", ...], ...}``.
+"""
+
+import json
+import logging
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Words, plus single punctuation marks so terms like "covid-19" or "hiv/aids"
+# are matched token by token.
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# Built-in vocabulary. A proper medical NER model would replace this in production.
+DEFAULT_MEDICAL_TERMS: Dict[str, List[str]] = {
+    "diseases": [
+        "diabetes", "hypertension", "cancer", "asthma", "covid-19", "stroke",
+        "alzheimer's", "parkinson's", "arthritis", "obesity", "heart disease", "hepatitis",
+        "influenza", "pneumonia", "tuberculosis", "hiv/aids", "malaria", "cholera",
+        "diabetes mellitus", "chronic kidney disease", "copd",
+    ],
+    "medications": [
+        "aspirin", "ibuprofen", "acetaminophen", "lisinopril", "metformin",
+        "atorvastatin", "omeprazole", "amoxicillin", "prednisone", "insulin",
+        "albuterol", "levothyroxine", "warfarin", "clopidogrel", "metoprolol",
+    ],
+    "procedures": [
+        "surgery", "biopsy", "endoscopy", "colonoscopy", "mri", "ct scan", "x-ray",
+        "ultrasound", "echocardiogram", "ekg", "ecg", "angiography", "mammography",
+        "vaccination", "immunization", "blood test", "urinalysis",
+    ],
+    "anatomy": [
+        "heart", "lung", "liver", "kidney", "brain", "stomach", "intestine", "colon",
+        "pancreas", "spleen", "thyroid", "adrenal", "pituitary", "bone", "muscle", "nerve",
+        "artery", "vein", "capillary", "joint", "skin",
+    ],
+}
+
+
+class EntityHit(NamedTuple):
+    """A single vocabulary match; ``start``/``end`` are offsets into the scanned text."""
+    category: str
+    term: str
+    start: int
+    end: int
+
+
+class MedicalEntityExtractor:
+    """
+    Scans text for vocabulary terms in one pass over its tokens.
+    """
+
+    # Key under which a trie node stores the (category, term) pairs ending there
+    _TERMINAL = ""
+
+    def __init__(self, terms: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        Args:
+            terms: Mapping of category -> terms; defaults to DEFAULT_MEDICAL_TERMS
+        """
+        self._trie: Dict[str, dict] = {}
+        self.categories: List[str] = []
+        self.term_count = 0
+        self.add_terms(DEFAULT_MEDICAL_TERMS if terms is None else terms)
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path], include_defaults: bool = True) -> "MedicalEntityExtractor":
+        """Build an extractor from a TSV or JSON vocabulary file."""
+        extractor = cls(DEFAULT_MEDICAL_TERMS if include_defaults else {})
+        extractor.add_terms(load_term_file(path))
+        return extractor
+
+    def add_terms(self, terms: Dict[str, Iterable[str]]):
+        """Add terms to the vocabulary. Empty terms are ignored."""
+        for category, category_terms in terms.items():
+            if category not in self.categories:
+                self.categories.append(category)
+            for term in category_terms:
+                term = " ".join(term.lower().split())
+                tokens = _TOKEN_RE.findall(term)
+                if not tokens:
+                    continue
+                node = self._trie
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                entries = node.setdefault(self._TERMINAL, [])
+                if (category, term) not in entries:
+                    entries.append((category, term))
+                    self.term_count += 1
+
+    def scan(self, text: str) -> List[EntityHit]:
+        """
+        Return every vocabulary hit in ``text``, ordered by start offset.
+
+        Overlapping hits are all reported ("diabetes" and "diabetes mellitus"),
+        so the hits inside any span of the text are exactly the hits a scan
+        of that span alone would return.
+        """
+        lowered = _lower_preserving_offsets(text)
+        tokens: List[Tuple[str, int, int]] = [
+            (m.group(), m.start(), m.end()) for m in _TOKEN_RE.finditer(lowered)
+        ]
+        hits: List[EntityHit] = []
+        trie, terminal = self._trie, self._TERMINAL
+
+        for i, (token, start, _) in enumerate(tokens):
+            node = trie.get(token)
+            j = i
+            while node is not None:
+                entries = node.get(terminal)
+                if entries:
+                    end = tokens[j][2]
+                    surface = lowered[start:end]
+                    for category, term in entries:
+                        # Tokens match; also require the same spacing as the term
+                        if surface == term:
+                            hits.append(EntityHit(category, term, start, end))
+                j += 1
+                if j >= len(tokens):
+                    break
+                node = node.get(tokens[j][0])
+
+        return hits
+
+    def extract(self, text: str, categories: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+        """
+        Return the distinct terms found in ``text``, grouped by category.
+
+        Args:
+            text: Input text
+            categories: Only report these categories (default: all)
+        """
+        return group_hits(self.scan(text), categories)
+
+
+class SpanHitIndex:
+    """
+    Answers "which groups have a hit inside this span?" for hits from one scan.
+
+    Lets callers scan a document once and then query any number of its
+    chunks, sections or sentences by offset instead of re-scanning them.
+    """
+
+    def __init__(self, hits: Iterable[EntityHit], group_by: str = "category"):
+        """
+        Args:
+            hits: Hits from a single ``scan`` of the document
+            group_by: Hit field that defines a group ("category" or "term")
+        """
+        grouped: Dict[str, List[EntityHit]] = {}
+        for hit in hits:
+            grouped.setdefault(getattr(hit, group_by), []).append(hit)
+        self._groups: List[Tuple[np.ndarray, np.ndarray]] = []
+        for members in grouped.values():
+            members.sort(key=lambda h: h.start)
+            self._groups.append((
+                np.array([h.start for h in members], dtype=np.int64),
+                np.array([h.end for h in members], dtype=np.int64),
+            ))
+
+    def count_groups(self, start: int, end: int) -> int:
+        """Number of groups with at least one hit wholly inside [start, end)."""
+        return int(self.count_groups_bulk(np.array([start]), np.array([end]))[0])
+
+    def count_groups_bulk(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Vectorised ``count_groups`` over many spans at once."""
+        counts = np.zeros(len(starts), dtype=np.int64)
+        for hit_starts, hit_ends in self._groups:
+            lo = np.searchsorted(hit_starts, starts, side="left")
+            hi = np.searchsorted(hit_starts, ends, side="left")
+            for i in np.flatnonzero(hi > lo):
+                # A hit starting in the span may still run past its end
+                if hit_ends[lo[i]:hi[i]].min() <= ends[i]:
+                    counts[i] += 1
+        return counts
+
+
+def group_hits(hits: Iterable[EntityHit], categories: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """Group hits into {category: [distinct terms in order of first occurrence]}."""
+    wanted = set(categories) if categories is not None else None
+    grouped: Dict[str, List[str]] = {}
+    for hit in hits:
+        if wanted is not None and hit.category not in wanted:
+            continue
+        terms = grouped.setdefault(hit.category, [])
+        if hit.term not in terms:
+            terms.append(hit.term)
+    return grouped
+
+
+def load_term_file(path: Union[str, Path]) -> Dict[str, List[str]]:
+    """
+    Load a vocabulary file (TSV ``category<TAB>term`` lines, or JSON).
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return {category: list(terms) for category, terms in data.items()}
+
+    terms: Dict[str, List[str]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            category, sep, term = line.partition("\t")
+            if not sep or not term.strip():
+                logger.warning(f"{path}:{line_no}: expected 'category<TAB>term', skipping")
+                continue
+            terms.setdefault(category.strip(), []).append(term.strip())
+    return terms
+
+
+@lru_cache(maxsize=None)
+def get_entity_extractor(terms_path: Optional[str] = None) -> MedicalEntityExtractor:
+    """
+    Shared extractor for the built-in vocabulary plus an optional term file.
+
+    Compiled once per path and reused by every caller in the process.
+    """
+    if not terms_path:
+        return MedicalEntityExtractor()
+    extractor = MedicalEntityExtractor.from_file(terms_path)
+    logger.info(f"Loaded {extractor.term_count} medical terms ({terms_path})")
+    return extractor
+
+
+def _lower_preserving_offsets(text: str) -> str:
+    """Lowercase ``text`` without changing its length (so offsets stay valid)."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # A few characters (e.g. "İ") expand when lowercased; leave those as-is
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
@@ -1,7 +1,11 @@
 # file: my_rag_app/medical_rag.py
+import json
 import logging
 from typing import List
 
+from shared.query_cache import normalize_query
+from shared.singleflight import SingleFlight
+
 from .rag_config import Config
 from .query_processor import QueryProcessor
 from .vector_store import QdrantRetriever
@@ -21,8 +25,8 @@ class MedicalRAG:
         # 1) Embedder
         self.query_processor = QueryProcessor(config, config.rag.embedding_model)
 
-        # 2) Vector store retriever
-        self.retriever = QdrantRetriever(config)
+        # 2) Vector store retriever, its collection sized for the embedding provider
+        self.retriever = QdrantRetriever(config, vector_size=self.query_processor.provider.dim)
 
         # 3) Choose LLM model name, no matter which field your config uses
         model_name = (
@@ -37,6 +41,9 @@ class MedicalRAG:
         # 4) Optional ingestor
         self.ingestor = MedicalDataIngestion()
 
+        # 5) Identical questions asked at the same time share one pipeline run
+        self.flight = SingleFlight() if getattr(config.rag, "coalesce_identical_queries", True) else None
+
     # ---------------------------------------------------------------------
     # Public methods
     # ---------------------------------------------------------------------
@@ -46,6 +53,29 @@ class MedicalRAG:
         chat_history: List[dict],
         mode: str = "chat",
         template_name: str | None = None,
+    ):
+        """
+        Embed, retrieve and answer ``user_input``.
+
+        Concurrent calls with the same normalized question, history, mode and
+        template share one run: each caller gets the result, or the exception.
+        """
+        if self.flight is None:
+            return self._process_query(user_input, chat_history, mode, template_name)
+        key = (
+            normalize_query(user_input),
+            json.dumps(chat_history, sort_keys=True, default=str),
+            mode,
+            template_name,
+        )
+        return self.flight.do(key, self._process_query, user_input, chat_history, mode, template_name)
+
+    def _process_query(
+        self,
+        user_input: str,
+        chat_history: List[dict],
+        mode: str,
+        template_name: str | None,
     ):
         embedding, filters = self.query_processor.process_query(user_input)
         docs = self.retriever.retrieve(
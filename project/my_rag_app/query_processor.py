@@ -1,29 +1,31 @@
 # file: my_rag_app/query_processor.py
-import logging, re, uuid
+import logging, uuid
 from datetime import datetime
 from typing import List, Dict, Any, Tuple
 
+from my_rag_app.medical_entities import get_entity_extractor
 from my_rag_app.openai_client import client  # singleton OpenAI
+from shared.embedding_providers import get_embedding_provider
+from shared.query_cache import get_query_cache
 
 class QueryProcessor:
     """
-    Expands synonyms, extracts entities, gets an OpenAI embedding, returns
+    Expands synonyms, extracts entities, gets an embedding, returns
     (embedding_vector, filters_dict).
     """
 
     def __init__(self, config, embed_model_name: str):
         self.logger = logging.getLogger(__name__)
         self.cfg = config
-        self.model = embed_model_name  # e.g. "text-embedding-ada-002"
+        # provider spec, e.g. "text-embedding-ada-002" (OpenAI) or "local:BAAI/bge-small-en-v1.5"
+        self.provider = get_embedding_provider(embed_model_name, lambda: client)
+        self.model = self.provider.model
 
-        self.entity_patterns: Dict[str, str] = {
-            "diseases": r"(diabetes|hypertension|cancer|asthma|covid-19|stroke|tuberculosis|copd|heart disease)",
-            "medications": r"(aspirin|ibuprofen|acetaminophen|lisinopril|metformin|prednisone|insulin)",
-        }
-        self.entity_regex = re.compile(
-            "|".join(f"(?P<{k}>{v})" for k, v in self.entity_patterns.items()),
-            re.IGNORECASE,
-        )
+        # Same compiled vocabulary as document ingestion; only these categories become filters
+        self.entity_extractor = get_entity_extractor(getattr(config.rag, "medical_terms_path", None))
+        self.entity_categories = ("diseases", "medications")
+        # Shared with semantic search; sized and backed per QUERY_CACHE_* settings
+        self.query_cache = get_query_cache() if getattr(config.rag, "query_cache_enabled", True) else None
         self.expansions = {
             "heart attack": "myocardial infarction cardiac arrest coronary thrombosis acute coronary syndrome",
             "high blood pressure": "hypertension elevated blood pressure",
@@ -37,10 +39,10 @@ class QueryProcessor:
         entities = self._entities(expanded)
 
         try:
-            emb = client.embeddings.create(model=self.model, input=expanded).data[0].embedding
+            emb = self._embed(expanded)
         except Exception as e:
             self.logger.error("Embedding failed, returning zeros", exc_info=True)
-            emb_dim = getattr(self.cfg.rag, "embedding_dim", 1536)
+            emb_dim = self.provider.dim or getattr(self.cfg.rag, "embedding_dim", 1536)
             emb = [0.0] * emb_dim
 
         filters: Dict[str, Any] = {
@@ -53,6 +55,11 @@ class QueryProcessor:
         return emb, filters
 
     # ───────────────────────── Helpers ────────────────────────────
+    def _embed(self, text: str) -> List[float]:
+        if self.query_cache is None:
+            return self.provider.embed_query(text)
+        return self.query_cache.embed(self.model, text, self.provider.embed_query)
+
     def _expand(self, text: str) -> str:
         out, lower = text, text.lower()
         for phrase, extra in self.expansions.items():
@@ -61,5 +68,6 @@ class QueryProcessor:
         return out
 
     def _entities(self, text: str) -> List[str]:
-        found = {m.group(0).lower() for m in self.entity_regex.finditer(text)}
+        found = {hit.term for hit in self.entity_extractor.scan(text)
+                 if hit.category in self.entity_categories}
         return sorted(found)
@@ -26,15 +26,52 @@ class Config:
         # LLM & embedding model names  (NO OBJECTS HERE!)
         # -----------------------------------------------------------
         llm_model = "gpt-3.5-turbo"
-        embedding_model = "text-embedding-ada-002"
+        # embedding provider spec (shared/embedding_providers.py): an OpenAI model name,
+        # "local:<sentence-transformers model>" or "fake:<dim>"; the collection's vector
+        # size follows the provider, so give each provider its own collection_name
+        embedding_model = os.getenv("RAG_EMBEDDING_MODEL", "text-embedding-ada-002")
 
         # -----------------------------------------------------------
         # Chunking & prompt limits
         # -----------------------------------------------------------
         chunk_size = 300
         chunk_overlap = 50
+        chunking_strategy = "hybrid"   # semantic | sliding_window | recursive | hybrid
         max_context_length = 3000
 
+        # -----------------------------------------------------------
+        # Document ingestion
+        # -----------------------------------------------------------
+        processed_docs_dir = os.getenv("PROCESSED_DOCS_DIR", "processed_docs")
+        # optional extra entity vocabulary (TSV "category<TAB>term" or JSON)
+        medical_terms_path = os.getenv("MEDICAL_TERMS_PATH") or None
+        embedding_batch_size = 256          # inputs per request
+        embedding_batch_tokens = 100_000    # tokens per request
+        embedding_concurrency = 4           # requests in flight
+        embedding_tokens_per_minute = int(os.getenv("EMBEDDING_TPM", "0")) or None   # None = unlimited
+        embedding_requests_per_minute = int(os.getenv("EMBEDDING_RPM", "0")) or None
+        embedding_max_retries = 6           # on 429 / transient errors, with backoff
+        upsert_parallel = 4                 # Qdrant upsert requests in flight
+        upsert_checkpoint_every = 10_000    # points between checkpoints of a bulk load
+        processing_workers = int(os.getenv("PROCESSING_WORKERS", "1"))  # >1: chunk in a process pool
+        chunk_store_dtype = "float32"       # or "float16" to halve stored embedding size
+        dedup_enabled = True                # drop duplicate chunks before embedding
+        dedup_near_threshold = 0.9          # MinHash Jaccard estimate; >= 1.0 = exact matches only
+        dedup_num_perm = 128
+        dedup_shingle_size = 5              # words per shingle
+
+        # -----------------------------------------------------------
+        # Embedding cache (shared with semantic search via EMBEDDING_CACHE_DIR)
+        # -----------------------------------------------------------
+        embedding_cache_enabled = True
+        embedding_cache_dir = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")  # "" = memory only
+        embedding_cache_memory_items = 10_000
+        embedding_cache_max_bytes = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(1 << 30)))
+        # query embeddings use the TTL'd query cache instead (QUERY_CACHE_* in .env)
+        query_cache_enabled = True
+        # concurrent identical questions share one embed → search → LLM run
+        coalesce_identical_queries = True
+
         # -----------------------------------------------------------
         # Formatting
         # -----------------------------------------------------------
@@ -1,6 +1,5 @@
 import logging
 from typing import List, Dict, Any, Optional
-from sentence_transformers import CrossEncoder
 
 class Reranker:
     """
@@ -19,6 +18,9 @@ class Reranker:
         # For medical data, specialized models like 'pritamdeka/S-PubMedBert-MS-MARCO'
         # would be ideal, but using a general one here for simplicity
         try:
+            # Imported here: sentence_transformers pulls in torch, which takes seconds
+            from sentence_transformers import CrossEncoder
+            
             self.model_name = config.rag.reranker_model
             self.logger.info(f"Loading reranker model: {self.model_name}")
             self.model = CrossEncoder(self.model_name)
@@ -0,0 +1,166 @@
+# file: my_rag_app/segmentation.py
+"""
+Per-document segmentation index shared by all chunking strategies.
+
+The document is split once into lines, section headers, paragraphs,
+sentences and words. Every structure is stored as character offsets into the
+original text, so strategies slice and count instead of re-splitting.
+"""
+
+import re
+from bisect import bisect_left
+from typing import Callable, Dict, List, NamedTuple, Optional, Pattern, Tuple
+
+Span = Tuple[int, int]
+
+_LINE_BREAK_RE = re.compile(r"\n")
+_PARAGRAPH_BREAK_RE = re.compile(r"\n\s*\n")
+_WORD_RE = re.compile(r"\S+")
+
+
+class Section(NamedTuple):
+    start: int
+    end: int
+    name: str
+
+
+class SegmentationIndex:
+    """
+    Offsets of the lines, headers, paragraphs, sentences and words of one text.
+
+    Paragraphs never cross a section header, and sentences never cross a
+    paragraph, so any section or paragraph maps to a contiguous run of them.
+    Sentences are tokenized lazily, one paragraph at a time.
+    """
+
+    def __init__(
+        self,
+        text: str,
+        section_pattern: Pattern,
+        sentence_splitter: Callable[[str], List[str]],
+    ):
+        """
+        Args:
+            text: Document text
+            section_pattern: Header pattern, tried at the start of every line
+            sentence_splitter: Function splitting text into sentence strings
+        """
+        self.text = text
+        self._split_sentences = sentence_splitter
+
+        self.line_starts: List[int] = [0] + [m.end() for m in _LINE_BREAK_RE.finditer(text)]
+        self.word_starts: List[int] = [m.start() for m in _WORD_RE.finditer(text)]
+
+        # Section headers, only at real line starts
+        self.headers: List[Section] = []
+        for line_start in self.line_starts:
+            match = section_pattern.match(text, line_start)
+            if match:
+                self.headers.append(Section(match.start(), match.end(), match.group(0).strip()))
+
+        self._header_starts = [h.start for h in self.headers]
+
+        self.paragraph_spans: List[Span] = self._find_paragraphs()
+        self._paragraph_starts = [start for start, _ in self.paragraph_spans]
+        self._sentence_cache: Dict[int, List[Span]] = {}
+        self._sections: Optional[List[Section]] = None
+
+    # ───────────────────────── Lookups ──────────────────────────────
+    def slice(self, span: Span) -> str:
+        return self.text[span[0]:span[1]]
+
+    def word_count(self, start: int = 0, end: Optional[int] = None) -> int:
+        """Number of whitespace-separated words starting inside [start, end)."""
+        end = len(self.text) if end is None else end
+        return bisect_left(self.word_starts, end) - bisect_left(self.word_starts, start)
+
+    def sections(self) -> List[Section]:
+        """
+        Spans from each header to the next, stripped of surrounding whitespace.
+
+        Text before the first header becomes a "preamble" section. Returns an
+        empty list if the document has no headers.
+        """
+        if self._sections is None:
+            sections = []
+            if self.headers:
+                preamble = self._strip(0, self.headers[0].start)
+                if preamble:
+                    sections.append(Section(*preamble, "preamble"))
+                for i, header in enumerate(self.headers):
+                    end = self.headers[i + 1].start if i + 1 < len(self.headers) else len(self.text)
+                    span = self._strip(header.start, end)
+                    if span:
+                        sections.append(Section(*span, header.name))
+            self._sections = sections
+        return self._sections
+
+    def section_name_at(self, pos: int) -> Optional[str]:
+        """Name of the header governing offset ``pos``, if any."""
+        i = bisect_left(self._header_starts, pos + 1) - 1
+        return self.headers[i].name if i >= 0 else None
+
+    def headers_between(self, start: int, end: int) -> List[Section]:
+        lo = bisect_left(self._header_starts, start)
+        hi = bisect_left(self._header_starts, end)
+        return self.headers[lo:hi]
+
+    def paragraphs(self, start: int = 0, end: Optional[int] = None) -> List[Span]:
+        """Non-empty paragraphs starting inside [start, end)."""
+        end = len(self.text) if end is None else end
+        lo = bisect_left(self._paragraph_starts, start)
+        hi = bisect_left(self._paragraph_starts, end)
+        return self.paragraph_spans[lo:hi]
+
+    def sentences(self, start: int = 0, end: Optional[int] = None) -> List[Span]:
+        """Sentences of the paragraphs starting inside [start, end)."""
+        end = len(self.text) if end is None else end
+        lo = bisect_left(self._paragraph_starts, start)
+        hi = bisect_left(self._paragraph_starts, end)
+        sentences: List[Span] = []
+        for i in range(lo, hi):
+            sentences.extend(self._paragraph_sentences(i))
+        return sentences
+
+    # ───────────────────────── Building ─────────────────────────────
+    def _find_paragraphs(self) -> List[Span]:
+        # Paragraph breaks are blank lines; header line starts also break paragraphs
+        cuts = [(m.start(), m.end()) for m in _PARAGRAPH_BREAK_RE.finditer(self.text)]
+        cuts.extend((h.start, h.start) for h in self.headers)
+        cuts.sort()
+
+        spans, pos = [], 0
+        for cut_start, cut_end in cuts:
+            if cut_start >= pos:
+                span = self._strip(pos, cut_start)
+                if span:
+                    spans.append(span)
+            pos = max(pos, cut_end)
+        span = self._strip(pos, len(self.text))
+        if span:
+            spans.append(span)
+        return spans
+
+    def _paragraph_sentences(self, i: int) -> List[Span]:
+        if i not in self._sentence_cache:
+            start, end = self.paragraph_spans[i]
+            paragraph = self.text[start:end]
+            spans, cursor = [], 0
+            for sentence in self._split_sentences(paragraph):
+                found = paragraph.find(sentence, cursor)
+                offset = found if found >= 0 else cursor
+                cursor = offset + len(sentence)
+                span = self._strip(start + offset, start + cursor)
+                if span:
+                    spans.append(span)
+            self._sentence_cache[i] = spans
+        return self._sentence_cache[i]
+
+    def _strip(self, start: int, end: int) -> Optional[Span]:
+        """Shrink [start, end) to exclude surrounding whitespace; None if empty."""
+        text = self.text
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return (start, end) if start < end else None
@@ -1,5 +1,6 @@
 import logging
-from typing import List, Dict, Any, Optional
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, Union
 
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as qdrant_models
@@ -13,6 +14,8 @@ from qdrant_client.http.models import (
     MatchAny,
 )
 
+from shared.bulk_upsert import BulkUpserter
+
 class QdrantClientManager:
     """
     A singleton-like pattern ensuring we create only one QdrantClient
@@ -43,15 +46,16 @@ class QdrantRetriever:
     a single list of strings so we can filter with MatchAny.
     """
 
-    def __init__(self, config):
+    def __init__(self, config, vector_size: Optional[int] = None):
         """
         :param config: a configuration object (with .rag.* fields).
+        :param vector_size: vector size of the embedding provider (default: config.rag.embedding_dim).
         """
         self.logger = logging.getLogger(__name__)
         self.config = config
 
         self.collection_name = config.rag.collection_name
-        self.embedding_dim = config.rag.embedding_dim
+        self.embedding_dim = vector_size or config.rag.embedding_dim
         self.distance_metric = config.rag.distance_metric
 
         # Retrieve or create a singleton Qdrant client
@@ -76,6 +80,17 @@ class QdrantRetriever:
             )
         else:
             self.logger.info(f"Collection '{self.collection_name}' already exists.")
+            existing_dim = self._collection_vector_size()
+            if existing_dim is not None and existing_dim != self.embedding_dim:
+                raise ValueError(
+                    f"Collection '{self.collection_name}' holds {existing_dim}-d vectors but the "
+                    f"embedding model produces {self.embedding_dim}-d ones; use another collection_name "
+                    f"for this model or re-create the collection"
+                )
+
+    def _collection_vector_size(self) -> Optional[int]:
+        vectors = self.client.get_collection(self.collection_name).config.params.vectors
+        return getattr(vectors, "size", None)   # None for named-vector collections
 
     def count_documents(self) -> int:
         """
@@ -90,58 +105,78 @@ class QdrantRetriever:
             self.logger.error(f"Error counting documents in '{self.collection_name}': {e}", exc_info=True)
             return 0
 
-    def upsert_documents(self, documents: List[Dict[str, Any]]):
+    def upsert_documents(
+        self,
+        documents: Iterable[Dict[str, Any]],
+        batch_size: int = 100,
+        checkpoint_path: Optional[Union[str, Path]] = None,
+        job_id: Optional[str] = None,
+        resume: bool = True,
+    ):
         """
         Insert or update documents in Qdrant. Each doc should have:
           - "id": a unique doc ID (string or int), or we generate one
           - "embedding": list[float]
           - "content": the text
           - "metadata": optional dict with fields like 'source', etc.
+
+        Accepts any iterable (e.g. MedicalDocumentProcessor.export_chunks)
+        and only holds a few batches of points in memory at a time. Batches
+        are sent in parallel without waiting for indexing; progress is
+        checkpointed every ``config.rag.upsert_checkpoint_every`` points.
+
+        With ``checkpoint_path``, an interrupted load re-run with the same
+        documents in the same order skips what was already stored.
+
+        Returns:
+            BulkUpsertStats of this run (points, points_per_second, ...)
         """
+        # Embedded (local) Qdrant is a single in-process store: no point sending in parallel
+        parallel = 1 if self.config.rag.use_local else getattr(self.config.rag, "upsert_parallel", 4)
+        upserter = BulkUpserter(
+            self.client,
+            self.collection_name,
+            batch_size=batch_size,
+            parallel=parallel,
+            checkpoint_every=getattr(self.config.rag, "upsert_checkpoint_every", 10_000),
+            checkpoint_path=checkpoint_path,
+            job_id=job_id,
+        )
         try:
-            points = []
-            for doc in documents:
-                doc_id = doc.get("id")
-                if doc_id is None:
-                    # fallback: hash content
-                    doc_id = str(hash(doc.get("content", "")))
-
-                embedding = doc.get("embedding")
-                if embedding is None:
-                    raise ValueError("Document missing 'embedding'")
-
-                content = doc.get("content", "")
-                metadata = doc.get("metadata", {})
-
-                # Build payload from doc
-                payload = {
-                    "content": content,
-                }
-                # Add metadata fields
-                for k, v in metadata.items():
-                    payload[k] = v
-
-                point = PointStruct(
-                    id=doc_id,
-                    vector=embedding,
-                    payload=payload
-                )
-                points.append(point)
-
-            # Upsert in batch
-            batch_size = 100
-            for i in range(0, len(points), batch_size):
-                batch = points[i:i+batch_size]
-                self.client.upsert(
-                    collection_name=self.collection_name,
-                    points=batch,
-                    wait=True
-                )
-            self.logger.info(f"Upserted {len(documents)} doc(s) into '{self.collection_name}'.")
+            return upserter.run((self._to_point(doc) for doc in documents), resume=resume)
         except Exception as e:
             self.logger.error(f"Error upserting documents: {e}", exc_info=True)
             raise
 
+    @staticmethod
+    def _to_point(doc: Dict[str, Any]) -> PointStruct:
+        """Convert a processed chunk dict into a Qdrant point."""
+        doc_id = doc.get("id")
+        if doc_id is None:
+            # fallback: hash content
+            doc_id = str(hash(doc.get("content", "")))
+
+        embedding = doc.get("embedding")
+        if embedding is None:
+            raise ValueError("Document missing 'embedding'")
+
+        content = doc.get("content", "")
+        metadata = doc.get("metadata", {})
+
+        # Build payload from doc
+        payload = {
+            "content": content,
+        }
+        # Add metadata fields
+        for k, v in metadata.items():
+            payload[k] = v
+
+        return PointStruct(
+            id=doc_id,
+            vector=embedding,
+            payload=payload
+        )
+
     def retrieve(
         self,
         query_vector: List[float],
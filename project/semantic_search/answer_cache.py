@@ -0,0 +1,155 @@
+# project/semantic_search/answer_cache.py
+"""
+Semantic answer cache: paraphrases of a question already answered get the
+same answer without another chat completion.
+
+Entries hold the query vector, the IDs of its top retrieved hits, the answer
+and its citations. A new query is served from the cache when its vector's
+cosine similarity to a cached one reaches the threshold *and* retrieval
+returned the same top hits for it. Embedding similarity alone is not
+enough: with ada-002, short questions that differ only in population or drug
+("sepsis policy adults" / "sepsis policy neonates") score well above 0.95,
+while their retrieved policy text differs. The cache is off by default.
+Entries are tagged with the collection version (see
+ingest_state.py) and the chat settings; when either changes, for instance
+after a re-ingest, the whole cache is dropped. Least recently used entries
+are evicted beyond the capacity.
+"""
+
+from __future__ import annotations
+import os, copy, logging, threading
+from collections import OrderedDict
+from typing import Any, Callable, Sequence
+
+import numpy as np
+
+from .ingest_state import VERSION_PATH, read_collection_version
+
+log = logging.getLogger(__name__)
+
+ANSWER_CACHE_ITEMS      = int(os.getenv("ANSWER_CACHE_ITEMS", "0"))        # 0 disables the cache
+ANSWER_CACHE_THRESHOLD  = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.98"))
+ANSWER_CACHE_MATCH_HITS = int(os.getenv("ANSWER_CACHE_MATCH_HITS", "3"))   # top hits that must be the same
+
+class AnswerCache:
+    """Fixed-capacity matrix of unit query vectors with an LRU over its rows."""
+
+    def __init__(self, capacity: int, threshold: float, version_fn: Callable[[], str], match_hits: int = 3):
+        """
+        Args:
+            capacity: Maximum number of cached answers
+            threshold: Minimum cosine similarity for a cached answer to be served
+            version_fn: Returns the current version tag; a change empties the cache
+            match_hits: How many top hit IDs must match for a cached answer to be served
+        """
+        self.capacity = max(1, capacity)
+        self.threshold = threshold
+        self.version_fn = version_fn
+        self.match_hits = max(1, match_hits)
+        self.version: str | None = None
+        self._vectors: np.ndarray | None = None          # capacity × dim, allocated on first put
+        self._answers: list[dict[str, Any] | None] = [None] * self.capacity
+        self._hits: list[frozenset | None] = [None] * self.capacity   # top hit IDs per row
+        self._lru: OrderedDict[int, None] = OrderedDict()   # used rows, least recent first
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.hit_mismatches = 0   # similar enough, but retrieval differed
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _unit(vec: list[float]) -> np.ndarray:
+        v = np.asarray(vec, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def _hit_key(self, hit_ids: Sequence[Any]) -> frozenset:
+        return frozenset(hit_ids[:self.match_hits])
+
+    def _check_version(self):
+        version = self.version_fn()
+        if version != self.version:
+            if self._lru:
+                self.invalidations += 1
+                log.info("Collection version changed – dropping %d cached answers", len(self._lru))
+            self._lru.clear()
+            self._answers = [None] * self.capacity
+            self._hits = [None] * self.capacity
+            self.version = version
+
+    def lookup(self, vec: list[float], hit_ids: Sequence[Any]) -> dict[str, Any] | None:
+        """
+        Cached result of the most similar query at or above the threshold whose
+        top hits were ``hit_ids`` (best first), or None.
+        """
+        q = self._unit(vec)
+        key = self._hit_key(hit_ids)
+        with self._lock:
+            self._check_version()
+            if not self._lru or self._vectors is None or self._vectors.shape[1] != q.shape[0]:
+                self.misses += 1
+                return None
+            rows = np.fromiter(self._lru, dtype=np.int64, count=len(self._lru))
+            sims = self._vectors[rows] @ q
+            similar = [int(rows[i]) for i in np.argsort(-sims) if sims[i] >= self.threshold]
+            row = next((r for r in similar if self._hits[r] == key), None)
+            if row is None:
+                self.misses += 1
+                self.hit_mismatches += bool(similar)
+                return None
+            self._lru.move_to_end(row)
+            self.hits += 1
+            return copy.deepcopy(self._answers[row])
+
+    def put(self, vec: list[float], hit_ids: Sequence[Any], result: dict[str, Any]):
+        q = self._unit(vec)
+        with self._lock:
+            self._check_version()
+            if self._vectors is None or self._vectors.shape[1] != q.shape[0]:
+                self._vectors = np.zeros((self.capacity, q.shape[0]), dtype=np.float32)
+                self._lru.clear()
+            if len(self._lru) < self.capacity:
+                row = next(i for i in range(self.capacity) if i not in self._lru)
+            else:
+                row, _ = self._lru.popitem(last=False)
+                self.evictions += 1
+            self._vectors[row] = q
+            self._answers[row] = copy.deepcopy(result)
+            self._hits[row] = self._hit_key(hit_ids)
+            self._lru[row] = None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "hit_mismatches": self.hit_mismatches,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "items": len(self._lru),
+                "threshold": self.threshold,
+            }
+
+def collection_version_fn(collection: str, *settings: Any) -> Callable[[], str]:
+    """
+    Version tag of ``collection`` plus ``settings`` (e.g. chat model, hit
+    limit). The version file is re-read only when its mtime changes, so a
+    lookup costs one ``stat``.
+    """
+    seen: dict[str, Any] = {"mtime": None, "tag": ""}
+    suffix = ":".join(str(s) for s in settings)
+
+    def version() -> str:
+        try:
+            mtime = VERSION_PATH.stat().st_mtime_ns
+        except OSError:
+            mtime = 0
+        if mtime != seen["mtime"]:
+            seen["mtime"], seen["tag"] = mtime, read_collection_version(collection)
+        return f"{seen['tag']}:{suffix}"
+
+    return version
@@ -0,0 +1,162 @@
+# project/semantic_search/context_packer.py
+"""
+Turns Qdrant hits into the prompt's context snippets within a token budget.
+
+Chunks are overlapping word windows (see ``chunk_text``), so neighbouring
+hits from one document often repeat the same 50 words, and some hits are
+wholly contained in others. Before anything is counted against the budget:
+
+  * hits with the same text are kept once;
+  * a hit contained in another hit of the same document is dropped;
+  * two hits of a document where one ends with the words the other starts
+    with are merged into one snippet.
+
+Snippets then go into the prompt best score first until the budget, counted
+with the chat model's tokenizer, is spent. Hits that did not make it in are
+not cited.
+"""
+
+from __future__ import annotations
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))   # 0 = no limit
+MIN_OVERLAP_WORDS    = 8     # shorter shared runs are coincidence, not chunk overlap
+MIN_SNIPPET_TOKENS   = 64    # don't truncate a snippet to less than this
+
+@dataclass
+class Part:
+    """A hit inside a snippet: where its text starts, and what to cite for it."""
+    offset: int          # word index in the snippet
+    id: Any
+    score: float
+    pages: set[int]
+
+@dataclass
+class Snippet:
+    """One or more merged hits of a document; quacks like a Qdrant hit for citation building."""
+    document_title: str
+    words: list[str]
+    heading: str
+    parts: list[Part] = field(default_factory=list)
+
+    @property
+    def score(self) -> float:
+        return max(p.score for p in self.parts)
+
+    @property
+    def id(self):
+        return max(self.parts, key=lambda p: p.score).id
+
+    @property
+    def pages(self) -> set[int]:
+        return set().union(*(p.pages for p in self.parts))
+
+    @property
+    def payload(self) -> dict[str, Any]:
+        pages = sorted(self.pages)
+        return {
+            "content": " ".join(self.words),
+            "document_title": self.document_title,
+            "page_number": pages[0] if pages else None,
+            "page_numbers": pages,
+            "heading": self.heading,
+        }
+
+def _snippet(hit) -> Snippet | None:
+    pl = hit.payload or {}
+    text = pl.get("content") or pl.get("text")
+    if not text:
+        return None
+    page, page_end = pl.get("page_number"), pl.get("page_end")
+    pages = set(range(page, page_end + 1)) if page is not None and page_end is not None else (
+        {page} if page is not None else set())
+    return Snippet(pl.get("document_title", "Unknown Document"), text.split(),
+                   pl.get("heading", "N/A"), [Part(0, hit.id, hit.score, pages)])
+
+def _find(words: list[str], run: list[str]) -> int:
+    """Index of the first occurrence of ``run`` in ``words``, or -1."""
+    n = len(run)
+    for i in range(len(words) - n + 1):
+        if words[i] == run[0] and words[i : i + n] == run:
+            return i
+    return -1
+
+def _overlap(a: list[str], b: list[str]) -> int:
+    """Length of the longest suffix of ``a`` that is a prefix of ``b`` (0 if under MIN_OVERLAP_WORDS)."""
+    for k in range(min(len(a), len(b)) - 1, MIN_OVERLAP_WORDS - 1, -1):
+        if a[-k] == b[0] and a[-k:] == b[:k]:
+            return k
+    return 0
+
+def _shifted(parts: list[Part], by: int) -> list[Part]:
+    return [Part(p.offset + by, p.id, p.score, p.pages) for p in parts]
+
+def _merge(a: Snippet, b: Snippet) -> Snippet | None:
+    """``a`` and ``b`` as one snippet if one contains or continues the other, else None."""
+    if len(b.words) <= len(a.words) and (i := _find(a.words, b.words)) >= 0:
+        return Snippet(a.document_title, a.words, a.heading, a.parts + _shifted(b.parts, i))
+    if len(a.words) < len(b.words) and (i := _find(b.words, a.words)) >= 0:
+        return Snippet(b.document_title, b.words, b.heading, b.parts + _shifted(a.parts, i))
+    if k := _overlap(a.words, b.words):
+        return Snippet(a.document_title, a.words + b.words[k:], a.heading,
+                       a.parts + _shifted(b.parts, len(a.words) - k))
+    if k := _overlap(b.words, a.words):
+        return Snippet(b.document_title, b.words + a.words[k:], b.heading,
+                       b.parts + _shifted(a.parts, len(b.words) - k))
+    return None
+
+def merge_snippets(snippets: list[Snippet]) -> list[Snippet]:
+    """Drop duplicate and contained snippets and join overlapping ones, per document; best first."""
+    pending = sorted(snippets, key=lambda s: -s.score)
+    out: list[Snippet] = []
+    while pending:
+        s = pending.pop(0)
+        for kept in out:
+            if kept.document_title == s.document_title and (merged := _merge(kept, s)) is not None:
+                out.remove(kept)
+                pending.insert(0, merged)   # it may now overlap another snippet
+                break
+        else:
+            out.append(s)
+    return sorted(out, key=lambda s: -s.score)
+
+def _truncate(s: Snippet, tokens: int, count_tokens: Callable[[str], int]) -> Snippet | None:
+    """Longest prefix of ``s`` whose text fits in ``tokens``, citing only the hits it starts; None if that is no hit."""
+    words = s.words
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(" ".join(words[:mid])) <= tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    parts = [p for p in s.parts if p.offset < lo]
+    return Snippet(s.document_title, words[:lo], s.heading, parts) if parts else None
+
+def pack_snippets(hits, count_tokens: Callable[[str], int], budget: int = CONTEXT_TOKEN_BUDGET) -> list[Snippet]:
+    """
+    Merged snippets of ``hits``, best first, that fit in ``budget`` tokens
+    once numbered ("[n] ...") and joined. A snippet that no longer fits is
+    skipped in favour of smaller ones, except that one may be cut short to
+    fill what is left.
+    """
+    snippets = merge_snippets([s for s in map(_snippet, hits) if s is not None])
+    if budget <= 0:
+        return snippets
+
+    packed: list[Snippet] = []
+    used = 0
+    for s in snippets:
+        overhead = count_tokens(f"[{len(packed) + 1}] ") + (2 if packed else 0)   # marker, blank line
+        cost = overhead + count_tokens(" ".join(s.words))
+        if used + cost <= budget:
+            packed.append(s)
+            used += cost
+            continue
+        room = budget - used - overhead
+        if room >= MIN_SNIPPET_TOKENS and (s := _truncate(s, room, count_tokens)) is not None:
+            packed.append(s)
+            used += overhead + count_tokens(" ".join(s.words))
+    return packed
@@ -0,0 +1,109 @@
+# project/semantic_search/extract_cache.py
+"""
+Per-page text of policy PDFs, cached by the SHA-256 of the PDF bytes.
+
+PDF parsing is the slowest ingest step and its output only depends on the
+file, so it is done once per file version: re-chunking with other settings,
+re-embedding with another model or renaming a PDF all read from here. Each
+entry is a small gzipped JSON file named after the hash.
+"""
+
+from __future__ import annotations
+import os, re, gzip, json, logging, pathlib
+from dataclasses import dataclass
+
+log = logging.getLogger(__name__)
+
+class ExtractCache:
+    """Directory of ``<sha256>.json.gz`` files holding ``{"pages": [text, ...]}``."""
+
+    def __init__(self, directory: pathlib.Path | None):
+        """
+        Args:
+            directory: Cache directory (created on first write); None disables caching
+        """
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, sha256: str) -> pathlib.Path:
+        return self.directory / f"{sha256}.json.gz"
+
+    def get(self, sha256: str) -> list[str] | None:
+        if self.directory is None:
+            return None
+        try:
+            with gzip.open(self._path(sha256), "rt", encoding="utf-8") as f:
+                pages = json.load(f)["pages"]
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            log.warning("Ignoring unreadable extraction cache entry %s: %s", sha256, e)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pages
+
+    def put(self, sha256: str, pages: list[str]):
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(sha256)
+        tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"pages": pages}, f)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+# ────────────── page-aware chunking ─────────────────────────────
+_NUMBERED = re.compile(r"^(\d+(\.\d+)*\.?|[A-Z]\.|[IVXLC]+\.)\s+\S")
+
+def is_heading(line: str) -> bool:
+    """
+    Heuristic for section headings in policy PDFs: a short line without
+    closing punctuation that is numbered ("3.2 Scope"), ALL CAPS or Title Case.
+    """
+    line = line.strip()
+    words = line.split()
+    if not words or len(line) > 80 or len(words) > 12 or line[-1] in ".,;:?!" or not any(c.isalpha() for c in line):
+        return False
+    if _NUMBERED.match(line) or line.isupper():
+        return True
+    significant = [w for w in words if len(w) > 3]
+    return bool(significant) and all(w[0].isupper() for w in significant)
+
+@dataclass
+class PageChunk:
+    text: str
+    page_number: int           # page of the first word, 1-based
+    page_end: int              # page of the last word
+    heading: str               # last heading at or before the first word, "N/A" if none
+
+def chunk_pages(pages: list[str], chunk_size: int, overlap: int) -> list[PageChunk]:
+    """
+    Same word windows as ``chunk_text`` over the joined pages, with the page
+    and the section heading each window starts in.
+    """
+    words: list[str] = []
+    word_pages: list[int] = []
+    word_headings: list[str] = []
+    heading = "N/A"
+    for page_number, page in enumerate(pages, 1):
+        for line in page.splitlines():
+            if is_heading(line):
+                heading = " ".join(line.split())
+            for word in line.split():
+                words.append(word)
+                word_pages.append(page_number)
+                word_headings.append(heading)
+
+    out: list[PageChunk] = []
+    i = 0
+    while i < len(words):
+        end = min(i + chunk_size, len(words))
+        out.append(PageChunk(" ".join(words[i:end]), word_pages[i], word_pages[end - 1], word_headings[i]))
+        i += chunk_size - overlap
+    return out
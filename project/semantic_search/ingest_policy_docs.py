@@ -2,18 +2,49 @@
 """
 Run once to ingest PDFs in policy_documents/ into Qdrant.
 
-    $ python -m project.semantic_search.ingest_policy_docs
+    $ python -m project.semantic_search.ingest_policy_docs [--workers 4] [--full] [--prune]
 
 Works independently of other backends.
+
+Re-runs are incremental: unchanged PDFs are skipped by content hash, only
+chunks whose text changed are embedded, and points of removed chunks and
+removed PDFs are deleted (see ingest_state.py). Extracted page text is
+cached by PDF content hash (see extract_cache.py), so changing the chunking
+settings re-chunks from the cache instead of re-parsing every PDF.
+
+PDFs flow through three stages connected by bounded queues, so the run goes
+at the speed of the slowest stage rather than the sum of all three:
+
+    extract (process pool) ─▶ chunk + embed (threads) ─▶ parallel batched upsert
+
+Upserts don't wait for Qdrant to index each batch; the pipeline waits at
+checkpoints only, and saves the ingest state there, so an interrupted run
+resumes with the PDFs that were not stored yet.
 """
 
 from __future__ import annotations
-import os, pathlib, hashlib, logging, mimetypes, textwrap
+import os, pathlib, logging, mimetypes, textwrap, functools
+import argparse, contextlib, queue, threading, time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 from openai import OpenAI
 
-from qdrant_client.http.models import PointStruct, Distance
-from .vector_client import get_qdrant_client, ensure_collection_exists, COLLECTION
+from qdrant_client.http.models import PointStruct, PointIdsList, Distance
+from .vector_client import get_qdrant_client, ensure_collection_exists, COLLECTION, DEFAULT_VEC_SIZE
+from .ingest_state import IngestState, bump_collection_version, chunk_point_ids, file_sha256
+from .extract_cache import ExtractCache, PageChunk, chunk_pages
+
+try:  # project/ on sys.path (combined_main)
+    from shared.embedding_cache import get_embedding_cache
+    from shared.embedding_client import EmbeddingClient, RateLimiter
+    from shared.embedding_providers import EmbeddingProvider, OpenAIEmbeddingProvider, get_embedding_provider
+    from shared.bulk_upsert import BulkUpserter
+except ImportError:  # python -m project.semantic_search.ingest_policy_docs
+    from ..shared.embedding_cache import get_embedding_cache
+    from ..shared.embedding_client import EmbeddingClient, RateLimiter
+    from ..shared.embedding_providers import EmbeddingProvider, OpenAIEmbeddingProvider, get_embedding_provider
+    from ..shared.bulk_upsert import BulkUpserter
 
 # ────────────── env & logging ───────────────────────────────────
 load_dotenv()
@@ -22,14 +53,35 @@ log = logging.getLogger("ingest")
 
 BASE_DIR   = pathlib.Path(__file__).parent
 PDF_DIR    = BASE_DIR / "policy_documents"
-EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-ada-002")
+EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-ada-002")   # provider spec, see shared/embedding_providers.py
 CHUNK_SIZE  = 350
 OVERLAP     = 50
+STATE_PATH  = pathlib.Path(os.getenv("INGEST_STATE_PATH", str(BASE_DIR / "ingest_state.json")))
+EXTRACT_CACHE_DIR = pathlib.Path(os.getenv("INGEST_EXTRACT_CACHE_DIR", str(BASE_DIR / "extract_cache")))
+PAYLOAD_VERSION = 2   # bump when payload fields change, so unchanged PDFs are re-upserted
+
+# pipeline sizing (override on the command line)
+EXTRACT_WORKERS   = int(os.getenv("INGEST_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+UPSERT_BATCH      = int(os.getenv("INGEST_UPSERT_BATCH", "256"))
+UPSERT_PARALLEL   = int(os.getenv("INGEST_UPSERT_PARALLEL", "4"))
+CHECKPOINT_EVERY  = int(os.getenv("INGEST_CHECKPOINT_EVERY", "5000"))   # points
+QUEUE_SIZE        = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+
+# embedding requests: size limits, concurrency and the account's rate limits (0 = unlimited)
+EMBED_BATCH_SIZE   = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "100000"))
+EMBED_REQUESTS     = int(os.getenv("EMBED_CONCURRENT_REQUESTS", "4"))
+EMBED_TPM          = int(os.getenv("EMBEDDING_TPM", "0"))
+EMBED_RPM          = int(os.getenv("EMBEDDING_RPM", "0"))
 
-OPENAI_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_KEY:
-    raise RuntimeError("OPENAI_API_KEY missing")
-openai = OpenAI(api_key=OPENAI_KEY)
+@functools.lru_cache(maxsize=1)
+def get_openai() -> OpenAI:
+    """OpenAI client, created on first use so ``chunk_text`` can be imported without credentials."""
+    key = os.getenv("OPENAI_API_KEY")
+    if not key:
+        raise RuntimeError("OPENAI_API_KEY missing")
+    return OpenAI(api_key=key)
 
 # ────────────── helpers ─────────────────────────────────────────
 def chunk_text(text: str) -> list[str]:
@@ -39,56 +91,455 @@ def chunk_text(text: str) -> list[str]:
         i += CHUNK_SIZE - OVERLAP
     return out
 
+def get_embedder() -> EmbeddingProvider:
+    """Embedding provider of the policy collection (EMBED_MODEL)."""
+    return get_embedding_provider(EMBED_MODEL, get_openai)
+
+@functools.lru_cache(maxsize=1)
+def get_embedding_client() -> EmbeddingClient:
+    """One client per process, so every pipeline thread shares its concurrency and rate budget."""
+    embedder = get_embedder()
+    limiter = RateLimiter(EMBED_TPM, EMBED_RPM) if EMBED_TPM or EMBED_RPM else None
+    return EmbeddingClient(
+        embedder.embed_documents,
+        max_batch_size=EMBED_BATCH_SIZE,
+        max_batch_tokens=EMBED_BATCH_TOKENS,
+        # an in-process model parallelizes internally; concurrent calls would only contend
+        max_concurrency=EMBED_REQUESTS if embedder.remote else 1,
+        rate_limiter=limiter,
+    )
+
 def embed(batch: list[str]) -> list[list[float]]:
-    resp = openai.embeddings.create(model=EMBED_MODEL, input=batch)
-    return [d.embedding for d in resp.data]
+    """
+    Embed ``batch`` in order, only sending texts missing from the embedding cache.
 
-def process_pdf(pdf_path: pathlib.Path, qc):
+    Large inputs are split into token-bounded requests; rate limits are retried.
+    """
+    return get_embedding_cache().embed(get_embedder().model, batch, get_embedding_client().embed)
+
+def extract_pages(pdf_path: pathlib.Path) -> list[str]:
+    """Plain text of each page of a PDF (runs in extraction worker processes)."""
     import pdfplumber
 
-    log.info("▶ %s", pdf_path.name)
     with pdfplumber.open(pdf_path) as pdf_obj:
-        raw = "\n".join(p.extract_text() or "" for p in pdf_obj.pages)
+        return [p.extract_text() or "" for p in pdf_obj.pages]
+
+def extract_text(pdf_path: pathlib.Path) -> str:
+    """Plain text of every page of a PDF."""
+    return "\n".join(extract_pages(pdf_path))
 
-    chunks  = chunk_text(raw)
-    vectors = embed(chunks)
+def _timed_extract(pdf_path: pathlib.Path) -> tuple[list[str], float]:
+    start = time.perf_counter()
+    return extract_pages(pdf_path), time.perf_counter() - start
 
+def chunk_document(pages: list[str]) -> list[PageChunk]:
+    return chunk_pages(pages, CHUNK_SIZE, OVERLAP)
+
+def ingest_settings() -> str:
+    """Everything besides the PDF bytes that determines its points; a change re-embeds every chunk."""
+    return f"{get_embedder().model}:{CHUNK_SIZE}:{OVERLAP}:v{PAYLOAD_VERSION}"
+
+def chunk_identities(chunks: list[PageChunk]) -> list[str]:
+    """What a point stands for: a moved or re-headed chunk gets a new point (its embedding is cached)."""
+    return [f"{c.page_number}-{c.page_end}:{c.heading}:{c.text}" for c in chunks]
+
+def doc_key(pdf_path: pathlib.Path) -> str:
+    """Stable identifier of a PDF: its path relative to the policy folder."""
+    try:
+        return pdf_path.resolve().relative_to(PDF_DIR.resolve()).as_posix()
+    except ValueError:
+        return pdf_path.resolve().as_posix()
+
+def build_points(pdf_path: pathlib.Path, chunks: list[PageChunk], vectors: list[list[float]],
+                 ids: list[int] | None = None) -> list[PointStruct]:
+    ids = ids if ids is not None else chunk_point_ids(doc_key(pdf_path), chunk_identities(chunks))
     pts: list[PointStruct] = []
-    for n, (chunk, vec) in enumerate(zip(chunks, vectors)):
-        pid = int(hashlib.sha256(f"{pdf_path}:{n}".encode()).hexdigest()[:16], 16)
+    for pid, chunk, vec in zip(ids, chunks, vectors):
         pts.append(
             PointStruct(
                 id=pid,
                 vector=vec,
                 payload={
                     "document_title": pdf_path.stem,
-                    "page_number": None,
-                    "heading": "N/A",
-                    "content": chunk,
+                    "page_number": chunk.page_number,
+                    "page_end": chunk.page_end,
+                    "heading": chunk.heading,
+                    "content": chunk.text,
                 },
             )
         )
+    return pts
 
-    qc.upsert(collection_name=COLLECTION, points=pts, wait=True)
+def process_pdf(pdf_path: pathlib.Path, qc):
+    """Ingest a single PDF synchronously (all chunks, without consulting the ingest state)."""
+    log.info("▶ %s", pdf_path.name)
+    cache = ExtractCache(EXTRACT_CACHE_DIR)
+    sha = file_sha256(pdf_path)
+    pages = cache.get(sha)
+    if pages is None:
+        pages = extract_pages(pdf_path)
+        cache.put(sha, pages)
+    chunks = chunk_document(pages)
+    pts = build_points(pdf_path, chunks, embed([c.text for c in chunks]))
+    BulkUpserter(qc, COLLECTION, batch_size=UPSERT_BATCH, parallel=UPSERT_PARALLEL).run(pts, resume=False)
     log.info("   ↳ upserted %d chunks", len(pts))
 
+def delete_points(qc, ids: list[int]):
+    if ids:
+        qc.delete(collection_name=COLLECTION, points_selector=PointIdsList(points=ids), wait=True)
+
+def prune_untracked(qc, state: IngestState, page_size: int = 1000) -> int:
+    """Delete points of the collection that the ingest state does not know about."""
+    known, stale, offset = state.point_ids(), [], None
+    while True:
+        records, offset = qc.scroll(collection_name=COLLECTION, limit=page_size, offset=offset,
+                                    with_payload=False, with_vectors=False)
+        stale.extend(r.id for r in records if r.id not in known)
+        if offset is None:
+            break
+    for i in range(0, len(stale), page_size):
+        delete_points(qc, stale[i : i + page_size])
+    return len(stale)
+
+# ────────────── pipeline ────────────────────────────────────────
+_DONE = object()   # end-of-stream marker on the stage queues
+
+@dataclass
+class DocumentUpdate:
+    """A changed or new PDF on its way to Qdrant: points to upsert, then points to delete."""
+    key: str
+    name: str
+    sha256: str
+    point_ids: list[int]
+    points: list[PointStruct]
+    stale: list[int]
+    is_new: bool
+
+@dataclass
+class IngestStats:
+    """Counters shared by the pipeline stages; ``busy`` is seconds spent working per stage."""
+    pdfs_total: int
+    pdfs_new: int = 0
+    pdfs_changed: int = 0
+    pdfs_unchanged: int = 0
+    pdfs_removed: int = 0
+    chunks_added: int = 0
+    chunks_unchanged: int = 0
+    chunks_removed: int = 0
+    pdfs_extracted: int = 0
+    pdfs_embedded: int = 0
+    chunks_embedded: int = 0
+    points_upserted: int = 0
+    failed: list[str] = field(default_factory=list)
+    busy: dict[str, float] = field(default_factory=lambda: {"extract": 0.0, "embed": 0.0, "upsert": 0.0})
+    started: float = field(default_factory=time.perf_counter)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                if name in self.busy:
+                    self.busy[name] += value
+                else:
+                    setattr(self, name, getattr(self, name) + value)
+
+    def fail(self, name: str, error: Exception):
+        log.error("   ✗ %s: %s", name, error)
+        with self.lock:
+            self.failed.append(name)
+
+    def report(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (
+            f"{self.pdfs_extracted}/{self.pdfs_total} PDFs extracted, {self.pdfs_embedded} embedded, "
+            f"{self.points_upserted} points upserted in {elapsed:.1f}s "
+            f"({self.pdfs_embedded / elapsed:.2f} PDFs/s, {self.chunks_embedded / elapsed:.1f} chunks/s, "
+            f"{self.points_upserted / elapsed:.1f} points/s)"
+        )
+
+    def diff_summary(self) -> str:
+        return (
+            f"{self.pdfs_new} new, {self.pdfs_changed} changed, {self.pdfs_unchanged} unchanged, "
+            f"{self.pdfs_removed} removed PDFs; chunks +{self.chunks_added} -{self.chunks_removed} "
+            f"({self.chunks_unchanged} unchanged)"
+        )
+
+    def bottleneck(self, workers: dict[str, int]) -> str:
+        # Busy time divided by the stage's parallelism approximates its wall-clock share
+        load = {stage: self.busy[stage] / max(1, workers[stage]) for stage in self.busy}
+        return ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in
+                         sorted(load.items(), key=lambda item: -item[1]))
+
+def run_pipeline(
+    pdfs: list[pathlib.Path],
+    qc,
+    workers: int = EXTRACT_WORKERS,
+    embed_concurrency: int = EMBED_CONCURRENCY,
+    upsert_batch: int = UPSERT_BATCH,
+    upsert_parallel: int = UPSERT_PARALLEL,
+    checkpoint_every: int = CHECKPOINT_EVERY,
+    queue_size: int = QUEUE_SIZE,
+    progress_every: float = 10.0,
+    state: IngestState | None = None,
+    remove_missing: bool = False,
+    extract_cache: ExtractCache | None = None,
+) -> IngestStats:
+    """
+    Ingest PDFs through the extract ─▶ embed ─▶ upsert pipeline.
+
+    PDFs whose bytes and settings match ``state`` are skipped; for the rest,
+    only chunks without a point yet are embedded and upserted, then points of
+    chunks that disappeared are deleted and the state entry is updated. With
+    ``remove_missing``, points of recorded PDFs absent from ``pdfs`` are deleted.
+
+    A PDF that fails any stage is logged and recorded in ``stats.failed``;
+    its state entry is left as it was, so the next run retries it. An error
+    that breaks a whole stage (e.g. the state cannot be saved) stops the
+    pipeline without deadlocking it and is raised once every stage is done.
+
+    PDFs found in ``extract_cache`` are not parsed again.
+    """
+    state = state if state is not None else IngestState(None, COLLECTION)
+    extract_cache = extract_cache if extract_cache is not None else ExtractCache(None)
+    settings = ingest_settings()
+    stats = IngestStats(pdfs_total=len(pdfs))
+    texts: queue.Queue = queue.Queue(maxsize=queue_size)     # (path, key, sha256, page texts)
+    batches: queue.Queue = queue.Queue(maxsize=queue_size)   # DocumentUpdate per PDF
+
+    todo: list[tuple[pathlib.Path, str, str]] = []
+    for pdf_path in pdfs:
+        key = doc_key(pdf_path)
+        try:
+            sha = file_sha256(pdf_path)
+        except OSError as e:
+            stats.fail(pdf_path.name, e)
+            continue
+        if state.is_unchanged(key, sha, settings):
+            stats.add(pdfs_unchanged=1, chunks_unchanged=len(state.get(key)["points"]))
+        else:
+            todo.append((pdf_path, key, sha))
+
+    if remove_missing:
+        present = {doc_key(p) for p in pdfs}
+        for key in [k for k in state.documents if k not in present]:
+            stale = state.get(key)["points"]
+            try:
+                delete_points(qc, stale)
+            except Exception as e:
+                stats.fail(f"removal of {key}", e)
+                continue
+            state.remove(key)
+            stats.add(pdfs_removed=1, chunks_removed=len(stale))
+            log.info("✗ %s: removed, deleted %d points", key, len(stale))
+
+    stage_errors: list[Exception] = []
+
+    def stage_failed(stage: str, error: Exception):
+        log.error("   ✗ %s stage failed: %s", stage, error, exc_info=True)
+        stage_errors.append(error)
+
+    def drain(q: queue.Queue):
+        """Keep consuming ``q`` until end of stream, so its producers never block on a dead stage."""
+        while q.get() is not _DONE:
+            pass
+
+    def extract_stage():
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = iter(todo)
+                in_flight: dict = {}
+                while True:
+                    while len(in_flight) < workers * 2:
+                        item = next(pending, None)
+                        if item is None:
+                            break
+                        pages = extract_cache.get(item[2])
+                        if pages is not None:
+                            stats.add(pdfs_extracted=1)
+                            texts.put((*item, pages))
+                            continue
+                        in_flight[pool.submit(_timed_extract, item[0])] = item
+                    if not in_flight:
+                        break
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pdf_path, key, sha = in_flight.pop(future)
+                        try:
+                            pages, seconds = future.result()
+                            extract_cache.put(sha, pages)
+                        except Exception as e:
+                            stats.fail(pdf_path.name, e)
+                            continue
+                        stats.add(pdfs_extracted=1, extract=seconds)
+                        texts.put((pdf_path, key, sha, pages))   # blocks while the embed stage is behind
+                    if stage_errors:
+                        break   # a later stage died, stop producing
+        except Exception as e:
+            stage_failed("extract", e)
+        finally:
+            for _ in range(embed_concurrency):
+                texts.put(_DONE)
+
+    def embed_stage():
+        try:
+            embed_documents()
+        except Exception as e:
+            stage_failed("embed", e)
+            drain(texts)
+
+    def embed_documents():
+        while (item := texts.get()) is not _DONE:
+            pdf_path, key, sha, pages = item
+            start = time.perf_counter()
+            entry = state.get(key)
+            # Same settings: points already stored for identical chunk text stay as they are
+            existing = set(entry["points"]) if entry and entry["settings"] == settings else set()
+            try:
+                chunks = chunk_document(pages)
+                ids = chunk_point_ids(key, chunk_identities(chunks))
+                new = [i for i, pid in enumerate(ids) if pid not in existing]
+                new_chunks = [chunks[i] for i in new]
+                vectors = embed([c.text for c in new_chunks])
+                pts = build_points(pdf_path, new_chunks, vectors, [ids[i] for i in new])
+            except Exception as e:
+                stats.fail(pdf_path.name, e)
+                continue
+            stale = sorted(set(entry["points"]) - set(ids)) if entry else []
+            stats.add(pdfs_embedded=1, chunks_embedded=len(new_chunks), embed=time.perf_counter() - start)
+            log.info("▶ %s: %d chunks, +%d -%d", pdf_path.name, len(chunks), len(pts), len(stale))
+            batches.put(DocumentUpdate(key, pdf_path.name, sha, ids, pts, stale, is_new=entry is None))
+
+    def upsert_stage():
+        # The ingest state doubles as the checkpoint: PDFs are recorded once stored
+        uploader = BulkUpserter(qc, COLLECTION, batch_size=upsert_batch, parallel=upsert_parallel,
+                                checkpoint_every=checkpoint_every, on_checkpoint=lambda _: state.save())
+
+        def finish(update: DocumentUpdate):
+            # Only once every new point is stored, so searches never lose a chunk in between
+            try:
+                delete_points(qc, update.stale)
+            except Exception as e:
+                stats.fail(update.name, e)
+                return
+            state.record(update.key, update.sha256, settings, update.point_ids)
+            stats.add(pdfs_new=int(update.is_new), pdfs_changed=int(not update.is_new),
+                      chunks_added=len(update.points), chunks_removed=len(update.stale),
+                      chunks_unchanged=len(update.point_ids) - len(update.points))
+
+        def stored(update: DocumentUpdate):
+            def done(error: Exception | None):
+                if error is not None:
+                    stats.fail(update.name, error)
+                    return
+                stats.add(points_upserted=len(update.points))
+                finish(update)
+            return done
+
+        input_done = False
+        try:
+            while (item := batches.get()) is not _DONE:
+                if item.points:
+                    uploader.add(item.points, on_done=stored(item))
+                else:
+                    finish(item)
+            input_done = True
+            uploader.finish()
+        except Exception as e:
+            stage_failed("upsert", e)
+            if not input_done:
+                drain(batches)
+                with contextlib.suppress(Exception):
+                    uploader.finish()   # record what was stored, stop the upload threads
+        finally:
+            stats.add(upsert=uploader.stats.busy)
+
+    extractor = threading.Thread(target=extract_stage, name="ingest-extract", daemon=True)
+    embedders = [threading.Thread(target=embed_stage, name=f"ingest-embed-{i}", daemon=True)
+                 for i in range(embed_concurrency)]
+    upserter = threading.Thread(target=upsert_stage, name="ingest-upsert", daemon=True)
+    for thread in (extractor, *embedders, upserter):
+        thread.start()
+
+    extractor.join()
+    for thread in embedders:
+        while thread.is_alive():
+            thread.join(timeout=progress_every)
+            if not upserter.is_alive() and not stage_errors:
+                # died without reporting: take over draining so the embedders can finish
+                stage_errors.append(RuntimeError("upsert stage exited unexpectedly"))
+                threading.Thread(target=drain, args=(batches,), daemon=True).start()
+            if thread.is_alive():
+                log.info("   … %s", stats.report())
+    batches.put(_DONE)
+    upserter.join()
+    if stage_errors:
+        raise stage_errors[0]
+    return stats
+
 # ────────────── main ────────────────────────────────────────────
-def main():
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Ingest policy PDFs into Qdrant.")
+    parser.add_argument("--workers", type=int, default=EXTRACT_WORKERS,
+                        help="PDF extraction processes (default: %(default)s)")
+    parser.add_argument("--embed-concurrency", type=int, default=EMBED_CONCURRENCY,
+                        help="PDFs embedded at once (default: %(default)s)")
+    parser.add_argument("--upsert-batch", type=int, default=UPSERT_BATCH,
+                        help="points per Qdrant upsert (default: %(default)s)")
+    parser.add_argument("--upsert-parallel", type=int, default=UPSERT_PARALLEL,
+                        help="Qdrant upserts in flight (default: %(default)s)")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY,
+                        help="points between checkpoints of the ingest state (default: %(default)s)")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE,
+                        help="PDFs buffered between stages (default: %(default)s)")
+    parser.add_argument("--full", action="store_true",
+                        help="ignore the ingest state and re-embed every PDF")
+    parser.add_argument("--prune", action="store_true",
+                        help="also delete collection points the ingest state does not know about")
+    args = parser.parse_args(argv)
+
+    embedder = get_embedder()
+    if isinstance(embedder, OpenAIEmbeddingProvider):
+        get_openai()  # fail fast on missing credentials, before touching Qdrant
     qc = get_qdrant_client()
-    ensure_collection_exists(qc, COLLECTION)
+    ensure_collection_exists(qc, COLLECTION, vector_size=embedder.dim or DEFAULT_VEC_SIZE)
 
     pdfs = [
         p for p in PDF_DIR.glob("**/*")
         if mimetypes.guess_type(p.name)[0] == "application/pdf"
     ]
-    if not pdfs:
+    state = IngestState(STATE_PATH, COLLECTION)
+    if args.full:
+        state.documents = {key: {**entry, "sha256": None, "settings": None}
+                           for key, entry in state.documents.items()}
+    if not pdfs and not state.documents:
         log.warning("No PDFs under %s", PDF_DIR)
         return
 
-    for p in pdfs:
-        process_pdf(p, qc)
+    try:
+        extract_cache = ExtractCache(EXTRACT_CACHE_DIR)
+        stats = run_pipeline(pdfs, qc, max(1, args.workers), max(1, args.embed_concurrency),
+                             max(1, args.upsert_batch), max(1, args.upsert_parallel),
+                             max(1, args.checkpoint_every), max(1, args.queue_size),
+                             state=state, remove_missing=True, extract_cache=extract_cache)
+        if args.prune:
+            pruned = prune_untracked(qc, state)
+            if pruned:
+                bump_collection_version(COLLECTION)
+            log.info("   pruned %d untracked points", pruned)
+        elif not state.existed:
+            log.info("   first tracked ingest: run with --prune to delete points left by earlier ingests")
+    finally:
+        state.save()
 
-    log.info("✅ Ingested %d PDFs into '%s'", len(pdfs), COLLECTION)
+    log.info("✅ Ingested %d of %d PDFs into '%s'", stats.pdfs_embedded, len(pdfs), COLLECTION)
+    log.info("   diff: %s", stats.diff_summary())
+    log.info("   %s", stats.report())
+    log.info("   stage load (busy time / parallelism): %s", stats.bottleneck(
+        {"extract": args.workers, "embed": args.embed_concurrency, "upsert": args.upsert_parallel}))
+    if stats.failed:
+        log.warning("   %d failure(s): %s", len(stats.failed), ", ".join(stats.failed))
+    log.info("   extraction cache: %s", extract_cache.stats())
+    log.info("   embedding cache: %s", get_embedding_cache().stats())
 
 
 if __name__ == "__main__":
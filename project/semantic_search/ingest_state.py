@@ -0,0 +1,124 @@
+# project/semantic_search/ingest_state.py
+"""
+What the last policy ingest put into Qdrant, so the next one only does the difference.
+
+One JSON file maps each PDF (path relative to the policy folder) to the
+SHA-256 of its bytes, the settings it was chunked and embedded with, and
+the IDs of its points. Point IDs are derived from the chunk itself (text,
+page and heading), so an unchanged chunk keeps its ID when text around it
+is edited.
+
+Every save that records a change also bumps the collection's version in a
+small separate file, which the search service checks to drop cached answers.
+"""
+
+from __future__ import annotations
+import os, json, uuid, hashlib, logging, pathlib
+from datetime import datetime
+from typing import Any
+
+log = logging.getLogger(__name__)
+
+VERSION_PATH = pathlib.Path(os.getenv("COLLECTION_VERSION_PATH",
+                                      str(pathlib.Path(__file__).parent / "collection_versions.json")))
+
+def read_collection_version(collection: str, path: pathlib.Path = VERSION_PATH) -> str:
+    """Current version tag of ``collection`` ("" if it was never ingested with state tracking)."""
+    try:
+        return json.loads(path.read_text()).get(collection, "")
+    except (OSError, ValueError):
+        return ""
+
+def bump_collection_version(collection: str, path: pathlib.Path = VERSION_PATH) -> str:
+    """Give ``collection`` a new version tag, after its points changed."""
+    try:
+        versions = json.loads(path.read_text())
+    except (OSError, ValueError):
+        versions = {}
+    versions[collection] = f"{datetime.now().isoformat(timespec='seconds')}-{uuid.uuid4().hex[:8]}"
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(versions))
+    os.replace(tmp_path, path)
+    return versions[collection]
+
+def file_sha256(path: pathlib.Path, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            h.update(block)
+    return h.hexdigest()
+
+def chunk_point_ids(doc_key: str, chunks: list[str]) -> list[int]:
+    """
+    Stable point ID per chunk: hash of the document, the chunk's identity
+    string and how many identical chunks precede it in the document.
+    """
+    seen: dict[str, int] = {}
+    ids: list[int] = []
+    for chunk in chunks:
+        text_hash = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+        n = seen[text_hash] = seen.get(text_hash, -1) + 1
+        ids.append(int(hashlib.sha256(f"{doc_key}:{text_hash}:{n}".encode()).hexdigest()[:16], 16))
+    return ids
+
+class IngestState:
+    """Per-PDF content hash, ingest settings and point IDs for one collection."""
+
+    def __init__(self, path: pathlib.Path | None, collection: str):
+        """
+        Args:
+            path: JSON file (created on first save); None keeps state in memory only
+            collection: Qdrant collection the recorded points live in
+        """
+        self.path = path
+        self.collection = collection
+        self.documents: dict[str, dict[str, Any]] = {}
+        self.existed = False
+        self._dirty = False
+
+        if path is None or not path.exists():
+            return
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring unreadable ingest state %s: %s", path, e)
+            return
+        if data.get("collection") != collection:
+            log.warning("Ingest state %s is for collection '%s', not '%s' – starting fresh",
+                        path, data.get("collection"), collection)
+            return
+        self.documents = data.get("documents", {})
+        self.existed = True
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        return self.documents.get(key)
+
+    def is_unchanged(self, key: str, sha256: str, settings: str) -> bool:
+        entry = self.documents.get(key)
+        return bool(entry) and entry["sha256"] == sha256 and entry["settings"] == settings
+
+    def record(self, key: str, sha256: str, settings: str, point_ids: list[int]):
+        self.documents[key] = {
+            "sha256": sha256,
+            "settings": settings,
+            "points": point_ids,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self._dirty = True
+
+    def remove(self, key: str):
+        if self.documents.pop(key, None) is not None:
+            self._dirty = True
+
+    def point_ids(self) -> set[int]:
+        return {pid for entry in self.documents.values() for pid in entry["points"]}
+
+    def save(self):
+        """Write the state atomically if anything changed, and bump the collection version."""
+        if self.path is None or not self._dirty:
+            return
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps({"collection": self.collection, "documents": self.documents}))
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        bump_collection_version(self.collection)
@@ -6,19 +6,47 @@ Mount this router inside your existing FastAPI app:
     app.include_router(semantic_router, prefix="/semantic")
 """
 
-from fastapi import APIRouter, HTTPException, status
+import asyncio, json, logging
+from typing import Annotated, List
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from starlette.concurrency import run_in_threadpool
-from .search_logic import perform_rag_search
+from .search_logic import (BATCH_MAX_QUERIES, perform_rag_search_async,
+                           perform_rag_search_batch_async, stream_rag_search)
+
+log = logging.getLogger(__name__)
 
 semantic_router = APIRouter(tags=["semantic‑search"])
 
+DISCONNECT_POLL = 0.5   # seconds between client-disconnect checks
+CLIENT_CLOSED_REQUEST = 499
+
 class QueryIn(BaseModel):
     query: str = Field(..., min_length=3, max_length=500)
 
+class BatchQueryIn(BaseModel):
+    queries: List[Annotated[str, Field(min_length=3, max_length=500)]] = Field(
+        ..., min_length=1, max_length=BATCH_MAX_QUERIES)
+    answer: bool = True   # False: retrieval and citations only, no chat completions
+
+async def run_cancelling_on_disconnect(request: Request, coro):
+    """Await ``coro``, cancelling it if the client goes away first."""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                log.info("Client disconnected – cancelling %s", request.url.path)
+                task.cancel()
+                raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+    finally:
+        task.cancel()   # no-op once done; stops the work if this handler is cancelled
+
 @semantic_router.post("/search")
-async def semantic_search(body: QueryIn):
-    result = await run_in_threadpool(perform_rag_search, body.query)
+async def semantic_search(body: QueryIn, request: Request):
+    result = await run_cancelling_on_disconnect(request, perform_rag_search_async(body.query))
 
     if result["error"]:
         raise HTTPException(
@@ -26,3 +54,31 @@ async def semantic_search(body: QueryIn):
             detail=result["error"],
         )
     return result
+
+async def sse_events(query: str):
+    async for event, data in stream_rag_search(query):
+        yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@semantic_router.post("/search/stream")
+async def semantic_search_stream(body: QueryIn):
+    """
+    ``/search`` as server-sent events: ``citations`` right after retrieval,
+    ``token`` events while the answer is generated, then ``done`` (or
+    ``error``). The stream is cancelled if the client disconnects.
+    """
+    return StreamingResponse(
+        sse_events(body.query),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@semantic_router.post("/search/batch")
+async def semantic_search_batch(body: BatchQueryIn, request: Request):
+    """
+    Several ``/search`` queries at once. Results come back in input order,
+    each with its own ``error`` (None on success), so one failed query does
+    not fail the batch.
+    """
+    results = await run_cancelling_on_disconnect(
+        request, perform_rag_search_batch_async(body.queries, answer=body.answer))
+    return {"results": [dict(r, query=q) for q, r in zip(body.queries, results)]}
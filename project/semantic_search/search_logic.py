@@ -1,15 +1,30 @@
 from __future__ import annotations
-import os, logging
-from typing import Dict, Any, List
+import os, asyncio, logging, functools, contextlib
+from typing import AsyncIterator, Dict, Any, List, Tuple
 
-from openai import OpenAI, APIError, RateLimitError
-from .vector_client import get_qdrant_client, COLLECTION
+from openai import AsyncOpenAI, OpenAI, APIError, RateLimitError
+from qdrant_client.http.models import QueryRequest
+from .vector_client import get_async_qdrant_client, get_qdrant_client, COLLECTION
+from .context_packer import CONTEXT_TOKEN_BUDGET, pack_snippets
+from .answer_cache import (AnswerCache, ANSWER_CACHE_ITEMS, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_MATCH_HITS,
+                           collection_version_fn)
+
+try:  # project/ on sys.path (combined_main)
+    from shared.embedding_providers import OpenAIEmbeddingProvider, get_embedding_provider
+    from shared.query_cache import get_query_cache, normalize_query
+    from shared.singleflight import AsyncSingleFlight, SingleFlight
+    from shared.embedding_client import get_model_token_counter
+except ImportError:  # imported as project.semantic_search
+    from ..shared.embedding_providers import OpenAIEmbeddingProvider, get_embedding_provider
+    from ..shared.query_cache import get_query_cache, normalize_query
+    from ..shared.singleflight import AsyncSingleFlight, SingleFlight
+    from ..shared.embedding_client import get_model_token_counter
 
 # ────────────── helper functions ────────────────────────────
 def embed_query(query: str) -> List[float]:
-    """Return the embedding vector for a query string."""
-    resp = openai.embeddings.create(model=EMBED_MODEL, input=query)
-    return resp.data[0].embedding
+    """Return the embedding vector for a query string (cached, shared with the RAG chatbot)."""
+    embedder = get_embedding_provider(EMBED_MODEL, get_openai)
+    return get_query_cache().embed(embedder.model, query, embedder.embed_query)
 
 def search_qdrant(vec: List[float]):
     """Search Qdrant using the provided vector and return hits."""
@@ -29,6 +44,7 @@ def build_context_and_citations(hits):
         text = pl.get("content") or pl.get("text") or "[NO TEXT]"
         doc  = pl.get("document_title", "Unknown Document")
         page = pl.get("page_number")
+        pages = set(pl.get("page_numbers") or ([page] if page is not None else []))
         head = pl.get("heading", "N/A")
         url = None
 
@@ -36,7 +52,7 @@ def build_context_and_citations(hits):
             agg[doc] = {
                 "source_ids":    [i],
                 "document_title": doc,
-                "page_numbers":   {page} if page is not None else set(),
+                "page_numbers":   pages,
                 "headings":       [head],
                 "qdrant_ids":     [h.id],
                 "scores":         [h.score],
@@ -45,8 +61,7 @@ def build_context_and_citations(hits):
         else:
             e = agg[doc]
             e["source_ids"].append(i)
-            if page is not None:
-                e["page_numbers"].add(page)
+            e["page_numbers"] |= pages
             e["headings"].append(head)
             e["qdrant_ids"].append(h.id)
             e["scores"].append(h.score)
@@ -65,8 +80,17 @@ def build_context_and_citations(hits):
 
     return "\n\n".join(ctx), cites
 
-def ask_llm(query: str, context: str) -> str:
-    """Call the chat model with the provided context and query."""
+def pack_context_and_citations(hits):
+    """
+    ``build_context_and_citations`` over the hits that fit in CONTEXT_TOKEN_BUDGET
+    tokens, after merging overlapping chunks and dropping repeated text; only
+    what made it into the context is cited.
+    """
+    snippets = pack_snippets(hits, get_model_token_counter(CHAT_MODEL), CONTEXT_TOKEN_BUDGET)
+    log.debug("Packed %d hits into %d snippets", len(hits), len(snippets))
+    return build_context_and_citations(snippets)
+
+def _chat_messages(query: str, context: str) -> List[Dict[str, str]]:
     sys_prompt = (
         "You are an AI assistant that provides answers ONLY using the numbered context snippets provided. "
         "When you respond: "
@@ -76,10 +100,13 @@ def ask_llm(query: str, context: str) -> str:
         "If you cannot find relevant information in the snippets provided, state that the requested information is not available in the policy document repository."
     )
     user_msg = f"CONTEXT:\n{context}\n\nQUESTION: {query}"
+    return [{"role": "system", "content": sys_prompt}, {"role": "user", "content": user_msg}]
 
-    chat = openai.chat.completions.create(
+def ask_llm(query: str, context: str) -> str:
+    """Call the chat model with the provided context and query."""
+    chat = get_openai().chat.completions.create(
         model=CHAT_MODEL,
-        messages=[{"role": "system", "content": sys_prompt}, {"role": "user", "content": user_msg}],
+        messages=_chat_messages(query, context),
         max_tokens=512,
     )
     return chat.choices[0].message.content.strip()
@@ -88,20 +115,69 @@ def ask_llm(query: str, context: str) -> str:
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
 
-OPENAI_KEY  = os.getenv("OPENAI_API_KEY")
-if not OPENAI_KEY:
-    raise RuntimeError("Set OPENAI_API_KEY for semantic‑search")
-openai = OpenAI(api_key=OPENAI_KEY)
+@functools.lru_cache(maxsize=1)
+def get_openai() -> OpenAI:
+    """OpenAI client, created on first use so importing this module needs no credentials."""
+    key = os.getenv("OPENAI_API_KEY")
+    if not key:
+        raise RuntimeError("Set OPENAI_API_KEY for semantic‑search")
+    return OpenAI(api_key=key)
+
+@functools.lru_cache(maxsize=1)
+def get_async_openai() -> AsyncOpenAI:
+    """Async OpenAI client for the async search path."""
+    key = os.getenv("OPENAI_API_KEY")
+    if not key:
+        raise RuntimeError("Set OPENAI_API_KEY for semantic‑search")
+    return AsyncOpenAI(api_key=key)
 
-EMBED_MODEL  = os.getenv("EMBED_MODEL", "text-embedding-ada-002")
+EMBED_MODEL  = os.getenv("EMBED_MODEL", "text-embedding-ada-002")   # provider spec, e.g. "local:BAAI/bge-small-en-v1.5"
 CHAT_MODEL   = os.getenv("CHAT_MODEL",  "gpt-4o-mini")
 SEARCH_LIMIT = int(os.getenv("SEARCH_LIMIT", "20"))
 
+# per-stage time limits of the async path, in seconds
+EMBED_TIMEOUT  = float(os.getenv("SEARCH_EMBED_TIMEOUT", "10"))
+QDRANT_TIMEOUT = float(os.getenv("SEARCH_QDRANT_TIMEOUT", "10"))
+LLM_TIMEOUT    = float(os.getenv("SEARCH_LLM_TIMEOUT", "60"))
+
+# batch endpoint: queries per request, chat completions in flight per batch
+BATCH_MAX_QUERIES    = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "50"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("SEARCH_BATCH_LLM_CONCURRENCY", "4"))
+
+@functools.lru_cache(maxsize=1)
+def get_answer_cache() -> AnswerCache | None:
+    """Answers for paraphrased queries; None when ANSWER_CACHE_ITEMS=0."""
+    if ANSWER_CACHE_ITEMS <= 0:
+        return None
+    return AnswerCache(ANSWER_CACHE_ITEMS, ANSWER_CACHE_THRESHOLD,
+                       collection_version_fn(COLLECTION, CHAT_MODEL, SEARCH_LIMIT, CONTEXT_TOKEN_BUDGET),
+                       match_hits=ANSWER_CACHE_MATCH_HITS)
+
+def cached_answer(vec: List[float], hits) -> Dict[str, Any] | None:
+    """Cached answer of a similar query that retrieved the same top ``hits``."""
+    cache = get_answer_cache()
+    return cache.lookup(vec, [h.id for h in hits]) if cache else None
+
+def remember_answer(vec: List[float], hits, result: Dict[str, Any]):
+    cache = get_answer_cache()
+    if cache:
+        cache.put(vec, [h.id for h in hits], result)
+
+# identical queries in flight at the same time share one pipeline run
+_search_flight = SingleFlight()
+_async_search_flight = AsyncSingleFlight()
+
 # ────────────── public function the router will call ───────────
 def perform_rag_search(query: str) -> Dict[str, Any]:
     """
     returns dict(answer:str, citations:list[dict], error:str|None)
+
+    Concurrent calls with the same query (ignoring case and spacing) share
+    one run and its result.
     """
+    return _search_flight.do(normalize_query(query), _perform_rag_search, query)
+
+def _perform_rag_search(query: str) -> Dict[str, Any]:
     try:
         try:
             vec = embed_query(query)
@@ -121,7 +197,10 @@ def perform_rag_search(query: str) -> Dict[str, Any]:
             return {"answer": "No matching policy text found.",
                     "citations": [], "error": None}
 
-        context, cites = build_context_and_citations(hits)
+        if (cached := cached_answer(vec, hits)) is not None:
+            return cached
+
+        context, cites = pack_context_and_citations(hits)
 
         try:
             answer = ask_llm(query, context)
@@ -130,8 +209,286 @@ def perform_rag_search(query: str) -> Dict[str, Any]:
             log.error(err, exc_info=True)
             return {"answer": "", "citations": cites, "error": err}
 
-        return {"answer": answer, "citations": cites, "error": None}
+        result = {"answer": answer, "citations": cites, "error": None}
+        remember_answer(vec, hits, result)
+        return result
 
     except Exception as ex:
         log.error("perform_rag_search failed: %s", ex, exc_info=True)
         return {"answer": "", "citations": [], "error": str(ex)}
+
+# ────────────── async path (used by the router) ────────────────
+async def embed_query_async(query: str) -> List[float]:
+    """``embed_query`` without blocking the event loop; in-process models run in a thread."""
+    embedder = get_embedding_provider(EMBED_MODEL, get_openai)
+
+    async def create(text: str) -> List[float]:
+        if isinstance(embedder, OpenAIEmbeddingProvider):
+            resp = await get_async_openai().embeddings.create(model=embedder.model, input=[text])
+            return resp.data[0].embedding
+        return await asyncio.to_thread(embedder.embed_query, text)
+
+    return await get_query_cache().embed_async(embedder.model, query, create)
+
+async def search_qdrant_async(vec: List[float]):
+    return await get_async_qdrant_client().search(collection_name=COLLECTION, query_vector=vec,
+                                                  limit=SEARCH_LIMIT, with_payload=True)
+
+async def ask_llm_async(query: str, context: str) -> str:
+    chat = await get_async_openai().chat.completions.create(
+        model=CHAT_MODEL,
+        messages=_chat_messages(query, context),
+        max_tokens=512,
+    )
+    return chat.choices[0].message.content.strip()
+
+async def retrieve_async(query: str) -> Tuple[List[float] | None, list, Dict[str, Any] | None]:
+    """
+    Embedding and search stages of the async path.
+
+    Returns ``(vec, hits, None)``, or ``(vec, [], result)`` when the query is
+    settled without the LLM: a stage failed or timed out, the answer cache
+    had it, or nothing matched.
+    """
+    try:
+        vec = await asyncio.wait_for(embed_query_async(query), EMBED_TIMEOUT)
+    except asyncio.TimeoutError:
+        err = f"OpenAI embedding timed out after {EMBED_TIMEOUT:g}s"
+        log.error(err)
+        return None, [], {"answer": "", "citations": [], "error": err}
+    except (APIError, RateLimitError) as e:
+        err = f"OpenAI embedding error: {e}"
+        log.error(err, exc_info=True)
+        return None, [], {"answer": "", "citations": [], "error": err}
+
+    try:
+        hits = await asyncio.wait_for(search_qdrant_async(vec), QDRANT_TIMEOUT)
+    except asyncio.TimeoutError:
+        err = f"Qdrant search timed out after {QDRANT_TIMEOUT:g}s"
+        log.error(err)
+        return vec, [], {"answer": "", "citations": [], "error": err}
+    except Exception as e:
+        err = f"Qdrant search failed: {e}"
+        log.error(err, exc_info=True)
+        return vec, [], {"answer": "", "citations": [], "error": err}
+
+    if not hits:
+        return vec, [], {"answer": "No matching policy text found.",
+                         "citations": [], "error": None}
+    if (cached := cached_answer(vec, hits)) is not None:
+        return vec, [], cached
+    return vec, hits, None
+
+async def perform_rag_search_async(query: str) -> Dict[str, Any]:
+    """
+    Async ``perform_rag_search``: same return contract, no threads held
+    while waiting on OpenAI or Qdrant, and each stage bounded by its timeout.
+
+    Identical concurrent queries share one run. Cancelling the task (e.g.
+    the client disconnected) cancels the requests in flight once no other
+    caller is waiting for them.
+    """
+    return await _async_search_flight.do(normalize_query(query), _perform_rag_search_async, query)
+
+async def _perform_rag_search_async(query: str) -> Dict[str, Any]:
+    try:
+        vec, hits, settled = await retrieve_async(query)
+        if settled is not None:
+            return settled
+
+        context, cites = pack_context_and_citations(hits)
+
+        try:
+            answer = await asyncio.wait_for(ask_llm_async(query, context), LLM_TIMEOUT)
+        except asyncio.TimeoutError:
+            err = f"ChatCompletion timed out after {LLM_TIMEOUT:g}s"
+            log.error(err)
+            return {"answer": "", "citations": cites, "error": err}
+        except (APIError, RateLimitError) as e:
+            err = f"ChatCompletion error: {e}"
+            log.error(err, exc_info=True)
+            return {"answer": "", "citations": cites, "error": err}
+
+        result = {"answer": answer, "citations": cites, "error": None}
+        remember_answer(vec, hits, result)
+        return result
+
+    except Exception as ex:
+        log.error("perform_rag_search_async failed: %s", ex, exc_info=True)
+        return {"answer": "", "citations": [], "error": str(ex)}
+
+# ────────────── streaming path (server-sent events) ────────────
+async def stream_llm_async(query: str, context: str) -> AsyncIterator[str]:
+    """Answer text as the chat model generates it, finishing within LLM_TIMEOUT."""
+    deadline = asyncio.get_running_loop().time() + LLM_TIMEOUT
+    remaining = lambda: max(0.0, deadline - asyncio.get_running_loop().time())
+
+    stream = await asyncio.wait_for(get_async_openai().chat.completions.create(
+        model=CHAT_MODEL,
+        messages=_chat_messages(query, context),
+        max_tokens=512,
+        stream=True,
+    ), remaining())
+    try:
+        chunks = stream.__aiter__()
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), remaining())
+            except StopAsyncIteration:
+                return
+            if chunk.choices and (text := chunk.choices[0].delta.content):
+                yield text
+    finally:
+        await stream.close()   # frees the connection if the consumer stopped early
+
+async def stream_rag_search(query: str) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    ``perform_rag_search_async`` as a sequence of ``(event, data)`` pairs:
+
+        ("citations", {"citations": [...]})   once, right after retrieval
+        ("token",     {"text": "..."})        answer text as it is generated
+        ("done",      {"answer": "...", "error": None})
+        ("error",     {"error": "..."})        instead of "done" when a stage fails
+
+    Closing the generator (the client went away) cancels the completion.
+    """
+    try:
+        vec, hits, settled = await retrieve_async(query)
+        if settled is not None:
+            yield "citations", {"citations": settled["citations"]}
+            if settled["error"]:
+                yield "error", {"error": settled["error"]}
+                return
+            yield "token", {"text": settled["answer"]}
+            yield "done", {"answer": settled["answer"], "error": None}
+            return
+
+        context, cites = pack_context_and_citations(hits)
+        yield "citations", {"citations": cites}
+
+        parts: List[str] = []
+        try:
+            async with contextlib.aclosing(stream_llm_async(query, context)) as tokens:
+                async for text in tokens:
+                    parts.append(text)
+                    yield "token", {"text": text}
+        except asyncio.TimeoutError:
+            err = f"ChatCompletion timed out after {LLM_TIMEOUT:g}s"
+            log.error(err)
+            yield "error", {"error": err}
+            return
+        except (APIError, RateLimitError) as e:
+            err = f"ChatCompletion error: {e}"
+            log.error(err, exc_info=True)
+            yield "error", {"error": err}
+            return
+
+        answer = "".join(parts).strip()
+        remember_answer(vec, hits, {"answer": answer, "citations": cites, "error": None})
+        yield "done", {"answer": answer, "error": None}
+
+    except Exception as ex:
+        log.error("stream_rag_search failed: %s", ex, exc_info=True)
+        yield "error", {"error": str(ex)}
+
+# ────────────── batch path (many queries, one round-trip per stage) ──
+async def embed_queries_async(queries: List[str]) -> List[List[float]]:
+    """Vectors of ``queries``; the uncached ones are embedded in one request."""
+    embedder = get_embedding_provider(EMBED_MODEL, get_openai)
+
+    async def create(texts: List[str]) -> List[List[float]]:
+        if isinstance(embedder, OpenAIEmbeddingProvider):
+            resp = await get_async_openai().embeddings.create(model=embedder.model, input=texts)
+            return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+        return await asyncio.to_thread(embedder.embed_documents, texts)
+
+    return await get_query_cache().embed_many_async(embedder.model, queries, create)
+
+async def search_qdrant_batch_async(vecs: List[List[float]]) -> List[list]:
+    """Hits per vector, from one Qdrant batch search."""
+    if not vecs:
+        return []
+    requests = [QueryRequest(query=v, limit=SEARCH_LIMIT, with_payload=True) for v in vecs]
+    responses = await get_async_qdrant_client().query_batch_points(collection_name=COLLECTION, requests=requests)
+    return [r.points for r in responses]
+
+async def perform_rag_search_batch_async(queries: List[str], answer: bool = True) -> List[Dict[str, Any]]:
+    """
+    ``perform_rag_search_async`` for many queries: one embedding request, one
+    Qdrant batch search, then at most BATCH_LLM_CONCURRENCY chat completions
+    at a time. Returns one result dict per query, in input order; a failed
+    stage fails only the queries it covered.
+
+    With ``answer=False`` only retrieval runs: each result has the citations
+    and an empty answer.
+    """
+    results: List[Dict[str, Any] | None] = [None] * len(queries)
+
+    def fail_pending(err: str):
+        for i, r in enumerate(results):
+            if r is None:
+                results[i] = {"answer": "", "citations": [], "error": err}
+
+    try:
+        vecs = await asyncio.wait_for(embed_queries_async(queries), EMBED_TIMEOUT)
+    except asyncio.TimeoutError:
+        err = f"OpenAI embedding timed out after {EMBED_TIMEOUT:g}s"
+        log.error(err)
+        fail_pending(err)
+        return results
+    except Exception as e:
+        err = f"OpenAI embedding error: {e}"
+        log.error(err, exc_info=True)
+        fail_pending(err)
+        return results
+
+    pending = list(range(len(queries)))
+
+    try:
+        batch_hits = await asyncio.wait_for(search_qdrant_batch_async([vecs[i] for i in pending]), QDRANT_TIMEOUT)
+    except asyncio.TimeoutError:
+        err = f"Qdrant search timed out after {QDRANT_TIMEOUT:g}s"
+        log.error(err)
+        fail_pending(err)
+        return results
+    except Exception as e:
+        err = f"Qdrant search failed: {e}"
+        log.error(err, exc_info=True)
+        fail_pending(err)
+        return results
+
+    contexts: Dict[int, str] = {}
+    hits_of: Dict[int, list] = {}
+    for i, hits in zip(pending, batch_hits):
+        if not hits:
+            results[i] = {"answer": "No matching policy text found.", "citations": [], "error": None}
+            continue
+        if answer and (cached := cached_answer(vecs[i], hits)) is not None:
+            results[i] = cached
+            continue
+        hits_of[i] = hits
+        contexts[i], cites = pack_context_and_citations(hits)
+        results[i] = {"answer": "", "citations": cites, "error": None}
+
+    if not answer:
+        return results
+
+    limit = asyncio.Semaphore(max(1, BATCH_LLM_CONCURRENCY))
+
+    async def answer_one(i: int):
+        async with limit:
+            try:
+                text = await asyncio.wait_for(ask_llm_async(queries[i], contexts[i]), LLM_TIMEOUT)
+            except asyncio.TimeoutError:
+                results[i]["error"] = f"ChatCompletion timed out after {LLM_TIMEOUT:g}s"
+                log.error(results[i]["error"])
+                return
+            except Exception as e:
+                results[i]["error"] = f"ChatCompletion error: {e}"
+                log.error(results[i]["error"], exc_info=True)
+                return
+        results[i]["answer"] = text
+        remember_answer(vecs[i], hits_of[i], results[i])
+
+    await asyncio.gather(*(answer_one(i) for i in contexts))
+    return results
@@ -6,7 +6,7 @@ Keeps all Qdrant settings in ONE place.
 
 from __future__ import annotations
 import os, functools, logging
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.http.models import VectorParams, Distance
 
 log = logging.getLogger(__name__)
@@ -28,12 +28,28 @@ def get_qdrant_client() -> QdrantClient:
         timeout=30,
     )
 
+@functools.lru_cache(maxsize=1)
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """Client for the async search path; use it from the app's event loop only."""
+    log.info("Connecting to Qdrant (async) at %s", QDRANT_URL)
+    return AsyncQdrantClient(
+        url=QDRANT_URL,
+        api_key=QDRANT_API_KEY,
+        timeout=30,
+    )
+
 def ensure_collection_exists(
     client: QdrantClient,
     name: str = COLLECTION,
     vector_size: int = DEFAULT_VEC_SIZE,
 ):
     if name in {c.name for c in client.get_collections().collections}:
+        existing = getattr(client.get_collection(name).config.params.vectors, "size", None)
+        if existing is not None and existing != vector_size:
+            raise ValueError(
+                f"Collection '{name}' holds {existing}-d vectors but the embedding model "
+                f"produces {vector_size}-d ones – set QDRANT_COLLECTION_NAME to another collection"
+            )
         return
     log.warning("Collection '%s' missing – creating it", name)
     client.create_collection(
@@ -0,0 +1 @@
+"""Infrastructure shared by the RAG chatbot and the policy semantic search."""
@@ -0,0 +1,301 @@
+# file: shared/bulk_upsert.py
+"""
+Resumable bulk loader for Qdrant.
+
+Points are sent in batches from a small thread pool with ``wait=False``, so
+Qdrant acknowledges each batch once it is in its write-ahead log instead of
+after indexing it. The loader only waits at checkpoints: every in-flight
+batch is drained, callers learn which of their points are stored, and the
+number of points stored so far is written to a checkpoint file. A load that
+crashes resumes from the last checkpoint instead of from the start.
+"""
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_PARALLEL = 4
+DEFAULT_CHECKPOINT_EVERY = 10_000
+DEFAULT_MAX_RETRIES = 3
+
+
+@dataclass
+class BulkUpsertStats:
+    points: int = 0          # points acknowledged in this run
+    resumed_from: int = 0    # points skipped because an earlier run stored them
+    batches: int = 0
+    retries: int = 0
+    busy: float = 0.0        # seconds spent in upsert requests, summed over threads
+    started: float = 0.0
+    finished: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return max((self.finished or time.perf_counter()) - self.started, 1e-9)
+
+    @property
+    def points_per_second(self) -> float:
+        return self.points / self.elapsed
+
+
+class BulkUpserter:
+    """
+    Uploads points in parallel batches, waiting for them only at checkpoints.
+
+    Use ``run()`` to load an iterable in one go (resuming from the checkpoint
+    file), or ``add()`` / ``finish()`` to feed points as they are produced.
+    """
+
+    def __init__(
+        self,
+        client,
+        collection_name: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        parallel: int = DEFAULT_PARALLEL,
+        checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+        checkpoint_path: Optional[Union[str, Path]] = None,
+        job_id: Optional[str] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        on_checkpoint: Optional[Callable[[int], None]] = None,
+    ):
+        """
+        Args:
+            client: QdrantClient
+            collection_name: Collection to upsert into
+            batch_size: Points per upsert request
+            parallel: Upsert requests in flight at once
+            checkpoint_every: Points sent between checkpoints
+            checkpoint_path: JSON file recording progress (None: no file, nothing to resume)
+            job_id: Identifies the load in the checkpoint file; a checkpoint of another
+                job is ignored (default: the collection name)
+            max_retries: Retries per batch before the load fails
+            on_checkpoint: Called with the number of stored points after every checkpoint
+        """
+        self.logger = logging.getLogger(__name__)
+        self.client = client
+        self.collection_name = collection_name
+        self.batch_size = max(1, batch_size)
+        self.parallel = max(1, parallel)
+        self.checkpoint_every = max(self.batch_size, checkpoint_every)
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        self.job_id = job_id or collection_name
+        self.max_retries = max(0, max_retries)
+        self.on_checkpoint = on_checkpoint
+        self.stats = BulkUpsertStats(started=time.perf_counter())
+
+        self._pool = ThreadPoolExecutor(max_workers=self.parallel, thread_name_prefix="bulk-upsert")
+        self._buffer: List[Any] = []
+        self._in_flight: Dict[Future, Tuple[int, int]] = {}
+        self._failed: List[Tuple[int, int, Exception]] = []
+        self._callbacks: List[Tuple[int, int, Callable[[Optional[Exception]], None]]] = []
+        self._last_batch: List[Any] = []
+        self._queued = 0            # points handed to add()
+        self._sent = 0              # points submitted as requests
+        self._stored = 0            # contiguous prefix of points known to be stored
+        self._since_checkpoint = 0
+
+    # ───────────────────────── Checkpoint file ──────────────────────
+    def load_checkpoint(self) -> int:
+        """Points stored by an earlier, interrupted run of this job (0 if none)."""
+        if self.checkpoint_path is None or not self.checkpoint_path.exists():
+            return 0
+        try:
+            with open(self.checkpoint_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable checkpoint {self.checkpoint_path}: {e}")
+            return 0
+        if data.get("job_id") != self.job_id or data.get("collection") != self.collection_name:
+            self.logger.warning(
+                f"Ignoring checkpoint {self.checkpoint_path} of job '{data.get('job_id')}' "
+                f"on '{data.get('collection')}'"
+            )
+            return 0
+        return int(data.get("points_done", 0))
+
+    def _save_checkpoint(self):
+        if self.checkpoint_path is None:
+            return
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_suffix(self.checkpoint_path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "job_id": self.job_id,
+                    "collection": self.collection_name,
+                    "points_done": self.stats.resumed_from + self._stored,
+                    "updated_at": datetime.now().isoformat(),
+                },
+                f,
+            )
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def clear_checkpoint(self):
+        if self.checkpoint_path is not None and self.checkpoint_path.exists():
+            self.checkpoint_path.unlink()
+
+    # ───────────────────────── Loading ──────────────────────────────
+    def run(self, points: Iterable[Any], resume: bool = True) -> BulkUpsertStats:
+        """
+        Upsert every point of ``points``, resuming after the checkpoint when asked.
+
+        ``points`` must yield the same points in the same order on every run for
+        resuming to be exact; points after the last checkpoint are sent again,
+        which is harmless because upserts are idempotent.
+
+        Raises the first batch error once retries run out, after checkpointing
+        everything stored before it. An exception from ``points`` itself is
+        re-raised after checkpointing what was sent and stopping the pool.
+        """
+        skip = self.load_checkpoint() if resume else 0
+        if skip:
+            self.logger.info(f"Resuming load into '{self.collection_name}' after {skip} stored point(s)")
+        self.stats.resumed_from = skip
+
+        try:
+            for n, point in enumerate(points):
+                if n < skip:
+                    continue
+                self.add([point])
+                if self._failed:
+                    break
+        except BaseException:
+            # The producer failed: keep what was sent and the checkpoint file
+            # (the load is incomplete), then re-raise.
+            try:
+                self.checkpoint()
+            except Exception as e:
+                self.logger.error(f"Checkpoint after interrupted load failed: {e}")
+            finally:
+                self._pool.shutdown(wait=True)
+                self.stats.finished = time.perf_counter()
+            raise
+        self.finish()
+        if self._failed:
+            raise self._failed[0][2]
+        return self.stats
+
+    def add(self, points: List[Any], on_done: Optional[Callable[[Optional[Exception]], None]] = None):
+        """
+        Queue ``points`` for upserting; checkpoints when enough points were sent.
+
+        Args:
+            points: PointStructs
+            on_done: Called at a checkpoint once all of ``points`` are stored
+                (with None) or once any of them failed (with the error)
+        """
+        start = self._queued
+        self._queued += len(points)
+        if on_done is not None:
+            self._callbacks.append((start, self._queued, on_done))
+        self._buffer.extend(points)
+        while len(self._buffer) >= self.batch_size:
+            self._submit(self._buffer[:self.batch_size])
+            self._buffer = self._buffer[self.batch_size:]
+            if self._since_checkpoint >= self.checkpoint_every:
+                self.checkpoint()
+
+    def checkpoint(self):
+        """Send buffered points, wait for every request in flight and record progress."""
+        if self._buffer:
+            self._submit(self._buffer)
+            self._buffer = []
+        self._drain(0)
+        self._stored = min([start for start, _, _ in self._failed] + [self._sent])
+        self._since_checkpoint = 0
+        self._fire_callbacks()
+        self._save_checkpoint()
+        self.logger.info(
+            f"Checkpoint: {self.stats.resumed_from + self._stored} point(s) stored in "
+            f"'{self.collection_name}' ({self.stats.points_per_second:.0f} points/s)"
+        )
+        if self.on_checkpoint is not None:
+            self.on_checkpoint(self._stored)
+
+    @property
+    def errors(self) -> List[Exception]:
+        return [e for _, _, e in self._failed]
+
+    def finish(self) -> BulkUpsertStats:
+        """
+        Checkpoint, then make the load visible to searches before returning.
+
+        Requests sent with ``wait=False`` may still be queued for indexing; one
+        request with ``wait=True`` (the last batch, re-sent) returns only after
+        Qdrant has applied everything before it. The checkpoint file is removed
+        once the whole load is stored; failed batches are left in ``errors``
+        and reported to their ``on_done`` callbacks.
+        """
+        try:
+            self.checkpoint()
+            if self._last_batch and not self._failed:
+                self.client.upsert(collection_name=self.collection_name, points=self._last_batch, wait=True)
+        finally:
+            self._pool.shutdown(wait=True)
+            self.stats.finished = time.perf_counter()
+
+        if self._failed:
+            return self.stats
+        self.clear_checkpoint()
+        self.logger.info(
+            f"Upserted {self.stats.points} point(s) into '{self.collection_name}' in "
+            f"{self.stats.elapsed:.1f}s ({self.stats.points_per_second:.0f} points/s, "
+            f"{self.stats.batches} batches, {self.stats.retries} retries)"
+        )
+        return self.stats
+
+    # ───────────────────────── Internals ────────────────────────────
+    def _submit(self, batch: List[Any]):
+        self._drain(self.parallel - 1)
+        span = (self._sent, self._sent + len(batch))
+        self._in_flight[self._pool.submit(self._upsert, batch)] = span
+        self._sent += len(batch)
+        self._since_checkpoint += len(batch)
+        self._last_batch = batch
+
+    def _drain(self, max_in_flight: int):
+        """Wait until at most ``max_in_flight`` requests are outstanding."""
+        while len(self._in_flight) > max_in_flight:
+            done, _ = wait(self._in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                start, end = self._in_flight.pop(future)
+                try:
+                    seconds, retries = future.result()
+                except Exception as e:
+                    self.logger.error(f"Upsert of points {start}-{end - 1} failed: {e}")
+                    self._failed.append((start, end, e))
+                    continue
+                self.stats.points += end - start
+                self.stats.batches += 1
+                self.stats.retries += retries
+                self.stats.busy += seconds
+
+    def _upsert(self, batch: List[Any]) -> Tuple[float, int]:
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.client.upsert(collection_name=self.collection_name, points=batch, wait=False)
+                return time.perf_counter() - start, attempt
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = min(30.0, 2 ** attempt)
+                self.logger.warning(f"Upsert of {len(batch)} point(s) failed ({e}); retrying in {delay}s")
+                time.sleep(delay)
+
+    def _fire_callbacks(self):
+        pending = []
+        for start, end, callback in self._callbacks:
+            error = next((e for s, t, e in self._failed if s < end and start < t), None)
+            if error is None and end > self._sent:
+                pending.append((start, end, callback))
+                continue
+            callback(error)
+        self._callbacks = pending
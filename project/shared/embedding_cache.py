@@ -0,0 +1,335 @@
+# file: shared/embedding_cache.py
+"""
+Content-addressed embedding cache.
+
+Vectors are keyed by (embedding model, hash of the normalized text), so the
+same boilerplate paragraph, header or re-ingested document is only ever
+embedded once per model. Two tiers:
+
+  * an in-memory LRU of recently used vectors, and
+  * an SQLite file on disk, capped in size, evicting least recently used rows.
+
+Several processes may share one cache file; SQLite serialises the writes.
+The size of the disk tier is tracked in memory and only re-read from the
+file when it appears to exceed the cap, and disk hits update their
+``last_used`` in batches, so lookups and inserts cost no extra writes or
+table scans.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = "embedding_cache"
+DEFAULT_MEMORY_ITEMS = 10_000
+DEFAULT_MAX_DISK_BYTES = 1 << 30   # 1 GiB of vectors (~170k ada-002 embeddings)
+TOUCH_FLUSH_ITEMS = 1_000          # write last_used of disk hits in batches of this many...
+TOUCH_FLUSH_SECONDS = 60.0         # ...or at least this often
+
+Vector = List[float]
+
+
+def normalize_text(text: str) -> str:
+    """Normalization applied before hashing: NFC, whitespace runs collapsed, stripped."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    """Cache key of ``text`` embedded with ``model``."""
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model}:{digest}"
+
+
+class EmbeddingCache:
+    """
+    Two-tier (memory LRU over SQLite) store of embedding vectors.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        memory_items: int = DEFAULT_MEMORY_ITEMS,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+    ):
+        """
+        Args:
+            path: SQLite file for the disk tier; None keeps the cache in memory only
+            memory_items: Maximum number of vectors in the in-memory tier
+            max_disk_bytes: Maximum total vector bytes kept on disk
+        """
+        self.logger = logging.getLogger(__name__)
+        self.memory_items = max(0, memory_items)
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.path = Path(path) if path else None
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+        self._touched: Dict[str, float] = {}   # disk hits whose last_used is not written yet
+        self._touched_since = time.monotonic()
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+            self._db.commit()
+            self._disk_bytes = self._disk_size()
+
+    # ───────────────────────── Lookup ───────────────────────────────
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[Vector]]:
+        """Return the cached vector of each text, or None where it is not cached."""
+        keys = [cache_key(model, text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+
+            from_disk: Dict[str, np.ndarray] = {}
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            if missing and self._db is not None:
+                from_disk = self._read_disk(missing)
+                for key, vector in from_disk.items():
+                    found[key] = vector
+                    self._remember(key, vector)
+
+            for key in keys:
+                if key in from_disk:
+                    self.disk_hits += 1
+                elif key in found:
+                    self.memory_hits += 1
+                else:
+                    self.misses += 1
+
+        return [found[key].tolist() if key in found else None for key in keys]
+
+    def get(self, model: str, text: str) -> Optional[Vector]:
+        return self.get_many(model, [text])[0]
+
+    # ───────────────────────── Storing ──────────────────────────────
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Vector]):
+        """Cache ``vectors[i]`` as the embedding of ``texts[i]``."""
+        if len(texts) != len(vectors):
+            raise ValueError(f"Got {len(vectors)} vector(s) for {len(texts)} text(s)")
+        rows = {
+            cache_key(model, text): np.asarray(vector, dtype=np.float32)
+            for text, vector in zip(texts, vectors)
+        }
+        if not rows:
+            return
+
+        with self._lock:
+            for key, vector in rows.items():
+                self._remember(key, vector)
+            if self._db is not None:
+                now = time.time()
+                replaced = self._stored_lengths(list(rows))
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                    [(key, vector.tobytes(), now) for key, vector in rows.items()],
+                )
+                self._db.commit()
+                for key in replaced:
+                    self._touched.pop(key, None)
+                self._disk_bytes += sum(vector.nbytes for vector in rows.values()) - sum(replaced.values())
+                if self._disk_bytes > self.max_disk_bytes:
+                    self._enforce_disk_cap()
+
+    def put(self, model: str, text: str, vector: Vector):
+        self.put_many(model, [text], [vector])
+
+    def embed(self, model: str, texts: Sequence[str], embed_fn: Callable[[List[str]], List[Vector]]) -> List[Vector]:
+        """
+        Return one vector per text, calling ``embed_fn`` only for uncached texts.
+
+        Texts that normalize to the same string are embedded once.
+
+        Args:
+            model: Embedding model identifier (part of the cache key)
+            texts: Texts to embed
+            embed_fn: Embeds a list of texts, returning vectors in the same order
+        """
+        vectors = self.get_many(model, texts)
+        pending: Dict[str, List[int]] = {}
+        for i, (text, vector) in enumerate(zip(texts, vectors)):
+            if vector is None:
+                pending.setdefault(cache_key(model, text), []).append(i)
+
+        if pending:
+            first = [indices[0] for indices in pending.values()]
+            new_vectors = embed_fn([texts[i] for i in first])
+            if len(new_vectors) != len(first):
+                raise ValueError(
+                    f"Embedding function returned {len(new_vectors)} vector(s) for {len(first)} input(s)"
+                )
+            self.put_many(model, [texts[i] for i in first], new_vectors)
+            for indices, vector in zip(pending.values(), new_vectors):
+                for i in indices:
+                    vectors[i] = vector
+        return vectors
+
+    # ───────────────────────── Housekeeping ─────────────────────────
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Hit/miss counters since start-up plus current tier sizes."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            stats = {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_items": len(self._memory),
+            }
+            if self._db is not None:
+                self._flush_touched()
+                count, size = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+                ).fetchone()
+                stats["disk_items"], stats["disk_bytes"] = count, size
+                self._disk_bytes = size
+        return stats
+
+    def clear(self):
+        """Drop every cached vector from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+                self._disk_bytes = 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._flush_touched()
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key: str, vector: np.ndarray):
+        if not self.memory_items:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        # Stay below SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            marks = ",".join("?" * len(part))
+            for key, blob in self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", part
+            ):
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        if found:
+            now = time.time()
+            self._touched.update(dict.fromkeys(found, now))
+            if (
+                len(self._touched) >= TOUCH_FLUSH_ITEMS
+                or time.monotonic() - self._touched_since >= TOUCH_FLUSH_SECONDS
+            ):
+                self._flush_touched()
+        return found
+
+    def _flush_touched(self):
+        """Write the buffered ``last_used`` of disk hits."""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()],
+            )
+            self._db.commit()
+            self._touched.clear()
+        self._touched_since = time.monotonic()
+
+    def _stored_lengths(self, keys: List[str]) -> Dict[str, int]:
+        """Byte length of the vectors already stored under ``keys``."""
+        lengths: Dict[str, int] = {}
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            marks = ",".join("?" * len(part))
+            lengths.update(self._db.execute(
+                f"SELECT key, LENGTH(vector) FROM embeddings WHERE key IN ({marks})", part
+            ))
+        return lengths
+
+    def _disk_size(self) -> int:
+        (size,) = self._db.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()
+        return size
+
+    def _enforce_disk_cap(self):
+        # Other processes may have written to or evicted from the file since
+        # the total was last read, so confirm it before evicting.
+        size = self._disk_bytes = self._disk_size()
+        if size <= self.max_disk_bytes:
+            return
+        self._flush_touched()
+        # Evict down to 90% of the cap so every insert doesn't trigger another sweep
+        excess = size - int(self.max_disk_bytes * 0.9)
+        victims, freed = [], 0
+        for key, length in self._db.execute(
+            "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used"
+        ):
+            victims.append((key,))
+            freed += length
+            if freed >= excess:
+                break
+        self._db.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+        self._db.commit()
+        self._disk_bytes -= freed
+        self.evictions += len(victims)
+        self.logger.info(f"Embedding cache evicted {len(victims)} vector(s) ({freed} bytes)")
+
+
+def get_embedding_cache(
+    cache_dir: Optional[str] = None,
+    memory_items: Optional[int] = None,
+    max_disk_bytes: Optional[int] = None,
+) -> EmbeddingCache:
+    """
+    Process-wide cache for ``cache_dir``, shared by every caller.
+
+    Unset arguments fall back to ``EMBEDDING_CACHE_DIR``,
+    ``EMBEDDING_CACHE_MEMORY_ITEMS`` and ``EMBEDDING_CACHE_MAX_BYTES``. An empty
+    cache directory disables the disk tier.
+    """
+    if cache_dir is None:
+        cache_dir = os.getenv("EMBEDDING_CACHE_DIR", DEFAULT_CACHE_DIR)
+    if memory_items is None:
+        memory_items = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", DEFAULT_MEMORY_ITEMS))
+    if max_disk_bytes is None:
+        max_disk_bytes = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", DEFAULT_MAX_DISK_BYTES))
+    path = str(Path(cache_dir).resolve() / "embeddings.sqlite3") if cache_dir else None
+    return _open_cache(path, memory_items, max_disk_bytes)
+
+
+@lru_cache(maxsize=None)
+def _open_cache(path: Optional[str], memory_items: int, max_disk_bytes: int) -> EmbeddingCache:
+    return EmbeddingCache(path, memory_items=memory_items, max_disk_bytes=max_disk_bytes)
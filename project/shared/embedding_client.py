@@ -0,0 +1,276 @@
+# file: shared/embedding_client.py
+"""
+Request-size-aware embedding client.
+
+Splits inputs into requests bounded by input count and token count, keeps at
+most N requests in flight, spends a shared tokens-per-minute /
+requests-per-minute budget, and retries rate-limited (429) and transient
+server errors with exponential backoff. Vectors come back in input order.
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+try:  # exact token counts when tiktoken is installed
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+# OpenAI accepts up to 2048 inputs and ~300k tokens per embeddings request;
+# stay well below both so a single slow request doesn't stall the pipeline.
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_BATCH_TOKENS = 100_000
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 6
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+Vector = List[float]
+
+
+def _approx_token_count(text: str) -> int:
+    """Rough token estimate (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def get_token_counter(encoding_name: str = "cl100k_base") -> Callable[[str], int]:
+    """Return a callable counting tokens, exact if tiktoken is available."""
+    if tiktoken is None:
+        return _approx_token_count
+    try:
+        encoding = tiktoken.get_encoding(encoding_name)
+    except Exception:
+        return _approx_token_count
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def get_model_token_counter(model: str) -> Callable[[str], int]:
+    """``get_token_counter`` with the encoding of an OpenAI model (cl100k_base if unknown)."""
+    if tiktoken is None:
+        return _approx_token_count
+    try:
+        encoding_name = tiktoken.encoding_for_model(model).name
+    except Exception:
+        encoding_name = "cl100k_base"
+    return get_token_counter(encoding_name)
+
+
+def plan_batches(
+    token_counts: List[int], max_batch_size: int, max_batch_tokens: int
+) -> List[List[int]]:
+    """
+    Group input indices into batches respecting the size and token limits.
+
+    A single input above the token limit gets a batch of its own; the
+    provider decides whether to truncate or reject it.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+
+    for i, tokens in enumerate(token_counts):
+        if current and (
+            len(current) >= max_batch_size
+            or current_tokens + tokens > max_batch_tokens
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+class RateLimiter:
+    """
+    Token buckets for tokens per minute and requests per minute, shared by threads.
+    """
+
+    def __init__(self, tokens_per_minute: Optional[int] = None, requests_per_minute: Optional[int] = None):
+        """
+        Args:
+            tokens_per_minute: Token budget (None: unlimited)
+            requests_per_minute: Request budget (None: unlimited)
+        """
+        self.tokens_per_minute = tokens_per_minute or None
+        self.requests_per_minute = requests_per_minute or None
+        self._tokens = float(self.tokens_per_minute or 0)
+        self._requests = float(self.requests_per_minute or 0)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self, tokens: int):
+        """Block until one request of ``tokens`` tokens fits in the budget, then spend it."""
+        if self.tokens_per_minute:
+            # A request bigger than the whole budget waits for a full bucket
+            tokens = min(tokens, self.tokens_per_minute)
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                waits = [self._paused_until - now]
+                if self.tokens_per_minute and self._tokens < tokens:
+                    waits.append((tokens - self._tokens) * 60 / self.tokens_per_minute)
+                if self.requests_per_minute and self._requests < 1:
+                    waits.append((1 - self._requests) * 60 / self.requests_per_minute)
+                wait = max(waits)
+                if wait <= 0:
+                    if self.tokens_per_minute:
+                        self._tokens -= tokens
+                    if self.requests_per_minute:
+                        self._requests -= 1
+                    return
+                self._cond.wait(timeout=wait)
+
+    def pause(self, seconds: float):
+        """Hold every caller back for ``seconds`` (e.g. after a 429 with Retry-After)."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, transient server errors, timeouts and dropped connections."""
+    if _status_code(error) in _RETRY_STATUS:
+        return True
+    return type(error).__name__ in {"RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError"}
+
+
+class EmbeddingClient:
+    """
+    Embeds many texts in concurrent, size-bounded, rate-limited requests.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[Vector]],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        token_counter: Optional[Callable[[str], int]] = None,
+    ):
+        """
+        Args:
+            embed_fn: Sends one request: embeds a list of texts, returning vectors in order
+            max_batch_size: Maximum number of inputs per request
+            max_batch_tokens: Maximum total tokens per request
+            max_concurrency: Requests in flight at once, across all callers of this client
+            rate_limiter: Shared TPM/RPM budget (None: unlimited)
+            max_retries: Retries per request for retryable errors
+            backoff_base: First retry delay in seconds, doubled on every attempt
+            backoff_max: Upper bound on a single retry delay
+            token_counter: Callable returning the token count of a text
+        """
+        self.logger = logging.getLogger(__name__)
+        self.embed_fn = embed_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_batch_tokens = max(1, max_batch_tokens)
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_limiter = rate_limiter
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.count_tokens = token_counter or get_token_counter()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._stats_lock = threading.Lock()   # requests run on several threads
+        self.retries = 0
+
+    def plan_batches(self, texts: List[str]) -> List[List[int]]:
+        """Group text indices into requests respecting the size and token limits."""
+        return plan_batches([self.count_tokens(text) for text in texts], self.max_batch_size, self.max_batch_tokens)
+
+    def embed(self, texts: List[str]) -> List[Vector]:
+        """
+        Embed ``texts`` and return one vector per text, in input order.
+
+        Raises the first non-retryable error, or the last error once retries run out.
+        """
+        if not texts:
+            return []
+
+        token_counts = [self.count_tokens(text) for text in texts]
+        batches = plan_batches(token_counts, self.max_batch_size, self.max_batch_tokens)
+        self.logger.info(
+            f"Embedding {len(texts)} text(s) in {len(batches)} request(s), "
+            f"up to {self.max_concurrency} concurrently"
+        )
+
+        def run(batch: List[int]) -> List[Vector]:
+            return self._request([texts[i] for i in batch], sum(token_counts[i] for i in batch))
+
+        if len(batches) == 1:
+            results = [run(batches[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+                results = list(pool.map(run, batches))
+
+        embeddings: List[Optional[Vector]] = [None] * len(texts)
+        for batch, vectors in zip(batches, results):
+            if len(vectors) != len(batch):
+                raise ValueError(
+                    f"Embedding model returned {len(vectors)} vector(s) for {len(batch)} input(s)"
+                )
+            for i, vector in zip(batch, vectors):
+                embeddings[i] = vector
+        return embeddings
+
+    def _request(self, texts: List[str], tokens: int) -> List[Vector]:
+        """Send one request, waiting for budget and retrying retryable failures."""
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(tokens)
+            with self._slots:
+                try:
+                    return self.embed_fn(texts)
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        raise
+                    error = e
+
+            retry_after = _retry_after(error)
+            delay = retry_after if retry_after is not None else min(
+                self.backoff_max, self.backoff_base * 2 ** attempt
+            ) * random.uniform(0.5, 1.0)
+            if self.rate_limiter is not None and _status_code(error) == 429:
+                # Everyone sharing the budget backs off, not just this request
+                self.rate_limiter.pause(delay)
+            with self._stats_lock:
+                self.retries += 1
+            self.logger.warning(
+                f"Embedding request of {len(texts)} input(s) failed ({error}); "
+                f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s"
+            )
+            time.sleep(delay)
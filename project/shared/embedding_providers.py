@@ -0,0 +1,214 @@
+# file: shared/embedding_providers.py
+"""
+Embedding providers behind one interface, chosen by a spec string.
+
+    "text-embedding-ada-002"            OpenAI (a bare model name means OpenAI)
+    "openai:text-embedding-3-small"     OpenAI
+    "local:BAAI/bge-small-en-v1.5"      sentence-transformers model on this machine's CPU
+    "local-onnx:BAAI/bge-small-en-v1.5" same, run with the ONNX Runtime backend
+    "fake:384"                          deterministic hash vectors, for tests and benchmarks
+
+Every provider has ``embed_documents`` / ``embed_query`` (the interface the
+ingestion code already expects), a ``model`` identifier used to key caches
+and stores, and ``dim``, the vector size its collection must have.
+"""
+
+import functools
+import hashlib
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional
+
+import numpy as np
+
+# Vector sizes of the OpenAI models we use; others are learned from the first response
+OPENAI_DIMENSIONS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
+
+
+class EmbeddingProvider(ABC):
+    """
+    Base class: subclasses implement ``embed_documents``.
+    """
+
+    model: str = ""
+    remote: bool = True     # False: runs in-process, concurrent requests only add contention
+
+    @property
+    def dim(self) -> Optional[int]:
+        """Vector size, or None if unknown until the first embedding."""
+        return None
+
+    @abstractmethod
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """One vector per text, in order."""
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """
+    OpenAI embeddings API.
+    """
+
+    def __init__(self, model: str, client_factory: Optional[Callable] = None):
+        """
+        Args:
+            model: OpenAI embedding model name
+            client_factory: Returns the OpenAI client to use (default: ``OpenAI()``),
+                called on first use so creating the provider needs no credentials
+        """
+        self.model = model
+        self._client_factory = client_factory
+        self._dim = OPENAI_DIMENSIONS.get(model)
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self._dim
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self._client_factory is None:
+            from openai import OpenAI
+
+            self._client_factory = functools.lru_cache(maxsize=1)(OpenAI)
+        resp = self._client_factory().embeddings.create(model=self.model, input=texts)
+        vectors = [d.embedding for d in resp.data]
+        if vectors and self._dim is None:
+            self._dim = len(vectors[0])
+        return vectors
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    sentence-transformers model run in this process on the CPU.
+
+    Requests are serialized and batched; parallelism comes from the
+    framework's intra-op threads, capped at ``threads``.
+    """
+
+    remote = False
+
+    def __init__(
+        self,
+        model_name: str,
+        threads: Optional[int] = None,
+        batch_size: int = 32,
+        device: str = "cpu",
+        backend: str = "torch",
+        normalize: bool = True,
+    ):
+        """
+        Args:
+            model_name: Hugging Face model ID or local path
+            threads: CPU threads used for inference (None: framework default)
+            batch_size: Texts encoded per forward pass
+            device: Torch device
+            backend: "torch" or "onnx" (needs sentence-transformers >= 3.2 and onnxruntime)
+            normalize: Return unit-length vectors, so cosine and dot product agree
+        """
+        self.logger = logging.getLogger(__name__)
+        self.model_name = model_name
+        self.model = f"local-onnx:{model_name}" if backend == "onnx" else f"local:{model_name}"
+        self.threads = threads
+        self.batch_size = max(1, batch_size)
+        self.device = device
+        self.backend = backend
+        self.normalize = normalize
+        self._encoder = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._encoder is None:
+            # Imported here: sentence_transformers pulls in torch, which takes seconds
+            import torch
+            from sentence_transformers import SentenceTransformer
+
+            if self.threads:
+                torch.set_num_threads(self.threads)   # process-wide
+            kwargs = {"backend": self.backend} if self.backend != "torch" else {}
+            self.logger.info(f"Loading local embedding model {self.model_name} ({self.backend}, {self.device})")
+            self._encoder = SentenceTransformer(self.model_name, device=self.device, **kwargs)
+        return self._encoder
+
+    @property
+    def dim(self) -> Optional[int]:
+        with self._lock:
+            return self._load().get_sentence_embedding_dimension()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        with self._lock:
+            vectors = self._load().encode(
+                texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=self.normalize,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+        return vectors.astype(np.float32).tolist()
+
+
+class FakeEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic stand-in for an embedding API: hashes each text to a unit vector.
+    """
+
+    remote = False
+
+    def __init__(self, dim: int = 64, model: Optional[str] = None):
+        self._dim = dim
+        self.model = model or f"fake:{dim}"
+
+    @property
+    def dim(self) -> int:
+        return self._dim
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+            vector = np.random.default_rng(seed).standard_normal(self._dim)
+            vectors.append((vector / np.linalg.norm(vector)).tolist())
+        return vectors
+
+
+def get_embedding_provider(spec: str, client_factory: Optional[Callable] = None) -> EmbeddingProvider:
+    """
+    Provider for ``spec`` (see the module docstring), one instance per spec and process,
+    so a local model is loaded once however many components use it.
+
+    Local models read EMBEDDING_LOCAL_THREADS, EMBEDDING_LOCAL_BATCH_SIZE and
+    EMBEDDING_LOCAL_DEVICE from the environment.
+
+    Args:
+        spec: Provider spec, e.g. "local:BAAI/bge-small-en-v1.5"
+        client_factory: OpenAI client factory for OpenAI specs (ignored otherwise)
+    """
+    kind, _, name = spec.partition(":")
+    if not name:
+        kind, name = "openai", spec
+    return _provider(kind, name, client_factory if kind == "openai" else None)
+
+
+@functools.lru_cache(maxsize=None)
+def _provider(kind: str, name: str, client_factory: Optional[Callable]) -> EmbeddingProvider:
+    if kind == "openai":
+        return OpenAIEmbeddingProvider(name, client_factory)
+    if kind in ("local", "local-onnx"):
+        return LocalEmbeddingProvider(
+            name,
+            threads=int(os.getenv("EMBEDDING_LOCAL_THREADS", "0")) or None,
+            batch_size=int(os.getenv("EMBEDDING_LOCAL_BATCH_SIZE", "32")),
+            device=os.getenv("EMBEDDING_LOCAL_DEVICE", "cpu"),
+            backend="onnx" if kind == "local-onnx" else "torch",
+        )
+    if kind == "fake":
+        return FakeEmbeddingProvider(int(name))
+    raise ValueError(f"Unknown embedding provider '{kind}' in '{kind}:{name}'")
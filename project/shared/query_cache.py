@@ -0,0 +1,319 @@
+# file: shared/query_cache.py
+"""
+Query-embedding cache shared by semantic search and the RAG chatbot.
+
+Users ask the same questions all day, so query vectors are kept in a
+bounded in-memory LRU whose entries expire after a TTL, keyed by embedding
+model and normalized query text (whitespace collapsed, case folded). An
+optional backing store lets several workers, or restarts, share entries:
+
+    QUERY_CACHE_STORE=""                         memory only (default)
+    QUERY_CACHE_STORE="sqlite:query_cache.db"    local SQLite file
+    QUERY_CACHE_STORE="redis://localhost:6379/0" Redis (needs the redis package)
+
+Unlike the document embedding cache, entries expire, so a model updated
+behind the same name is picked up within one TTL.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .embedding_cache import normalize_text
+
+DEFAULT_MAX_ITEMS = 2048
+DEFAULT_TTL_SECONDS = 3600.0
+
+Vector = List[float]
+
+
+def normalize_query(text: str) -> str:
+    """Whitespace collapsed and case folded: "Sepsis  bundle" and "sepsis bundle" share an entry."""
+    return normalize_text(text).casefold()
+
+
+def query_key(model: str, text: str) -> str:
+    digest = hashlib.sha256(normalize_query(text).encode("utf-8")).hexdigest()
+    return f"{model}:{digest}"
+
+
+class SQLiteQueryStore:
+    """
+    Query vectors in a local SQLite file, shared by the processes of one host.
+    """
+
+    PRUNE_EVERY = 256   # puts between sweeps of expired rows
+
+    def __init__(self, path: Union[str, Path]):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), timeout=5, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS queries (key TEXT PRIMARY KEY, vector BLOB NOT NULL, created REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._puts = 0
+
+    def get(self, key: str, ttl: float) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT vector FROM queries WHERE key = ? AND created >= ?", (key, time.time() - ttl)
+            ).fetchone()
+        return np.frombuffer(row[0], dtype=np.float32) if row else None
+
+    def put(self, key: str, vector: np.ndarray, ttl: float):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO queries (key, vector, created) VALUES (?, ?, ?)",
+                (key, vector.tobytes(), time.time()),
+            )
+            self._puts += 1
+            if self._puts % self.PRUNE_EVERY == 0:
+                self._db.execute("DELETE FROM queries WHERE created < ?", (time.time() - ttl,))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM queries")
+            self._db.commit()
+
+
+class RedisQueryStore:
+    """
+    Query vectors in Redis, shared by every worker and host; Redis expires them.
+    """
+
+    def __init__(self, url: str, prefix: str = "query-embedding:"):
+        import redis  # optional dependency, only needed for this store
+
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.prefix = prefix
+
+    def get(self, key: str, ttl: float) -> Optional[np.ndarray]:
+        value = self._redis.get(self.prefix + key)
+        return np.frombuffer(value, dtype=np.float32) if value else None
+
+    def put(self, key: str, vector: np.ndarray, ttl: float):
+        self._redis.setex(self.prefix + key, max(1, int(ttl)), vector.tobytes())
+
+    def clear(self):
+        for key in self._redis.scan_iter(match=self.prefix + "*"):
+            self._redis.delete(key)
+
+
+class QueryEmbeddingCache:
+    """
+    In-memory LRU with TTL in front of an optional backing store.
+    """
+
+    def __init__(self, max_items: int = DEFAULT_MAX_ITEMS, ttl_seconds: float = DEFAULT_TTL_SECONDS, store=None):
+        """
+        Args:
+            max_items: Entries kept in memory (least recently used evicted first)
+            ttl_seconds: Lifetime of an entry, in memory and in the store
+            store: SQLiteQueryStore, RedisQueryStore or None
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_items = max(1, max_items)
+        self.ttl = ttl_seconds
+        self.store = store
+        self._memory: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.store_errors = 0
+
+    # ───────────────────────── Lookup ───────────────────────────────
+    def _get_memory(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires, vector = entry
+            if expires < time.monotonic():
+                del self._memory[key]
+                self.expired += 1
+                return None
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return vector
+
+    def _remember(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._memory[key] = (time.monotonic() + self.ttl, vector)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+                self.evictions += 1
+
+    def _get_store(self, key: str) -> Optional[np.ndarray]:
+        if self.store is None:
+            return None
+        try:
+            vector = self.store.get(key, self.ttl)
+        except Exception as e:   # a store outage must not fail the search
+            self.store_errors += 1
+            self.logger.warning(f"Query cache store lookup failed: {e}")
+            return None
+        if vector is not None:
+            with self._lock:
+                self.store_hits += 1
+            self._remember(key, vector)
+        return vector
+
+    def _put_store(self, key: str, vector: np.ndarray):
+        if self.store is None:
+            return
+        try:
+            self.store.put(key, vector, self.ttl)
+        except Exception as e:
+            self.store_errors += 1
+            self.logger.warning(f"Query cache store write failed: {e}")
+
+    def _miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def get(self, model: str, text: str) -> Optional[Vector]:
+        key = query_key(model, text)
+        vector = self._get_memory(key)
+        if vector is None:
+            vector = self._get_store(key)
+        if vector is None:
+            self._miss()
+            return None
+        return vector.tolist()
+
+    def put(self, model: str, text: str, vector: Vector):
+        key = query_key(model, text)
+        array = np.asarray(vector, dtype=np.float32)
+        self._remember(key, array)
+        self._put_store(key, array)
+
+    def embed(self, model: str, text: str, embed_fn: Callable[[str], Vector]) -> Vector:
+        """Vector of ``text``, calling ``embed_fn(text)`` only on a miss."""
+        vector = self.get(model, text)
+        if vector is None:
+            vector = embed_fn(text)
+            self.put(model, text, vector)
+        return vector
+
+    async def embed_async(self, model: str, text: str, embed_fn: Callable[[str], Awaitable[Vector]]) -> Vector:
+        """``embed`` for the event loop: store I/O runs in a thread, misses await ``embed_fn``."""
+        key = query_key(model, text)
+        array = self._get_memory(key)
+        if array is None and self.store is not None:
+            array = await asyncio.to_thread(self._get_store, key)
+        if array is not None:
+            return array.tolist()
+
+        self._miss()
+        vector = await embed_fn(text)
+        array = np.asarray(vector, dtype=np.float32)
+        self._remember(key, array)
+        if self.store is not None:
+            await asyncio.to_thread(self._put_store, key, array)
+        return vector
+
+    async def embed_many_async(
+        self, model: str, texts: List[str], embed_fn: Callable[[List[str]], Awaitable[List[Vector]]]
+    ) -> List[Vector]:
+        """
+        ``embed_async`` for several texts: every miss is embedded by one
+        ``embed_fn(misses)`` call, and repeats of a text by one entry.
+        """
+        keys = [query_key(model, text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        for key in dict.fromkeys(keys):
+            array = self._get_memory(key)
+            if array is None and self.store is not None:
+                array = await asyncio.to_thread(self._get_store, key)
+            if array is not None:
+                found[key] = array
+
+        misses = {key: text for key, text in zip(keys, texts) if key not in found}
+        if misses:
+            for _ in misses:
+                self._miss()
+            vectors = await embed_fn(list(misses.values()))
+            for key, vector in zip(misses, vectors):
+                array = np.asarray(vector, dtype=np.float32)
+                found[key] = array
+                self._remember(key, array)
+                if self.store is not None:
+                    await asyncio.to_thread(self._put_store, key, array)
+        return [found[key].tolist() for key in keys]
+
+    # ───────────────────────── Housekeeping ─────────────────────────
+    def stats(self) -> Dict[str, Union[int, float, str]]:
+        with self._lock:
+            hits = self.memory_hits + self.store_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "store_hits": self.store_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "store_errors": self.store_errors,
+                "memory_items": len(self._memory),
+                "store": type(self.store).__name__ if self.store is not None else "none",
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.store is not None:
+            self.store.clear()
+
+
+def open_query_store(spec: str):
+    """Backing store for a QUERY_CACHE_STORE value ("" for none)."""
+    if not spec:
+        return None
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisQueryStore(spec)
+    if spec.startswith("sqlite:"):
+        return SQLiteQueryStore(Path(spec[len("sqlite:"):]).resolve())
+    raise ValueError(f"Unknown query cache store '{spec}'")
+
+
+def get_query_cache(
+    max_items: Optional[int] = None,
+    ttl_seconds: Optional[float] = None,
+    store: Optional[str] = None,
+) -> QueryEmbeddingCache:
+    """
+    Process-wide query cache, shared by every caller with the same settings.
+
+    Unset arguments fall back to ``QUERY_CACHE_ITEMS``, ``QUERY_CACHE_TTL``
+    (seconds) and ``QUERY_CACHE_STORE``.
+    """
+    if max_items is None:
+        max_items = int(os.getenv("QUERY_CACHE_ITEMS", DEFAULT_MAX_ITEMS))
+    if ttl_seconds is None:
+        ttl_seconds = float(os.getenv("QUERY_CACHE_TTL", DEFAULT_TTL_SECONDS))
+    if store is None:
+        store = os.getenv("QUERY_CACHE_STORE", "")
+    return _open_query_cache(max_items, ttl_seconds, store)
+
+
+@lru_cache(maxsize=None)
+def _open_query_cache(max_items: int, ttl_seconds: float, store: str) -> QueryEmbeddingCache:
+    return QueryEmbeddingCache(max_items, ttl_seconds, open_query_store(store))
@@ -0,0 +1,150 @@
+# file: shared/singleflight.py
+"""
+In-flight request coalescing ("singleflight").
+
+When a policy link is shared, many users ask the same question within
+seconds. Calls made with the same key while an identical call is running
+wait for that call instead of starting their own: one pipeline run, one set
+of OpenAI requests, and every caller gets the result (each its own copy) or
+the exception. Nothing is kept once the call finishes; caching is the job
+of the caches.
+"""
+
+import asyncio
+import copy
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.callers = 1
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls of blocking functions made from threads.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        ``fn(*args, **kwargs)``, or the result of the identical call already running.
+
+        Args:
+            key: Identifies identical calls (normalized query and parameters)
+            fn: The work; runs in the thread of the first caller
+
+        Raises:
+            Whatever ``fn`` raised, in every caller that waited for it
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+            else:
+                call.callers += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]   # later callers start a fresh call
+            call.done.set()
+        if call.callers > 1:
+            self.logger.info(f"Served {call.callers} identical requests with one execution")
+            return copy.deepcopy(call.result)   # followers copy the original; don't share it
+        return call.result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class _AsyncCall:
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.callers = 0    # all callers so far
+        self.waiting = 0    # callers still awaiting the result
+        self.abandoned = False
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent calls of coroutine functions on one event loop.
+
+    The work runs in its own task. A caller that is cancelled stops waiting
+    without disturbing the others; the work itself is cancelled only once
+    every caller has gone.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._calls: Dict[Hashable, _AsyncCall] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        ``await fn(*args, **kwargs)``, or the result of the identical call already running.
+
+        Args:
+            key: Identifies identical calls (normalized query and parameters)
+            fn: Coroutine function doing the work
+
+        Raises:
+            Whatever ``fn`` raised, in every caller; CancelledError in a caller
+            that was cancelled
+        """
+        call = self._calls.get(key)
+        if call is None or call.task.done() or call.abandoned:
+            call = self._calls[key] = _AsyncCall(asyncio.ensure_future(fn(*args, **kwargs)))
+            call.task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        call.callers += 1
+        call.waiting += 1
+
+        try:
+            result = await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if not call.task.done() and call.waiting == 1:
+                call.abandoned = True
+                call.task.cancel()   # nobody left to use the result
+            raise
+        finally:
+            call.waiting -= 1
+        return copy.deepcopy(result) if call.callers > 1 else result
+
+    def _forget(self, key: Hashable, call: _AsyncCall):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if call.callers > 1:
+            self.logger.info(f"Served {call.callers} identical requests with one execution")
+
+    def stats(self) -> Dict[str, int]:
+        return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": len(self._calls)}